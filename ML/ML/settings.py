@@ -128,6 +128,99 @@ LOGIN_URL = '/auth/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/auth/login/'
 
+# RAG
+RAG_EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+# Embedding models loaded eagerly when the app starts, e.g. ['all-MiniLM-L6-v2']
+RAG_WARMUP_MODELS = []
+# Upper bound on memory used by loaded document indexes kept between queries
+RAG_INDEX_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Repeated questions: normalized question -> embedding, and (index version, question, k) -> answer.
+# Entries are dropped after the TTL (seconds); a size of 0 disables the cache
+RAG_QUERY_EMBEDDING_CACHE_SIZE = 4096
+RAG_QUERY_EMBEDDING_CACHE_TTL = 3600
+RAG_RESULT_CACHE_SIZE = 1024
+RAG_RESULT_CACHE_TTL = 300
+# Background ingestion (python manage.py rag_worker)
+RAG_INGESTION_WORKERS = 2
+RAG_INGESTION_MAX_ATTEMPTS = 3
+RAG_INGESTION_RETRY_DELAY = 30  # seconds, doubled after every failed attempt
+RAG_INGESTION_POLL_INTERVAL = 2.0
+RAG_INGESTION_STALE_AFTER = 3600
+# Processes each ingestion job uses to extract text from large PDFs (None = the CPUs divided
+# among the RAG_INGESTION_WORKERS jobs running at once)
+RAG_EXTRACTION_WORKERS = None
+# Chunks embedded and added to the index at a time; bounds ingestion memory
+RAG_EMBEDDING_BATCH_SIZE = 256
+# Content-addressed cache of chunk embeddings shared by all uploads (None disables it)
+RAG_EMBEDDING_CACHE_PATH = MEDIA_ROOT / 'embedding_cache.sqlite3'
+# Vectors kept in that cache; beyond it the least recently used are deleted (None keeps
+# everything). 200k all-MiniLM-L6-v2 vectors take about 300 MB
+RAG_EMBEDDING_CACHE_MAX_ROWS = 200000
+# DocumentChunk rows inserted per bulk_create during ingestion
+RAG_CHUNK_BULK_BATCH_SIZE = 500
+# Cross-document search: one library per user ('user') or one for everybody ('global')
+RAG_LIBRARY_SCOPE = 'user'
+RAG_LIBRARY_SHARDS = 4
+# FAISS index per document: 'flat', 'ivf_flat', 'ivf_pq', 'hnsw' or 'auto' (chosen by chunk count).
+# 'sq_fp16', 'sq8' and 'pq' keep 2x, 4x and ~32x smaller vector codes in memory
+RAG_INDEX_TYPE = 'auto'
+# Overrides for the chosen type, e.g. {'nprobe': 16} or {'ef_search': 128}
+RAG_INDEX_PARAMS = {}
+# Quantized indexes fetch k * this many candidates and re-rank them with the float32 embeddings on disk
+RAG_RESCORE_FACTOR = 4
+# Fuse vector hits with BM25 keyword hits (reciprocal rank fusion) drawn from this many candidates each
+RAG_HYBRID_SEARCH = True
+RAG_HYBRID_CANDIDATES = 20
+# Coalesce concurrent single-question queries into one encode call: a batching thread sends a
+# batch once it holds RAG_QUERY_BATCH_MAX_SIZE questions or its oldest one has waited this
+# many milliseconds (0 disables it)
+RAG_QUERY_BATCH_WINDOW_MS = 0
+RAG_QUERY_BATCH_MAX_SIZE = 32
+# Most questions accepted by one call to api/query/batch/
+RAG_MAX_BATCH_QUERIES = 64
+# Most results (k) an API client may ask for per question
+RAG_MAX_K = 50
+# Threads running encode/search for the async query views, how many more requests may
+# wait for one (beyond that clients get 429), and the per-request timeout in seconds
+RAG_QUERY_WORKERS = 4
+RAG_QUERY_MAX_PENDING = 256
+RAG_QUERY_TIMEOUT = 30
+# Most recently updated document indexes loaded by the gunicorn master before forking
+# workers (see gunicorn.conf.py); None preloads every processed document
+RAG_PRELOAD_INDEXES = 100
+# Budget for the answer context assembled from the retrieved chunks (None for no limit);
+# tokens are counted with tiktoken's cl100k_base encoding
+RAG_CONTEXT_MAX_CHARS = None
+RAG_CONTEXT_MAX_TOKENS = 1024
+# Rows per page of the document list and query history, and the most api/history/ returns
+RAG_PAGE_SIZE = 50
+RAG_MAX_PAGE_SIZE = 200
+# Fraction of queries and ingestion jobs run under cProfile, dumped to RAG_PROFILE_DIR
+RAG_PROFILE_SAMPLE_RATE = 0.0
+RAG_PROFILE_DIR = BASE_DIR / 'profiles'
+# Bearer token letting a Prometheus scraper read /metrics without a staff session
+RAG_METRICS_TOKEN = None
+# Answer generation after retrieval: 'extractive' (no model, answers with the context itself),
+# 'openai' (any OpenAI-compatible server; `python manage.py llm_stub` runs a local stand-in)
+# or 'llama_cpp' (a quantized GGUF model on the CPU; RAG_GENERATOR_MODEL is its file path)
+RAG_GENERATOR = 'extractive'
+RAG_GENERATOR_MODEL = 'qwen2.5-1.5b-instruct'
+RAG_GENERATOR_BASE_URL = 'http://127.0.0.1:8080/v1'
+RAG_GENERATOR_API_KEY = None
+RAG_GENERATOR_MAX_TOKENS = 512
+RAG_GENERATOR_TEMPERATURE = 0.0
+# llama_cpp only: context window and CPU threads (None lets llama.cpp choose)
+RAG_GENERATOR_CONTEXT_TOKENS = 4096
+RAG_GENERATOR_THREADS = None
+# Concurrent generations, how many more may wait (beyond that clients get 429) and the
+# timeout in seconds after which the extractive answer is returned instead
+RAG_GENERATION_WORKERS = 1
+RAG_GENERATION_MAX_PENDING = 16
+RAG_GENERATION_TIMEOUT = 120
+# Generated answers kept per (model, context, question), for RAG_ANSWER_CACHE_TTL seconds (0 disables it)
+RAG_ANSWER_CACHE_SIZE = 1024
+RAG_ANSWER_CACHE_TTL = 3600
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -0,0 +1,134 @@
+"""Compare recall@k and query latency of the approximate index types against exact flat search.
+
+Usage (from the ML/ directory):
+
+    # Real embeddings from a processed document
+    python -m benchmarks.ann_recall --embeddings media/indexes/document_1_<version>/embeddings.npy
+    # Synthetic clustered vectors shaped like all-MiniLM-L6-v2 output
+    python -m benchmarks.ann_recall --num-vectors 500000 --dimension 384 --json ann.json
+
+Queries are perturbed copies of corpus vectors, searched one at a time (the way the query
+views search). Ground truth comes from IndexFlatL2. Quantized types (sq_fp16, sq8, pq, ivf_pq)
+are also measured with their top k * --rescore-factor candidates re-ranked exactly, as the
+query path does.
+"""
+import argparse
+import json
+import time
+import numpy as np
+from model.index_factory import (
+    INDEX_TYPES, QUANTIZED_TYPES, apply_search_params, build_index_from_vectors, index_memory_bytes, rescore,
+)
+
+
+def synthetic_vectors(num_vectors: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors drawn around random cluster centres, roughly like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((max(num_vectors // 1000, 16), dimension)).astype(np.float32)
+    vectors = centres[rng.integers(0, len(centres), num_vectors)]
+    vectors += 0.5 * rng.standard_normal((num_vectors, dimension)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def percentile_ms(latencies, q) -> float:
+    return float(np.percentile(latencies, q) * 1000)
+
+
+def measure(index, queries: np.ndarray, truth: np.ndarray, k: int,
+            vectors: np.ndarray = None, rescore_factor: int = 1) -> dict:
+    latencies = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        if rescore_factor > 1:
+            _, ids = index.search(query[None, :], k * rescore_factor)
+            _, top = rescore(vectors, query, ids[0], k)
+        else:
+            _, ids = index.search(query[None, :], k)
+            top = ids[0]
+        latencies.append(time.perf_counter() - start)
+        found.append(top)
+    recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+    return {
+        'recall_at_k': float(recall),
+        'p50_ms': percentile_ms(latencies, 50),
+        'p95_ms': percentile_ms(latencies, 95),
+        'p99_ms': percentile_ms(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--embeddings', help='.npy file of corpus vectors (memory-mapped).')
+    parser.add_argument('--num-vectors', type=int, default=100_000)
+    parser.add_argument('--dimension', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--types', nargs='+', default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument('--nprobe', type=int, nargs='*', default=[], help='Extra nprobe values to sweep for IVF types.')
+    parser.add_argument('--ef-search', type=int, nargs='*', default=[], help='Extra efSearch values to sweep for HNSW.')
+    parser.add_argument('--rescore-factor', type=int, default=4,
+                        help='Candidates per result re-ranked for quantized types (1 disables).')
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    if args.embeddings:
+        vectors = np.load(args.embeddings, mmap_mode='r')
+    else:
+        vectors = synthetic_vectors(args.num_vectors, args.dimension)
+
+    rng = np.random.default_rng(1)
+    rows = rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)
+    queries = np.asarray(vectors[rows], dtype=np.float32)
+    queries += 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    flat, _, _ = build_index_from_vectors(vectors, 'flat')
+    _, truth = flat.search(queries, args.k)
+
+    results = []
+    for index_type in args.types:
+        start = time.perf_counter()
+        index, _, params = build_index_from_vectors(vectors, index_type)
+        build_seconds = time.perf_counter() - start
+
+        variants = [params]
+        if index_type.startswith('ivf'):
+            variants += [{**params, 'nprobe': nprobe} for nprobe in args.nprobe]
+        elif index_type == 'hnsw':
+            variants += [{**params, 'ef_search': ef} for ef in args.ef_search]
+
+        rescore_factors = [1]
+        if index_type in QUANTIZED_TYPES and args.rescore_factor > 1:
+            rescore_factors.append(args.rescore_factor)
+
+        for variant in variants:
+            apply_search_params(index, variant)
+            for rescore_factor in rescore_factors:
+                memory_bytes = index_memory_bytes(index)
+                row = {
+                    'index_type': index_type,
+                    'params': variant,
+                    'rescore_factor': rescore_factor,
+                    'num_vectors': len(vectors),
+                    'build_seconds': build_seconds,
+                    'memory_bytes': memory_bytes,
+                    'bytes_per_vector': memory_bytes / len(vectors),
+                    **measure(index, queries, truth, args.k, vectors, rescore_factor),
+                }
+                results.append(row)
+                print(
+                    f"{index_type:>9} {json.dumps(variant):<55} rescore={rescore_factor}  "
+                    f"recall@{args.k}={row['recall_at_k']:.3f}  "
+                    f"p50={row['p50_ms']:.2f}ms  p95={row['p95_ms']:.2f}ms  p99={row['p99_ms']:.2f}ms  "
+                    f"mem={memory_bytes / 2**20:.1f}MB ({row['bytes_per_vector']:.0f}B/vector)  "
+                    f"build={build_seconds:.1f}s"
+                )
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Compare the structure-aware TextChunker with langchain's RecursiveCharacterTextSplitter.
+
+Usage (from the ML/ directory):
+
+    python -m benchmarks.chunking --pdf media/documents/constitution.pdf
+    python -m benchmarks.chunking --pages 2000 --json chunking.json
+
+The langchain side reproduces the old RAGProcessor.chunk_text: split_text() and a langchain
+Document per chunk. The native side returns (start, end) offsets. Peak memory is measured
+with tracemalloc, so it counts Python allocations made while chunking.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from model.chunking import HEADING_RE, TextChunker
+from model.pdf_extraction import iter_page_results
+from .synthetic_pdf import synthetic_pages
+
+
+def synthetic_text(num_pages: int, seed: int = 0) -> str:
+    """Constitution-like text: ~50 lines a page with an article heading every dozen lines."""
+    return "\n".join(line for page in synthetic_pages(num_pages, seed=seed) for line in page) + "\n"
+
+
+def run(name: str, split, to_spans, text: str, repeat: int) -> dict:
+    """Time split(text) and trace its peak memory; to_spans turns its result into offsets afterwards."""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        split(text)
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = split(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    spans = to_spans(text, result)
+
+    lengths = [end - start for start, end in spans]
+    at_heading = sum(1 for start, _ in spans if HEADING_RE.match(text, start))
+    best = min(seconds)
+    return {
+        'splitter': name,
+        'chunks': len(spans),
+        'mean_chunk_chars': sum(lengths) / max(len(lengths), 1),
+        'chunks_starting_at_heading': at_heading / max(len(spans), 1),
+        'seconds': best,
+        'mb_per_second': len(text) / 2**20 / best,
+        'peak_memory_mb': peak / 2**20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pdf', help='Chunk the text of this PDF instead of synthetic text.')
+    parser.add_argument('--pages', type=int, default=1000, help='Synthetic pages to generate.')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--chunk-overlap', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='Write results to this file.')
+    args = parser.parse_args()
+
+    if args.pdf:
+        text = "".join(page_text + "\n" for _, page_text, _ in iter_page_results(args.pdf))
+    else:
+        text = synthetic_text(args.pages)
+
+    recursive = RecursiveCharacterTextSplitter(
+        chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, length_function=len
+    )
+    chunker = TextChunker(args.chunk_size, args.chunk_overlap)
+
+    def langchain_split(text):
+        return [Document(page_content=chunk) for chunk in recursive.split_text(text)]
+
+    def langchain_spans(text, documents):
+        # Only recovered for reporting; find() walks forward through the text
+        spans, position = [], 0
+        for document in documents:
+            start = text.find(document.page_content, position)
+            spans.append((start, start + len(document.page_content)))
+            position = start + 1
+        return spans
+
+    results = [
+        run('langchain', langchain_split, langchain_spans, text, args.repeat),
+        run('native', chunker.split, lambda text, spans: spans, text, args.repeat),
+    ]
+    print(f"{len(text) / 2**20:.1f} MB of text")
+    for row in results:
+        print(
+            f"{row['splitter']:>10}  {row['chunks']:>7} chunks  mean={row['mean_chunk_chars']:.0f} chars  "
+            f"at heading={row['chunks_starting_at_heading']:.0%}  {row['seconds']:.2f}s  "
+            f"{row['mb_per_second']:.1f} MB/s  peak={row['peak_memory_mb']:.1f} MB"
+        )
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Record the resident memory curve of RAGProcessor.process_pdf on a PDF.
+
+Usage (from the ML/ directory):
+
+    python -m benchmarks.ingest_memory path/to/large.pdf --batch-sizes 64 256 1024 --csv memory.csv
+
+For each batch size the PDF is ingested in a fresh process while a sampler thread
+records RSS every --interval seconds. Peak RSS should stay roughly flat as the
+document grows and move with the batch size instead.
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (Linux /proc, falling back to peak RSS)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RSSSampler(threading.Thread):
+    def __init__(self, interval: float):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._stopped = threading.Event()
+
+    def run(self):
+        start = time.perf_counter()
+        while not self._stopped.is_set():
+            self.samples.append((time.perf_counter() - start, current_rss_bytes()))
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def _ingest(pdf_path: str, model_name: str, batch_size: int, interval: float, queue):
+    from model.embedding_registry import get_embedding_model
+    from model.rag_processor import RAGProcessor
+
+    # Load the model first so its weights form the baseline rather than part of the curve
+    get_embedding_model(model_name)
+    baseline = current_rss_bytes()
+
+    sampler = RSSSampler(interval)
+    sampler.start()
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as work_dir:
+        rag_processor = RAGProcessor(model_name=model_name, batch_size=batch_size, work_dir=work_dir)
+        result = rag_processor.process_pdf(pdf_path)
+        rag_processor.cleanup()
+    elapsed = time.perf_counter() - start
+    sampler.stop()
+    queue.put({
+        'batch_size': batch_size,
+        'baseline_rss': baseline,
+        'peak_rss': max(rss for _, rss in sampler.samples),
+        'seconds': elapsed,
+        'num_chunks': result.get('num_chunks', 0),
+        'num_pages': result.get('num_pages', 0),
+        'samples': sampler.samples,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pdf_path')
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[64, 256, 1024])
+    parser.add_argument('--interval', type=float, default=0.05, help='Seconds between RSS samples.')
+    parser.add_argument('--csv', help='Write the full (batch_size, seconds, rss_bytes) curve to this file.')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    runs = []
+    for batch_size in args.batch_sizes:
+        # A fresh process per run so allocator state from earlier runs does not leak into the curve
+        queue = context.Queue()
+        process = context.Process(target=_ingest, args=(args.pdf_path, args.model, batch_size, args.interval, queue))
+        process.start()
+        run = queue.get()
+        process.join()
+        runs.append(run)
+        print(
+            f"batch_size={batch_size:>6}  pages={run['num_pages']}  chunks={run['num_chunks']}  "
+            f"time={run['seconds']:.1f}s  baseline={run['baseline_rss'] / 2**20:.0f}MB  "
+            f"peak={run['peak_rss'] / 2**20:.0f}MB  "
+            f"growth={(run['peak_rss'] - run['baseline_rss']) / 2**20:.0f}MB"
+        )
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['batch_size', 'seconds', 'rss_bytes'])
+            for run in runs:
+                for seconds, rss in run['samples']:
+                    writer.writerow([run['batch_size'], f"{seconds:.3f}", rss])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,351 @@
+"""End-to-end retrieval benchmark: ingestion throughput, index load time and query latency.
+
+Usage (from the ML/ directory):
+
+    python -m benchmarks.retrieval --pages 500 --json results.json
+    python -m benchmarks.retrieval --pdf media/documents/constitution.pdf --concurrency 1 8 32
+    python -m benchmarks.retrieval --pages 500 --json new.json --compare results.json
+    # Load-test a running server instead of the in-process ASGI stack
+    python -m benchmarks.retrieval --pages 500 --url http://127.0.0.1:8000 --document-id 3
+
+Steps, all on the same synthetic (or given) PDF:
+
+1. ingestion: RAGProcessor.process_pdf + save_index in a fresh process, reporting pages/s,
+   chunks/s, per-stage seconds and peak RSS (sampled as in benchmarks.ingest_memory);
+2. index load: RAGProcessor.load_index of the saved index, repeated --load-repeats times;
+3. similarity_search: every question at each --concurrency level on a thread pool;
+4. api_query: the same questions POSTed at each concurrency level, through Django's ASGI
+   stack in-process (temporary SQLite database) or to --url.
+
+Questions are unique so the query caches never answer them. --json writes every number
+with the run's settings and git commit; --compare prints the relative change of each metric
+against an earlier --json file.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+import numpy as np
+from .ingest_memory import RSSSampler, current_rss_bytes
+from .synthetic_pdf import WORDS, synthetic_pages, write_pdf
+
+
+def latency_summary(latencies: List[float], wall_seconds: float) -> Dict[str, float]:
+    """Percentiles in milliseconds plus throughput for one batch of timed requests."""
+    ms = np.asarray(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'max_ms': float(ms.max()),
+        'requests_per_second': len(latencies) / wall_seconds,
+    }
+
+
+def synthetic_questions(count: int, seed: int = 1) -> List[str]:
+    """Distinct questions in the vocabulary of the synthetic PDF."""
+    rng = random.Random(seed)
+    return [
+        f"What does Article {rng.randint(1, 500)} say about {rng.choice(WORDS)} {rng.choice(WORDS)}? ({i})"
+        for i in range(count)
+    ]
+
+
+def _ingest(pdf_path: str, index_dir: str, model_name: str, batch_size: int, index_type: str,
+            interval: float, queue):
+    from model.embedding_registry import get_embedding_model
+    from model.rag_processor import RAGProcessor
+
+    # Load the model first so its weights form the baseline rather than part of the peak
+    get_embedding_model(model_name)
+    baseline = current_rss_bytes()
+
+    sampler = RSSSampler(interval)
+    sampler.start()
+    start = time.perf_counter()
+    rag_processor = RAGProcessor(model_name=model_name, batch_size=batch_size,
+                                 work_dir=os.path.dirname(index_dir), index_type=index_type)
+    result = rag_processor.process_pdf(pdf_path)
+    if 'error' not in result:
+        rag_processor.save_index(index_dir)
+    rag_processor.cleanup()
+    seconds = time.perf_counter() - start
+    sampler.stop()
+
+    if 'error' in result:
+        queue.put(result)
+        return
+    queue.put({
+        'pages': result['num_pages'],
+        'chunks': result['num_chunks'],
+        'seconds': seconds,
+        'pages_per_second': result['num_pages'] / seconds,
+        'chunks_per_second': result['num_chunks'] / seconds,
+        'stage_seconds': result['stage_seconds'],
+        'baseline_rss_mb': baseline / 2**20,
+        'peak_rss_mb': max(rss for _, rss in sampler.samples) / 2**20,
+        'index_type': result['index_type'],
+        'index_params': result['index_params'],
+        'index_bytes_per_chunk': result['index_bytes_per_chunk'],
+    })
+
+
+def bench_ingestion(pdf_path: str, index_dir: str, args) -> Dict[str, Any]:
+    # A fresh process so the peak RSS is not inflated by anything this process loaded
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_ingest, args=(
+        pdf_path, index_dir, args.model, args.batch_size, args.index_type, args.interval, queue
+    ))
+    process.start()
+    result = queue.get()
+    process.join()
+    if 'error' in result:
+        raise SystemExit(f"Ingestion failed: {result['error']}")
+    return result
+
+
+def bench_index_load(index_dir: str, index_type: str, index_params: Dict[str, Any], args) -> Dict[str, Any]:
+    from model.index_factory import apply_search_params
+    from model.rag_processor import RAGProcessor
+
+    seconds = []
+    for _ in range(args.load_repeats):
+        start = time.perf_counter()
+        rag_processor = RAGProcessor(model_name=args.model, index_type=index_type)
+        if not rag_processor.load_index(index_dir):
+            raise SystemExit(f"Could not load the index in {index_dir}")
+        apply_search_params(rag_processor.index, index_params)
+        seconds.append(time.perf_counter() - start)
+    return {
+        'first_ms': seconds[0] * 1000,
+        'median_ms': float(np.median(seconds) * 1000),
+        'memory_usage_mb': rag_processor.memory_usage() / 2**20,
+    }
+
+
+def run_threaded(call: Callable[[str], Any], questions: List[str], concurrency: int) -> Dict[str, float]:
+    def timed(question):
+        start = time.perf_counter()
+        call(question)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, questions))
+    return latency_summary(latencies, time.perf_counter() - start)
+
+
+def bench_similarity_search(index_dir: str, index_type: str, index_params: Dict[str, Any],
+                            questions: List[str], args) -> Dict[str, Any]:
+    from model.index_factory import apply_search_params
+    from model.rag_processor import RAGProcessor
+
+    rag_processor = RAGProcessor(model_name=args.model, index_type=index_type)
+    rag_processor.load_index(index_dir)
+    apply_search_params(rag_processor.index, index_params)
+    rag_processor.encode_queries(questions[:1])  # warm up the model
+    return {
+        str(concurrency): run_threaded(lambda question: rag_processor.similarity_search(question, args.k),
+                                       questions, concurrency)
+        for concurrency in args.concurrency
+    }
+
+
+def setup_django(work_dir: str):
+    """Configure the project settings against a throwaway database and media root."""
+    import django
+    from django.conf import settings
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ML.settings')
+    settings.DATABASES['default']['NAME'] = os.path.join(work_dir, 'benchmark.sqlite3')
+    settings.MEDIA_ROOT = work_dir
+    django.setup()
+    from django.core.management import call_command
+    from django.test.utils import setup_test_environment
+    setup_test_environment()  # lets the test client's "testserver" host through ALLOWED_HOSTS
+    call_command('migrate', verbosity=0)
+
+
+def create_document(pdf_path: str, index_dir: str, ingestion: Dict[str, Any], model_name: str) -> int:
+    from django.contrib.auth.models import User
+    from model.models import Document, RAGIndex
+
+    user = User.objects.create_user('benchmark')
+    document = Document.objects.create(
+        title='benchmark', file_path=pdf_path, uploaded_by=user, file_size=os.path.getsize(pdf_path),
+        is_processed=True, num_chunks=ingestion['chunks'], status=Document.STATUS_PROCESSED, progress=100,
+    )
+    RAGIndex.objects.create(
+        document=document, index_path=index_dir, embedding_model=model_name,
+        index_type=ingestion['index_type'], index_params=ingestion['index_params'],
+    )
+    return document.id
+
+
+async def _post_concurrently(document_id: int, questions: List[str], concurrency: int) -> Dict[str, Any]:
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses: Dict[str, int] = {}
+
+    async def timed(question):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(
+                '/api/query/', json.dumps({'document_id': document_id, 'question': question}),
+                content_type='application/json',
+            )
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+            return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(timed(question) for question in questions))
+    return {**latency_summary(latencies, time.perf_counter() - start), 'status_codes': statuses}
+
+
+def _post_over_http(url: str, document_id: int, questions: List[str], concurrency: int) -> Dict[str, Any]:
+    statuses: Dict[str, int] = {}
+
+    def post(question):
+        request = urllib.request.Request(
+            url.rstrip('/') + '/api/query/',
+            data=json.dumps({'document_id': document_id, 'question': question}).encode(),
+            headers={'Content-Type': 'application/json'},
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                status = response.status
+                response.read()
+        except urllib.error.HTTPError as e:
+            status = e.code
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    summary = run_threaded(post, questions, concurrency)
+    return {**summary, 'status_codes': statuses}
+
+
+def bench_api_query(document_id: int, questions: List[str], args) -> Dict[str, Any]:
+    results = {}
+    for concurrency in args.concurrency:
+        if args.url:
+            results[str(concurrency)] = _post_over_http(args.url, document_id, questions, concurrency)
+        else:
+            results[str(concurrency)] = asyncio.run(_post_concurrently(document_id, questions, concurrency))
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def flatten(results: Dict[str, Any], prefix: str = '') -> Dict[str, float]:
+    """Numeric leaves of a results dict keyed by their dotted path."""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(results: Dict[str, Any], baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = flatten({k: v for k, v in json.load(f).items() if k != 'meta'})
+    current = flatten({k: v for k, v in results.items() if k != 'meta'})
+    print(f"\nChange against {baseline_path}:")
+    for path, value in current.items():
+        before = baseline.get(path)
+        if before:
+            print(f"  {path:<55} {before:>12.3f} -> {value:>12.3f}  ({(value - before) / before:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pdf', help='Benchmark this PDF instead of a synthetic one.')
+    parser.add_argument('--pages', type=int, default=200, help='Pages of the synthetic PDF.')
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--index-type', default='auto')
+    parser.add_argument('--queries', type=int, default=200, help='Questions per concurrency level.')
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--load-repeats', type=int, default=5)
+    parser.add_argument('--interval', type=float, default=0.05, help='Seconds between RSS samples.')
+    parser.add_argument('--url', help='Send api_query load to this running server instead of in-process.')
+    parser.add_argument('--document-id', type=int, help='Document to query on --url (required with it).')
+    parser.add_argument('--json', help='Write results to this file.')
+    parser.add_argument('--compare', help='Earlier --json results to compare against.')
+    args = parser.parse_args()
+    if args.url and not args.document_id:
+        parser.error('--url needs --document-id of a processed document on that server')
+
+    with tempfile.TemporaryDirectory(prefix='rag_benchmark_') as work_dir:
+        pdf_path = args.pdf
+        if not pdf_path:
+            pdf_path = os.path.join(work_dir, 'synthetic.pdf')
+            write_pdf(pdf_path, synthetic_pages(args.pages))
+        index_dir = os.path.join(work_dir, 'index')
+        questions = synthetic_questions(args.queries)
+
+        results: Dict[str, Any] = {'meta': {
+            'git_commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pdf': args.pdf or f'synthetic:{args.pages}',
+            'pdf_bytes': os.path.getsize(pdf_path),
+            'args': vars(args),
+        }}
+
+        print(f"Ingesting {results['meta']['pdf']} ...")
+        results['ingestion'] = ingestion = bench_ingestion(pdf_path, index_dir, args)
+        print(f"  {ingestion['pages']} pages, {ingestion['chunks']} chunks in {ingestion['seconds']:.1f}s "
+              f"({ingestion['pages_per_second']:.1f} pages/s, {ingestion['chunks_per_second']:.1f} chunks/s), "
+              f"peak RSS {ingestion['peak_rss_mb']:.0f} MB")
+
+        setup_django(work_dir)
+        results['index_load'] = bench_index_load(index_dir, ingestion['index_type'], ingestion['index_params'], args)
+        print(f"  index load: first {results['index_load']['first_ms']:.1f} ms, "
+              f"median {results['index_load']['median_ms']:.1f} ms")
+
+        results['similarity_search'] = bench_similarity_search(
+            index_dir, ingestion['index_type'], ingestion['index_params'], questions, args
+        )
+        document_id = args.document_id or create_document(pdf_path, index_dir, ingestion, args.model)
+        results['api_query'] = bench_api_query(document_id, questions, args)
+
+    for name in ('similarity_search', 'api_query'):
+        for concurrency, row in results[name].items():
+            print(f"  {name:<17} c={concurrency:<3} p50={row['p50_ms']:.1f}ms p95={row['p95_ms']:.1f}ms "
+                  f"p99={row['p99_ms']:.1f}ms  {row['requests_per_second']:.0f} req/s"
+                  + (f"  status={row['status_codes']}" if 'status_codes' in row else ''))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, default=str)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Generate constitution-like PDFs of any size for benchmarks.
+
+Usage (from the ML/ directory):
+
+    python -m benchmarks.synthetic_pdf synthetic.pdf --pages 2000
+
+Pages hold ~50 lines of text with an "Article N." heading every dozen lines or so, so
+chunking and retrieval behave roughly as on the real constitution. Output is deterministic
+for a given --seed. The PDF is written directly (one Helvetica text object per page), so
+no PDF library is needed.
+"""
+import argparse
+import random
+from typing import List
+
+WORDS = (
+    "state law shall parliament citizen right freedom equality court president union territory "
+    "schedule amendment provided that legislature government public order any person such"
+).split()
+
+
+def synthetic_pages(num_pages: int, lines_per_page: int = 50, seed: int = 0) -> List[List[str]]:
+    """Lines of text per page, with an article heading on about 8% of the lines."""
+    rng = random.Random(seed)
+    pages = []
+    article = 1
+    for _ in range(num_pages):
+        lines = []
+        for _ in range(lines_per_page):
+            if rng.random() < 0.08:
+                lines.append(f"Article {article}. {rng.choice(WORDS).capitalize()} of {rng.choice(WORDS)}")
+                article += 1
+            else:
+                lines.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 16))) + ".")
+        pages.append(lines)
+    return pages
+
+
+def _pdf_string(text: str) -> bytes:
+    escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return b"(" + escaped.encode('latin-1', 'replace') + b")"
+
+
+def write_pdf(path: str, pages: List[List[str]]):
+    """Write pages of text lines as a minimal single-font PDF."""
+    # Objects 1-3 are the catalog, the page tree and the font; each page adds contents + page
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for lines in pages:
+        content = b"BT /F1 10 Tf 40 800 Td 12 TL " + b" ".join(_pdf_string(line) + b" '" for line in lines) + b" ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 3 0 R >> >> >>" % (len(objects))
+        )
+        page_ids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % page_id for page_id in page_ids), len(page_ids)
+    )
+
+    with open(path, 'wb') as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        f.writelines(b"%010d 00000 n \n" % offset for offset in offsets)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path')
+    parser.add_argument('--pages', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_pdf(args.path, synthetic_pages(args.pages, seed=args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Gunicorn settings for serving the ASGI app with workers that share read-only index memory.
+
+Usage (from the ML/ directory):
+
+    gunicorn -c gunicorn.conf.py
+
+With preload_app the master imports Django, loads the embedding models and the most recently
+updated document indexes (see model.serving.preload) and only then forks the workers, which
+inherit all of it copy-on-write instead of each loading their own copy. Index files are
+memory-mapped read-only, so they are shared through the page cache either way.
+
+Environment: BIND (default 127.0.0.1:8000), WEB_CONCURRENCY (workers, default 4) and
+RAG_PRELOAD=0 to skip preloading and let each worker load lazily.
+"""
+import os
+import random
+
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+worker_class = 'uvicorn.workers.UvicornWorker'
+wsgi_app = 'ML.asgi:application'
+preload_app = os.environ.get('RAG_PRELOAD', '1') != '0'
+# Requests slower than RAG_QUERY_TIMEOUT already get a 504; this only catches stuck workers
+timeout = 120
+
+
+def when_ready(server):
+    """Runs in the master after the app is imported and before any worker is forked."""
+    if not preload_app:
+        return
+    from model.serving import preload, process_memory
+    result = preload()
+    server.log.info(
+        "Preloaded %d document indexes (%d library vectors); master RSS %.0f MB",
+        result['indexes'], result['library_vectors'], process_memory().get('rss_bytes', 0) / 2**20,
+    )
+
+
+def post_fork(server, worker):
+    # Forked workers would otherwise share the master's random state (e.g. profiling samples)
+    random.seed()
@@ -1,11 +1,11 @@
 from django.contrib import admin
-from .models import Document, DocumentChunk, Query, RAGIndex
+from .models import Document, DocumentChunk, Query, RAGIndex, IngestionJob
 
 
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
-    list_display = ['title', 'uploaded_by', 'upload_date', 'is_processed', 'num_chunks']
-    list_filter = ['is_processed', 'upload_date']
+    list_display = ['title', 'uploaded_by', 'upload_date', 'status', 'progress', 'num_chunks']
+    list_filter = ['status', 'is_processed', 'upload_date']
     search_fields = ['title', 'uploaded_by__username']
     readonly_fields = ['upload_date']
 
@@ -19,14 +19,23 @@ class DocumentChunkAdmin(admin.ModelAdmin):
 
 @admin.register(Query)
 class QueryAdmin(admin.ModelAdmin):
-    list_display = ['user', 'document', 'created_at', 'response_time']
-    list_filter = ['created_at']
+    list_display = ['user', 'document', 'created_at', 'response_time', 'generation_model',
+                    'prompt_tokens', 'completion_tokens', 'generation_time']
+    list_filter = ['created_at', 'generation_model']
     search_fields = ['user__username', 'question', 'document__title']
     readonly_fields = ['created_at']
 
 
 @admin.register(RAGIndex)
 class RAGIndexAdmin(admin.ModelAdmin):
-    list_display = ['document', 'embedding_model', 'created_at', 'updated_at']
-    list_filter = ['embedding_model', 'created_at']
+    list_display = ['document', 'embedding_model', 'index_type', 'created_at', 'updated_at']
+    list_filter = ['embedding_model', 'index_type', 'created_at']
     readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(IngestionJob)
+class IngestionJobAdmin(admin.ModelAdmin):
+    list_display = ['document', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['document__title', 'last_error']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
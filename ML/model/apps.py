@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ModelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'model'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        
+        warmup_models = getattr(settings, 'RAG_WARMUP_MODELS', [])
+        if warmup_models:
+            from .embedding_registry import warm_up
+            warm_up(warmup_models)
@@ -0,0 +1,165 @@
+import hashlib
+import mmap
+import os
+from typing import Iterable, Iterator, Optional, Tuple
+import numpy as np
+
+
+CHUNKS_FILE = 'chunks.bin'
+OFFSETS_FILE = 'chunk_offsets.npy'
+# (first page, last page) of every chunk; absent for chunk stores written without page numbers
+PAGES_FILE = 'chunk_pages.npy'
+# (start, end) character offsets of every chunk in the document text; absent when unknown
+SPANS_FILE = 'chunk_spans.npy'
+
+
+def content_hash(text: str) -> str:
+    """Stable identity of a chunk's text, used to match chunks across document versions."""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class ChunkStoreWriter:
+    """Append chunks to a chunk store one at a time without holding them in memory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._file = open(os.path.join(directory, CHUNKS_FILE), 'wb')
+        self._offsets = [0]
+        self._pages = []
+        self._spans = []
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def append(self, text: str, pages: Optional[Tuple[int, int]] = None, span: Optional[Tuple[int, int]] = None):
+        if pages is not None:
+            self._pages.append(pages)
+        if span is not None:
+            self._spans.append(span)
+        data = text.encode('utf-8')
+        self._file.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+
+    def abort(self):
+        """Close the text file without writing the rest of the store."""
+        self._file.close()
+
+    def close(self) -> int:
+        self._file.close()
+        np.save(os.path.join(self.directory, OFFSETS_FILE), np.array(self._offsets, dtype=np.int64))
+        if self._pages and len(self._pages) == len(self):
+            np.save(os.path.join(self.directory, PAGES_FILE), np.array(self._pages, dtype=np.int32))
+        if self._spans and len(self._spans) == len(self):
+            np.save(os.path.join(self.directory, SPANS_FILE), np.array(self._spans, dtype=np.int64))
+        return len(self)
+
+
+def write_chunk_store(directory: str, texts: Iterable[str]) -> int:
+    """Write chunk texts as one UTF-8 blob plus an array of byte offsets."""
+    writer = ChunkStoreWriter(directory)
+    for text in texts:
+        writer.append(text)
+    return writer.close()
+
+
+class Chunk:
+    """Handle on one chunk of a ChunkStore; its text is only decoded when asked for.
+
+    Exposes page_content and metadata like the langchain Document it replaces, without
+    a per-chunk string copy or metadata dict.
+    """
+
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store: 'ChunkStore', index: int):
+        self.store = store
+        self.index = index
+
+    @property
+    def page_content(self) -> str:
+        return self.store.text(self.index)
+
+    @property
+    def pages(self) -> Optional[Tuple[int, int]]:
+        return self.store.pages(self.index)
+
+    @property
+    def metadata(self) -> dict:
+        pages = self.pages
+        return {'pages': pages} if pages else {}
+
+    def __repr__(self) -> str:
+        return f"Chunk({self.index})"
+
+
+class ChunkStore:
+    """Read-only view over chunks as one UTF-8 buffer plus an array of byte offsets.
+
+    Stores opened from a directory written by write_chunk_store are memory-mapped, so only
+    the pages backing the chunks that are actually accessed are read from disk.
+    """
+
+    def __init__(self, directory: str):
+        self.offsets = np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode='r')
+        pages_path = os.path.join(directory, PAGES_FILE)
+        self.page_ranges = np.load(pages_path, mmap_mode='r') if os.path.exists(pages_path) else None
+        spans_path = os.path.join(directory, SPANS_FILE)
+        self.char_spans = np.load(spans_path, mmap_mode='r') if os.path.exists(spans_path) else None
+        self.is_mapped = True
+        with open(os.path.join(directory, CHUNKS_FILE), 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._buffer = b''
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str]) -> 'ChunkStore':
+        """Build an in-memory store, e.g. for chunks loaded from a legacy pickle."""
+        encoded = [text.encode('utf-8') for text in texts]
+        store = cls.__new__(cls)
+        store.offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(data) for data in encoded], out=store.offsets[1:])
+        store.page_ranges = None
+        store.char_spans = None
+        store.is_mapped = False
+        store._buffer = b''.join(encoded)
+        return store
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._buffer) + self.offsets.nbytes
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def text(self, idx: int) -> str:
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        return self._buffer[start:end].decode('utf-8')
+
+    def pages(self, idx: int) -> Optional[Tuple[int, int]]:
+        if self.page_ranges is None:
+            return None
+        first, last = self.page_ranges[idx]
+        return int(first), int(last)
+
+    def span(self, idx: int) -> Optional[Tuple[int, int]]:
+        """Character offsets of a chunk in its document's text, if they were recorded."""
+        if self.char_spans is None:
+            return None
+        start, end = self.char_spans[idx]
+        return int(start), int(end)
+
+    def __getitem__(self, idx: int) -> Chunk:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return Chunk(self, idx)
+
+    def __iter__(self) -> Iterator[Chunk]:
+        for idx in range(len(self)):
+            yield Chunk(self, idx)
+
+    def texts(self) -> Iterator[str]:
+        for idx in range(len(self)):
+            yield self.text(idx)
@@ -0,0 +1,129 @@
+import re
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
+
+
+# Lines opening a new article, section, part, chapter or schedule ("Article 370", "PART III",
+# "Seventh Schedule"); chunks prefer to end right before one of these
+HEADING_RE = re.compile(
+    r"^[ \t]*(?:(?:Article|ARTICLE|Section|SECTION|Part|PART|Chapter|CHAPTER|Schedule|SCHEDULE)[ \t]+"
+    r"(?:\d+[A-Z]?|[IVXLCDM]+)\b|[A-Z][A-Za-z]+[ \t]+(?:Schedule|SCHEDULE)\b)",
+    re.MULTILINE,
+)
+
+# Fallback break points, strongest first
+SEPARATORS = ("\n\n", "\n", ". ", " ")
+
+WHITESPACE_RE = re.compile(r"\s")
+
+
+class ChunkSpan(NamedTuple):
+    """Character offsets of a chunk in the document text and the pages it spans."""
+    start: int
+    end: int
+    first_page: int
+    last_page: int
+
+
+class TextChunker:
+    """Split text into overlapping chunks described by (start, end) offsets.
+
+    A chunk ends right before the last structural heading that leaves it at least
+    min_chunk_size characters, otherwise after the last paragraph, line, sentence or word
+    break within chunk_size. Chunks ending at a heading do not overlap the next one, so an
+    article never bleeds into its neighbour; others overlap it by about chunk_overlap
+    characters, starting on a word boundary.
+    """
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, min_chunk_size: int = None):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.min_chunk_size = chunk_size // 5 if min_chunk_size is None else min_chunk_size
+
+    def _break(self, text: str, start: int) -> Tuple[int, int]:
+        """Return (end, next_start) for a chunk of text beginning at start."""
+        lowest = start + max(self.min_chunk_size, 1)
+        limit = start + self.chunk_size
+
+        heading = None
+        for match in HEADING_RE.finditer(text, lowest, limit):
+            heading = match.start()
+        if heading is not None:
+            return heading, heading
+
+        for separator in SEPARATORS:
+            position = text.rfind(separator, lowest, limit)
+            if position != -1:
+                end = position + len(separator)
+                break
+        else:
+            end = limit
+
+        # Start the overlap on a word boundary, always moving forward
+        overlap_from = max(end - self.chunk_overlap, start + 1)
+        space = WHITESPACE_RE.search(text, overlap_from, end)
+        return end, space.end() if space else end
+
+    @staticmethod
+    def _strip(text: str, start: int, end: int) -> Tuple[int, int]:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return start, end
+
+    def split(self, text: str) -> List[Tuple[int, int]]:
+        """Return the (start, end) offsets of every chunk of text."""
+        spans = []
+        start = 0
+        while start < len(text):
+            if len(text) - start <= self.chunk_size:
+                end = next_start = len(text)
+            else:
+                end, next_start = self._break(text, start)
+            chunk_start, chunk_end = self._strip(text, start, end)
+            if chunk_end > chunk_start:
+                spans.append((chunk_start, chunk_end))
+            start = next_start
+        return spans
+
+    def iter_spans(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[str, ChunkSpan]]:
+        """Chunk a stream of (page_no, text) pages, yielding each chunk's text and span.
+
+        Offsets refer to the pages joined with newlines; only the text of the chunk being
+        cut is kept in memory. Produces the same chunks as split() on the joined text.
+        """
+        buffer = ""
+        base = 0  # offset of buffer[0] in the whole document
+        start = 0
+        page_starts: List[int] = []
+        page_numbers: List[int] = []
+
+        def emit(end):
+            chunk_start, chunk_end = self._strip(buffer, start, end)
+            if chunk_end <= chunk_start:
+                return None
+            first = bisect_right(page_starts, base + chunk_start) - 1
+            last = bisect_right(page_starts, base + chunk_end - 1) - 1
+            return buffer[chunk_start:chunk_end], ChunkSpan(
+                base + chunk_start, base + chunk_end, page_numbers[first], page_numbers[last]
+            )
+
+        for page_no, page_text in pages:
+            page_starts.append(base + len(buffer))
+            page_numbers.append(page_no)
+            buffer += page_text + "\n"
+            while len(buffer) - start > self.chunk_size:
+                end, next_start = self._break(buffer, start)
+                chunk = emit(end)
+                if chunk is not None:
+                    yield chunk
+                start = next_start
+            # Drop text no later chunk can reach
+            buffer = buffer[start:]
+            base += start
+            start = 0
+
+        chunk = emit(len(buffer))
+        if chunk is not None:
+            yield chunk
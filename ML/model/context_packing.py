@@ -0,0 +1,178 @@
+import math
+import threading
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_ENCODING = 'cl100k_base'
+SEPARATOR = "\n\n"
+# Longest overlap looked for between consecutive chunks that carry no offsets
+MAX_TEXT_OVERLAP = 1000
+
+
+class TokenCounter:
+    """Count and truncate text in tokens of a tiktoken encoding.
+
+    tiktoken fetches encoding files on first use (cached under TIKTOKEN_CACHE_DIR), so served
+    processes create the shared counter in serving.preload rather than in the first query.
+    When the encoding is unavailable (e.g. offline) this falls back to the usual estimate of
+    four characters per token.
+    """
+
+    def __init__(self, encoding_name: str = DEFAULT_ENCODING):
+        self.encoding_name = encoding_name
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            print(f"tiktoken encoding {encoding_name} unavailable, estimating tokens from length: {e}")
+            self._encoding = None
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        if self._encoding is None:
+            return math.ceil(len(text) / 4)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self._encoding is None:
+            return text[:max_tokens * 4]
+        tokens = self._encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else self._encoding.decode(tokens[:max_tokens])
+
+
+_counters: Dict[str, TokenCounter] = {}
+_counters_lock = threading.Lock()
+
+
+def get_token_counter(encoding_name: str = DEFAULT_ENCODING) -> TokenCounter:
+    """Return the shared TokenCounter for an encoding, creating it once per process."""
+    with _counters_lock:
+        counter = _counters.get(encoding_name)
+        if counter is None:
+            counter = _counters[encoding_name] = TokenCounter(encoding_name)
+        return counter
+
+
+def _text_overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is also a prefix of right."""
+    for size in range(min(len(left), len(right), MAX_TEXT_OVERLAP), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+class _Segment:
+    __slots__ = ('text', 'document_id', 'last_chunk', 'end', 'rank', 'chunks')
+
+    def __init__(self, hit: Dict[str, Any]):
+        self.text = hit["content"]
+        self.document_id = hit.get("document_id")
+        self.last_chunk = hit.get("chunk_index")
+        offsets = hit.get("offsets")
+        self.end = offsets[1] if offsets else None
+        self.rank = hit.get("rank", 0)
+        self.chunks = 1
+
+    def absorb(self, hit: Dict[str, Any]) -> bool:
+        """Extend this segment with a later chunk of the same document if the two touch."""
+        chunk_index = hit.get("chunk_index")
+        if chunk_index is None or self.last_chunk is None or hit.get("document_id") != self.document_id:
+            return False
+        offsets = hit.get("offsets")
+        text = hit["content"]
+        if offsets and self.end is not None and offsets[0] <= self.end:
+            # Overlapping spans: keep only the part past what the segment already holds
+            self.text += text[self.end - offsets[0]:]
+        elif chunk_index == self.last_chunk + 1:
+            # Consecutive chunks are contiguous up to the whitespace stripped between them
+            if offsets and self.end is not None:
+                self.text += "\n" + text
+            else:
+                overlap = _text_overlap(self.text, text)
+                self.text += text[overlap:] if overlap else "\n" + text
+        else:
+            return False
+        if offsets:
+            self.end = max(self.end, offsets[1]) if self.end is not None else offsets[1]
+        self.last_chunk = chunk_index
+        self.rank = min(self.rank, hit.get("rank", 0))
+        self.chunks += 1
+        return True
+
+
+def merge_hits(hits: List[Dict[str, Any]]) -> List[_Segment]:
+    """Merge overlapping or adjacent chunks of the same document, most relevant segment first.
+
+    Hits are dicts as produced by RAGProcessor.iter_hits or search_library; chunk_index and
+    offsets, when present, locate them in their document. Hits without a chunk_index stay
+    separate, and exact duplicates are dropped.
+    """
+    located = sorted(
+        (hit for hit in hits if hit.get("chunk_index") is not None),
+        key=lambda hit: (str(hit.get("document_id")), hit["chunk_index"]),
+    )
+    segments: List[_Segment] = []
+    for hit in located:
+        if not segments or not segments[-1].absorb(hit):
+            segments.append(_Segment(hit))
+
+    seen = {segment.text for segment in segments}
+    for hit in hits:
+        if hit.get("chunk_index") is None and hit["content"] not in seen:
+            seen.add(hit["content"])
+            segments.append(_Segment(hit))
+
+    segments.sort(key=lambda segment: segment.rank)
+    return segments
+
+
+def pack_context(hits: List[Dict[str, Any]], max_chars: Optional[int] = None, max_tokens: Optional[int] = None,
+                 counter: Optional[TokenCounter] = None) -> Dict[str, Any]:
+    """Assemble answer context from ranked hits without repeating text, within a size budget.
+
+    Merged segments are added most relevant first while they fit in max_chars characters
+    and max_tokens tokens; segments that do not fit are skipped, except that the first one
+    is truncated rather than returning nothing. Also reports how much the verbatim join of
+    the hits would have cost.
+    """
+    counter = counter or get_token_counter()
+    segments = merge_hits(hits)
+
+    parts: List[str] = []
+    used_chars = used_tokens = dropped = 0
+    for segment in segments:
+        text = segment.text
+        separator_chars = len(SEPARATOR) if parts else 0
+        tokens = counter.count(text)
+        fits = (max_chars is None or used_chars + separator_chars + len(text) <= max_chars) and \
+               (max_tokens is None or used_tokens + tokens <= max_tokens)
+        if not fits:
+            if parts:
+                dropped += 1
+                continue
+            if max_chars is not None:
+                text = text[:max_chars]
+            if max_tokens is not None:
+                text = counter.truncate(text, max_tokens)
+            tokens = counter.count(text)
+        parts.append(text)
+        used_chars += separator_chars + len(text)
+        used_tokens += tokens
+
+    context = SEPARATOR.join(parts)
+    raw = SEPARATOR.join(hit["content"] for hit in hits)
+    raw_tokens = counter.count(raw)
+    context_tokens = counter.count(context)
+    return {
+        "context": context,
+        "context_length": len(context),
+        "context_tokens": context_tokens,
+        "unpacked_length": len(raw),
+        "tokens_saved": raw_tokens - context_tokens,
+        "merged_chunks": sum(segment.chunks - 1 for segment in segments),
+        "dropped_segments": dropped,
+        "exact_token_count": counter.exact,
+    }
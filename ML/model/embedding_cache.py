@@ -0,0 +1,102 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+import numpy as np
+
+
+class EmbeddingCache:
+    """Persistent content-addressed store of chunk embeddings.
+
+    Vectors are keyed by a SHA-1 of (model name, chunk text) and stored as raw float32
+    bytes in a small SQLite file, so identical chunks are only ever embedded once per model
+    no matter which document, upload or worker process they come from.
+
+    With max_rows the file is bounded like an LRUCache: every vector records when it was last
+    stored or read, and adding vectors beyond max_rows deletes the least recently used ones.
+    """
+
+    def __init__(self, path: str, max_rows: Optional[int] = None):
+        self.path = str(path)
+        self.max_rows = max_rows
+        self.evictions = 0
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        connection = self._connection()
+        # Serialize schema changes between worker processes opening the same file
+        connection.execute("BEGIN IMMEDIATE")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL, "
+            "used_at INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID"
+        )
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(embeddings)")}
+        if 'used_at' not in columns:
+            # Caches written before pruning existed; their vectors count as least recently used
+            connection.execute("ALTER TABLE embeddings ADD COLUMN used_at INTEGER NOT NULL DEFAULT 0")
+        connection.execute("CREATE INDEX IF NOT EXISTS embeddings_used_at ON embeddings (used_at)")
+        connection.execute("COMMIT")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def key(model_name: str, text: str) -> bytes:
+        return hashlib.sha1(f"{model_name}\0{text}".encode('utf-8')).digest()
+
+    def get_many(self, model_name: str, texts: List[str]) -> Dict[int, np.ndarray]:
+        """Return {position in texts: vector} for every text already in the cache."""
+        keys = [self.key(model_name, text) for text in texts]
+        found = {}
+        now = int(time.time())
+        connection = self._connection()
+        connection.execute("BEGIN")
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            rows = connection.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            found.update((bytes(key), vector) for key, vector in rows)
+            if rows and self.max_rows:
+                hits = [key for key, _ in rows]
+                connection.execute(
+                    f"UPDATE embeddings SET used_at = ? WHERE key IN ({','.join('?' * len(hits))})", [now, *hits]
+                )
+        connection.execute("COMMIT")
+        return {
+            i: np.frombuffer(found[key], dtype=np.float32)
+            for i, key in enumerate(keys) if key in found
+        }
+
+    def put_many(self, model_name: str, texts: List[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        now = int(time.time())
+        rows = [(self.key(model_name, text), vector.tobytes(), now) for text, vector in zip(texts, vectors)]
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        inserted = connection.total_changes
+        connection.executemany("INSERT OR IGNORE INTO embeddings (key, vector, used_at) VALUES (?, ?, ?)", rows)
+        if self.max_rows and connection.total_changes > inserted:
+            self._prune(connection)
+        connection.execute("COMMIT")
+
+    def _prune(self, connection: sqlite3.Connection):
+        """Delete the least recently used vectors beyond max_rows."""
+        excess = connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_rows
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY used_at LIMIT ?)", (excess,)
+            )
+            self.evictions += excess
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
@@ -0,0 +1,54 @@
+import threading
+import time
+from typing import Dict, Any, Iterable
+from sentence_transformers import SentenceTransformer
+
+
+_models: Dict[str, SentenceTransformer] = {}
+_model_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+_metrics: Dict[str, Dict[str, Any]] = {}
+
+
+def _lock_for(model_name: str) -> threading.Lock:
+    """Return the lock guarding the load of a single model."""
+    with _registry_lock:
+        lock = _model_locks.get(model_name)
+        if lock is None:
+            lock = _model_locks[model_name] = threading.Lock()
+        return lock
+
+
+def get_embedding_model(model_name: str) -> SentenceTransformer:
+    """Return the shared SentenceTransformer for model_name, loading it once per process."""
+    model = _models.get(model_name)
+    if model is None:
+        with _lock_for(model_name):
+            model = _models.get(model_name)
+            if model is None:
+                start = time.perf_counter()
+                model = SentenceTransformer(model_name)
+                load_seconds = time.perf_counter() - start
+                with _registry_lock:
+                    _metrics[model_name] = {
+                        "load_seconds": load_seconds,
+                        "loaded_at": time.time(),
+                        "requests": 0,
+                    }
+                _models[model_name] = model
+    # Query executor threads call this concurrently; += is not atomic
+    with _registry_lock:
+        _metrics[model_name]["requests"] += 1
+    return model
+
+
+def warm_up(model_names: Iterable[str]):
+    """Eagerly load the given models so the first request does not pay for it."""
+    for model_name in model_names:
+        get_embedding_model(model_name)
+
+
+def get_load_metrics() -> Dict[str, Dict[str, Any]]:
+    """Return load-time metrics for every model loaded in this process."""
+    with _registry_lock:
+        return {name: dict(values) for name, values in _metrics.items()}
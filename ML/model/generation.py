@@ -0,0 +1,217 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from django.conf import settings
+from .index_cache import LRUCache
+from .metrics import stage_latency
+from .query_executor import QueryExecutor
+from .rag_processor import normalize_query
+
+
+SYSTEM_PROMPT = (
+    "You answer questions about a document using only the excerpts provided. Quote article or "
+    "section numbers where they help. If the excerpts do not contain the answer, say so."
+)
+
+
+class Generation(NamedTuple):
+    """An answer from the generator stage with its token and latency accounting."""
+    text: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    seconds: float = 0.0
+    cached: bool = False
+
+
+def build_messages(question: str, context: str) -> List[Dict[str, str]]:
+    """Chat messages asking for an answer to question grounded in context."""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Excerpts:\n\n{context}\n\nQuestion: {question}"},
+    ]
+
+
+class ExtractiveGenerator:
+    """No language model: the answer is the retrieved context itself."""
+
+    model = 'extractive'
+
+    def complete(self, question: str, context: str) -> Tuple[str, int, int]:
+        return f"Based on the Constitution:\n\n{context}", 0, 0
+
+
+class OpenAICompatibleGenerator:
+    """Chat completions from any OpenAI-compatible server: the OpenAI API, vLLM, Ollama,
+    llama.cpp's llama-server or the llm_stub management command."""
+
+    def __init__(self, model: str, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 max_tokens: int = 512, temperature: float = 0.0, timeout: float = 60):
+        from openai import OpenAI
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        # Local servers ignore the key, but the client insists on having one
+        self._client = OpenAI(base_url=base_url, api_key=api_key or 'not-needed', timeout=timeout, max_retries=1)
+
+    def complete(self, question: str, context: str) -> Tuple[str, int, int]:
+        response = self._client.chat.completions.create(
+            model=self.model,
+            messages=build_messages(question, context),
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+        )
+        usage = response.usage
+        return (
+            response.choices[0].message.content or '',
+            usage.prompt_tokens if usage else 0,
+            usage.completion_tokens if usage else 0,
+        )
+
+
+class LlamaCppGenerator:
+    """In-process CPU generation with a quantized GGUF model through llama-cpp-python
+    (pip install llama-cpp-python), e.g. a 4-bit Qwen2.5-1.5B-Instruct or Phi-3-mini."""
+
+    def __init__(self, model_path: str, n_ctx: int = 4096, n_threads: Optional[int] = None,
+                 max_tokens: int = 512, temperature: float = 0.0):
+        from llama_cpp import Llama
+        self.model = os.path.basename(model_path)
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self._llm = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, verbose=False)
+        # One llama.cpp context decodes one sequence at a time
+        self._lock = threading.Lock()
+
+    def complete(self, question: str, context: str) -> Tuple[str, int, int]:
+        with self._lock:
+            response = self._llm.create_chat_completion(
+                messages=build_messages(question, context),
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+            )
+        usage = response.get('usage') or {}
+        return (
+            response['choices'][0]['message']['content'] or '',
+            usage.get('prompt_tokens', 0),
+            usage.get('completion_tokens', 0),
+        )
+
+
+BACKENDS = {
+    'extractive': ExtractiveGenerator,
+    'openai': OpenAICompatibleGenerator,
+    'llama_cpp': LlamaCppGenerator,
+}
+
+
+class AnswerGenerator:
+    """Generator stage run after retrieval.
+
+    Answers are cached by (model, context hash, normalized question), so a repeated question
+    over the same retrieved context skips the model; cache hits keep the token counts of the
+    original generation and report cached=True.
+    """
+
+    def __init__(self, backend, cache: Optional[LRUCache] = None):
+        self.backend = backend
+        self.cache = cache
+
+    def answer(self, question: str, context: str) -> Generation:
+        key = (self.backend.model, hashlib.sha1(context.encode('utf-8')).hexdigest(), normalize_query(question))
+        if self.cache is not None:
+            generation = self.cache.get(key)
+            if generation is not None:
+                return generation._replace(cached=True)
+
+        start = time.perf_counter()
+        with stage_latency.time('query', 'generate'):
+            text, prompt_tokens, completion_tokens = self.backend.complete(question, context)
+        generation = Generation(text, self.backend.model, prompt_tokens, completion_tokens,
+                                time.perf_counter() - start)
+        if self.cache is not None:
+            self.cache.put(key, generation)
+        return generation
+
+
+def extractive_answer(context: str) -> Generation:
+    """The answer used when no model is configured or the configured one fails."""
+    text, _, _ = ExtractiveGenerator().complete('', context)
+    return Generation(text, ExtractiveGenerator.model)
+
+
+def uses_model() -> bool:
+    """Whether RAG_GENERATOR selects a language model rather than the extractive answer."""
+    return getattr(settings, 'RAG_GENERATOR', 'extractive') != 'extractive'
+
+
+def _backend_from_settings():
+    name = getattr(settings, 'RAG_GENERATOR', 'extractive')
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown RAG_GENERATOR {name!r}; expected one of {', '.join(BACKENDS)}")
+    if name == 'extractive':
+        return ExtractiveGenerator()
+    options = {
+        'max_tokens': getattr(settings, 'RAG_GENERATOR_MAX_TOKENS', 512),
+        'temperature': getattr(settings, 'RAG_GENERATOR_TEMPERATURE', 0.0),
+    }
+    if name == 'openai':
+        return OpenAICompatibleGenerator(
+            settings.RAG_GENERATOR_MODEL,
+            base_url=getattr(settings, 'RAG_GENERATOR_BASE_URL', None),
+            api_key=getattr(settings, 'RAG_GENERATOR_API_KEY', None),
+            timeout=getattr(settings, 'RAG_GENERATION_TIMEOUT', 120),
+            **options,
+        )
+    return LlamaCppGenerator(
+        settings.RAG_GENERATOR_MODEL,
+        n_ctx=getattr(settings, 'RAG_GENERATOR_CONTEXT_TOKENS', 4096),
+        n_threads=getattr(settings, 'RAG_GENERATOR_THREADS', None),
+        **options,
+    )
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_generator() -> AnswerGenerator:
+    """Return the process-wide generator stage configured by the RAG_GENERATOR* settings.
+
+    The backend is created on first use, so a local model is only loaded by processes
+    that actually answer questions.
+    """
+    global _generator
+    with _generator_lock:
+        if _generator is None:
+            backend = _backend_from_settings()
+            cache = None
+            cache_size = getattr(settings, 'RAG_ANSWER_CACHE_SIZE', 1024)
+            if cache_size and not isinstance(backend, ExtractiveGenerator):
+                cache = LRUCache(max_entries=cache_size, ttl=getattr(settings, 'RAG_ANSWER_CACHE_TTL', 3600))
+            _generator = AnswerGenerator(backend, cache)
+        return _generator
+
+
+def generate(question: str, context: str) -> Generation:
+    """Answer question from context with the configured generator (run on generation_executor)."""
+    return get_generator().answer(question, context)
+
+
+# Generation gets its own bounded pool so slow completions never starve retrieval
+generation_executor = QueryExecutor(
+    max_workers=getattr(settings, 'RAG_GENERATION_WORKERS', 1),
+    max_pending=getattr(settings, 'RAG_GENERATION_MAX_PENDING', 16),
+)
+
+
+def generation_stats() -> Dict[str, Any]:
+    """Generator pool and answer cache statistics; does not load a model that is not loaded yet."""
+    generator = _generator
+    return {
+        "model": generator.backend.model if generator else None,
+        "executor": generation_executor.stats(),
+        "answer_cache": generator.cache.stats() if generator and generator.cache else None,
+    }
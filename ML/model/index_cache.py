@@ -0,0 +1,219 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import numpy as np
+from django.conf import settings
+from .rag_processor import RAGProcessor, normalize_query
+from .index_factory import apply_search_params
+from .micro_batcher import get_query_batcher
+from .metrics import stage_latency
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by total entry size in bytes and/or entry count.
+
+    With a ttl (seconds) entries also expire that long after they were stored.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, max_entries: Optional[int] = None,
+                 ttl: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and time.monotonic() >= entry[2]:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int = 0):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Never cache something that would evict everything else
+                return
+            expires_at = time.monotonic() + self.ttl if self.ttl else None
+            self._entries[key] = (value, size, expires_at)
+            self.current_bytes += size
+            while self._over_capacity():
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _over_capacity(self) -> bool:
+        if self.max_bytes is not None and self.current_bytes > self.max_bytes:
+            return True
+        return self.max_entries is not None and len(self._entries) > self.max_entries
+
+    def pop_matching(self, predicate) -> int:
+        """Remove every entry whose key satisfies predicate and return how many were removed."""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class IndexCache:
+    """Cache of loaded per-document RAG processors keyed by (document id, index version).
+
+    Also holds the query caches shared by those processors: normalized question ->
+    embedding per model, and (document id, index version, question, k) -> answer context.
+    """
+
+    def __init__(self, max_bytes: int, query_embeddings: Optional[LRUCache] = None,
+                 results: Optional[LRUCache] = None):
+        self._cache = LRUCache(max_bytes)
+        self.query_embeddings = query_embeddings
+        self.results = results
+
+    @staticmethod
+    def _key(rag_index) -> tuple:
+        return (rag_index.document_id, rag_index.updated_at.timestamp())
+
+    def get(self, rag_index) -> Optional[RAGProcessor]:
+        """Return a processor with the document's index loaded, or None if it cannot be loaded."""
+        key = self._key(rag_index)
+        rag_processor = self._cache.get(key)
+        if rag_processor is not None:
+            return rag_processor
+
+        with stage_latency.time('query', 'index_load'):
+            rag_processor = RAGProcessor(
+                model_name=rag_index.embedding_model,
+                query_batcher=get_query_batcher(rag_index.embedding_model),
+                query_cache=self.query_embeddings,
+                hybrid=getattr(settings, 'RAG_HYBRID_SEARCH', True),
+                hybrid_candidates=getattr(settings, 'RAG_HYBRID_CANDIDATES', 20),
+                index_type=rag_index.index_type,
+                rescore_factor=getattr(settings, 'RAG_RESCORE_FACTOR', 4),
+                context_max_chars=getattr(settings, 'RAG_CONTEXT_MAX_CHARS', None),
+                context_max_tokens=getattr(settings, 'RAG_CONTEXT_MAX_TOKENS', 1024),
+            )
+            if not rag_processor.load_index(rag_index.index_path):
+                return None
+            apply_search_params(rag_processor.index, rag_index.index_params)
+
+        # Older versions of this document can never be requested again; a miss on the current
+        # version (e.g. after an LRU eviction) keeps its cached answers
+        self.invalidate(rag_index.document_id, keep_version=key[1])
+        self._cache.put(key, rag_processor, rag_processor.memory_usage())
+        return rag_processor
+
+    async def encode_query(self, model_name: str, query: str, timeout: Optional[float] = None) -> Optional[np.ndarray]:
+        """Embed a question through its model's micro-batcher from the event loop.
+
+        Waiting for a batch then holds no query worker, so batches can grow beyond
+        RAG_QUERY_WORKERS. Returns None when micro-batching is disabled, in which case the
+        search encodes the question on its query worker as before.
+        """
+        batcher = get_query_batcher(model_name)
+        if batcher is None:
+            return None
+        with stage_latency.time('query', 'encode'):
+            key = (model_name, normalize_query(query))
+            if self.query_embeddings is not None:
+                query_embedding = self.query_embeddings.get(key)
+                if query_embedding is not None:
+                    return query_embedding
+            vector = await asyncio.wait_for(batcher.submit_async(query), timeout)
+            query_embedding = np.asarray(vector, dtype=np.float32)[None, :]
+            if self.query_embeddings is not None:
+                self.query_embeddings.put(key, query_embedding, query_embedding.nbytes)
+            return query_embedding
+
+    def get_answer(self, rag_index, query: str, k: int = 3,
+                   query_embedding: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+        """Answer context for a question, served from the result cache when possible.
+
+        Returns None if the document's index cannot be loaded.
+        """
+        key = self._key(rag_index) + (normalize_query(query), k)
+        if self.results is not None:
+            result = self.results.get(key)
+            if result is not None:
+                return result
+
+        rag_processor = self.get(rag_index)
+        if rag_processor is None:
+            return None
+        result = rag_processor.get_answer_with_context(query, k=k, query_embedding=query_embedding)
+        if self.results is not None and 'error' not in result:
+            self.results.put(key, result)
+        return result
+
+    def invalidate(self, document_id: int, keep_version: Optional[float] = None) -> int:
+        """Drop cached versions of a document's index and their cached answers, all of them or
+        every one but keep_version."""
+        def stale(key):
+            return key[0] == document_id and key[1] != keep_version
+        if self.results is not None:
+            self.results.pop_matching(stale)
+        return self._cache.pop_matching(stale)
+
+    def clear(self):
+        self._cache.clear()
+        for cache in (self.query_embeddings, self.results):
+            if cache is not None:
+                cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+def _query_cache(size_setting: str, ttl_setting: str, default_size: int, default_ttl: float) -> Optional[LRUCache]:
+    max_entries = getattr(settings, size_setting, default_size)
+    if not max_entries:
+        return None
+    return LRUCache(max_entries=max_entries, ttl=getattr(settings, ttl_setting, default_ttl))
+
+
+index_cache = IndexCache(
+    getattr(settings, 'RAG_INDEX_CACHE_MAX_BYTES', 512 * 1024 * 1024),
+    query_embeddings=_query_cache('RAG_QUERY_EMBEDDING_CACHE_SIZE', 'RAG_QUERY_EMBEDDING_CACHE_TTL', 4096, 3600),
+    results=_query_cache('RAG_RESULT_CACHE_SIZE', 'RAG_RESULT_CACHE_TTL', 1024, 300),
+)
@@ -0,0 +1,145 @@
+import math
+from typing import Any, Dict, Optional
+import faiss
+import numpy as np
+
+
+INDEX_TYPES = ('flat', 'ivf_flat', 'ivf_pq', 'hnsw', 'sq_fp16', 'sq8', 'pq')
+
+# Types that store lossy codes instead of float32 vectors; their candidates are rescored
+QUANTIZED_TYPES = ('ivf_pq', 'sq_fp16', 'sq8', 'pq')
+
+# Below this, approximate indexes cannot be trained sensibly and exact search is already fast
+MIN_VECTORS_FOR_ANN = 1_000
+
+
+def choose_index_type(num_vectors: int) -> str:
+    """Pick an index type for a corpus size, trading exactness for speed as it grows."""
+    if num_vectors < 10_000:
+        return 'flat'
+    if num_vectors < 200_000:
+        return 'hnsw'
+    if num_vectors < 2_000_000:
+        return 'ivf_flat'
+    return 'ivf_pq'
+
+
+def _pq_subquantizers(dimension: int) -> int:
+    """Largest divisor of dimension giving sub-vectors of at least 8 dimensions."""
+    for m in range(max(dimension // 8, 1), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def resolve_params(index_type: str, num_vectors: int, dimension: int,
+                   overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Fill in default build/search parameters for an index type; overrides win."""
+    params: Dict[str, Any] = {}
+    if index_type == 'pq':
+        params.update(m=_pq_subquantizers(dimension), nbits=8 if num_vectors >= 10_000 else 4)
+    elif index_type in ('ivf_flat', 'ivf_pq'):
+        # Rule of thumb: ~4*sqrt(n) lists, but never fewer than ~39 training points per list
+        nlist = int(4 * math.sqrt(max(num_vectors, 1)))
+        nlist = max(1, min(nlist, num_vectors // 39 or 1))
+        params.update(nlist=nlist, nprobe=max(1, nlist // 16))
+        if index_type == 'ivf_pq':
+            # 8-bit codebooks need ~10k training points; use 4 bits for smaller corpora
+            params.update(m=_pq_subquantizers(dimension), nbits=8 if num_vectors >= 10_000 else 4)
+    elif index_type == 'hnsw':
+        params.update(M=32, ef_construction=80, ef_search=64)
+    params.update(overrides or {})
+    return params
+
+
+def build_index(index_type: str, dimension: int, params: Dict[str, Any]) -> faiss.Index:
+    """Create an empty (possibly untrained) index of the given type."""
+    if index_type == 'flat':
+        return faiss.IndexFlatL2(dimension)
+    if index_type == 'ivf_flat':
+        quantizer = faiss.IndexFlatL2(dimension)
+        return faiss.IndexIVFFlat(quantizer, dimension, params['nlist'])
+    if index_type == 'ivf_pq':
+        quantizer = faiss.IndexFlatL2(dimension)
+        return faiss.IndexIVFPQ(quantizer, dimension, params['nlist'], params['m'], params['nbits'])
+    if index_type == 'sq_fp16':
+        return faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_fp16)
+    if index_type == 'sq8':
+        return faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit)
+    if index_type == 'pq':
+        return faiss.IndexPQ(dimension, params['m'], params['nbits'])
+    if index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dimension, params['M'])
+        index.hnsw.efConstruction = params['ef_construction']
+        return index
+    raise ValueError(f"Unknown index type: {index_type}")
+
+
+def apply_search_params(index: faiss.Index, params: Optional[Dict[str, Any]]):
+    """Set query-time knobs (nprobe / efSearch) on a built or loaded index."""
+    if not params:
+        return
+    if 'nprobe' in params and hasattr(index, 'nprobe'):
+        index.nprobe = params['nprobe']
+    if 'ef_search' in params and hasattr(index, 'hnsw'):
+        index.hnsw.efSearch = params['ef_search']
+
+
+def index_memory_bytes(index: faiss.Index) -> int:
+    """Approximate bytes held in memory by an index's codes, ids and graph links."""
+    if hasattr(index, 'invlists'):
+        # IVF: one code plus one int64 id per vector, plus the coarse quantizer
+        return index.ntotal * (index.code_size + 8) + index_memory_bytes(index.quantizer)
+    if hasattr(index, 'hnsw'):
+        # Level-0 links dominate the graph: 2*M int32 neighbours per vector
+        return index_memory_bytes(index.storage) + index.ntotal * index.hnsw.nb_neighbors(0) * 4
+    if hasattr(index, 'code_size'):
+        return index.ntotal * index.code_size
+    return index.ntotal * index.d * 4
+
+
+def build_index_from_vectors(vectors: np.ndarray, index_type: str = 'auto',
+                             params: Optional[Dict[str, Any]] = None,
+                             training_sample: int = 50_000, batch_size: int = 4096):
+    """Build an index over vectors (which may be a memmap), training on a random sample.
+
+    Vectors are added in batches so a memory-mapped matrix is never fully materialised.
+    Returns (index, index_type, resolved_params).
+    """
+    num_vectors, dimension = vectors.shape
+    if index_type == 'auto':
+        index_type = choose_index_type(num_vectors)
+    elif index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {index_type}")
+    if num_vectors < MIN_VECTORS_FOR_ANN and index_type != 'flat':
+        index_type, params = 'flat', None
+    params = resolve_params(index_type, num_vectors, dimension, params)
+    index = build_index(index_type, dimension, params)
+
+    if not index.is_trained:
+        sample_size = min(num_vectors, training_sample)
+        rng = np.random.default_rng(0)
+        # Sorted row ids keep reads from a memmap sequential
+        rows = np.sort(rng.choice(num_vectors, size=sample_size, replace=False))
+        index.train(np.ascontiguousarray(vectors[rows], dtype=np.float32))
+
+    for start in range(0, num_vectors, batch_size):
+        index.add(np.ascontiguousarray(vectors[start:start + batch_size], dtype=np.float32))
+
+    apply_search_params(index, params)
+    return index, index_type, params
+
+
+def rescore(vectors: np.ndarray, query: np.ndarray, ids: np.ndarray, k: int):
+    """Re-rank candidate ids by exact L2 distance to query using full-precision vectors.
+
+    vectors may be a memmap; only the candidates' rows are read. Returns (distances, ids)
+    of the best k, nearest first.
+    """
+    ids = np.sort(ids[ids >= 0])  # sorted reads keep memmap access sequential
+    if not len(ids):
+        return np.zeros(0, dtype=np.float32), ids
+    delta = np.asarray(vectors[ids], dtype=np.float32) - query
+    distances = np.einsum('ij,ij->i', delta, delta)
+    best = np.argsort(distances, kind='stable')[:k]
+    return distances[best].astype(np.float32), ids[best]
@@ -0,0 +1,365 @@
+import os
+import shutil
+import time
+from datetime import timedelta
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Document, DocumentChunk, IngestionJob, RAGIndex
+from .chunk_store import ChunkStore, content_hash
+from .rag_processor import EMBEDDINGS_FILE, PreviousEmbeddings, RAGProcessor
+from .index_cache import index_cache
+from .embedding_cache import EmbeddingCache
+from .library_index import get_library_index
+from .metrics import StageLatency, get_profiler
+
+
+_embedding_cache = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Return the process-wide chunk embedding cache, or None when it is disabled."""
+    global _embedding_cache
+    cache_path = getattr(settings, 'RAG_EMBEDDING_CACHE_PATH', None)
+    if cache_path and _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(cache_path, max_rows=getattr(settings, 'RAG_EMBEDDING_CACHE_MAX_ROWS', None))
+    return _embedding_cache
+
+
+# Ingestion jobs this process runs alongside; rag_worker sets it from --processes
+_concurrent_jobs = None
+
+
+def set_concurrent_jobs(jobs: int):
+    global _concurrent_jobs
+    _concurrent_jobs = jobs
+
+
+def extraction_workers() -> int:
+    """Processes each job may use for PDF text extraction.
+
+    RAG_EXTRACTION_WORKERS when set, otherwise the CPUs divided among the jobs that run at
+    once, so a busy rag_worker spawns about one extraction process per CPU in total.
+    """
+    workers = getattr(settings, 'RAG_EXTRACTION_WORKERS', None)
+    if workers:
+        return workers
+    jobs = _concurrent_jobs or getattr(settings, 'RAG_INGESTION_WORKERS', 2)
+    return max(1, (os.cpu_count() or 1) // max(1, jobs))
+
+
+def new_index_path(document_id) -> str:
+    """A directory for a new version of a document's index.
+
+    Every version gets its own directory, so readers of the current one never see it change.
+    """
+    return os.path.join(settings.MEDIA_ROOT, 'indexes', f'document_{document_id}_{time.time_ns()}')
+
+
+def remove_index_files(index_path: str):
+    """Delete an index version no longer referenced by its RAGIndex."""
+    if os.path.isdir(index_path):
+        shutil.rmtree(index_path, ignore_errors=True)
+    elif os.path.exists(index_path):
+        # Legacy single-pickle index
+        os.remove(index_path)
+
+
+def process_document_rag(document_id) -> Dict[str, float]:
+    """Process document to create RAG index.
+
+    Returns the wall time in seconds of every ingestion stage.
+    """
+    started = time.perf_counter()
+    document = Document.objects.get(id=document_id)
+
+    previous_index, library_synced = RAGIndex.objects.filter(document=document).values_list(
+        'index_path', 'library_synced'
+    ).first() or (None, True)
+    index_path = new_index_path(document_id)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    committed = False
+
+    # Initialize RAG processor
+    rag_processor = RAGProcessor(
+        model_name=settings.RAG_EMBEDDING_MODEL,
+        extraction_workers=extraction_workers(),
+        batch_size=getattr(settings, 'RAG_EMBEDDING_BATCH_SIZE', 256),
+        work_dir=os.path.dirname(index_path),
+        embedding_cache=get_embedding_cache(),
+        index_type=getattr(settings, 'RAG_INDEX_TYPE', 'auto'),
+        index_params=getattr(settings, 'RAG_INDEX_PARAMS', None),
+        previous_embeddings=load_previous_embeddings(document),
+    )
+    # Reprocessing a document we already indexed only touches the chunks that changed
+    incremental = rag_processor.previous_embeddings is not None
+
+    def report_progress(fraction):
+        # Keep the last few percent for persisting the results
+        Document.objects.filter(id=document_id).update(progress=int(fraction * 90))
+
+    try:
+        # Process PDF
+        result = rag_processor.process_pdf(document.file_path, progress_callback=report_progress)
+
+        if 'error' in result:
+            raise Exception(result['error'])
+        stage_seconds = result['stage_seconds']
+
+        # Release the old embeddings; their directory is deleted once the new index is committed
+        rag_processor.previous_embeddings = None
+
+        # Save RAG index
+        start = time.perf_counter()
+        rag_processor.save_index(index_path)
+        stage_seconds['save_index'] = time.perf_counter() - start
+
+        # Persist chunks and mark the document processed in one transaction, so a crash
+        # never leaves a partially ingested document behind
+        start = time.perf_counter()
+        with transaction.atomic():
+            texts = rag_processor.documents.texts()
+            if incremental:
+                removed_chunks, added_chunks = sync_chunks(document, texts)
+            else:
+                # Replace rows left behind by an earlier attempt
+                document.chunks.all().delete()
+                save_chunks(document, texts)
+
+            # Readers switch to the new directory with this row; saving also bumps updated_at,
+            # which versions every cache entry for this index
+            RAGIndex.objects.update_or_create(
+                document=document,
+                defaults={
+                    'index_path': index_path,
+                    'embedding_model': rag_processor.model_name,
+                    'index_type': result['index_type'],
+                    'index_params': result['index_params'],
+                }
+            )
+
+            document.is_processed = True
+            document.num_chunks = result['num_chunks']
+            document.status = Document.STATUS_PROCESSED
+            document.progress = 100
+            document.processing_error = None
+            document.save()
+            transaction.on_commit(lambda: index_cache.invalidate(document_id))
+            if previous_index and previous_index != index_path:
+                transaction.on_commit(lambda: remove_index_files(previous_index))
+        committed = True
+        stage_seconds['db_write'] = time.perf_counter() - start
+
+        # Make the document searchable from "search all my documents". The document itself is
+        # committed by now, so a failure here must not fail the job; it only leaves the library
+        # to be rebuilt for this document, from the saved embeddings, by the next run
+        start = time.perf_counter()
+        try:
+            library = get_library_index(document.uploaded_by_id)
+            if incremental and library_synced:
+                library.update_document(document_id, removed_chunks, added_chunks, rag_processor.embeddings)
+            else:
+                library.add_document(document_id, rag_processor.embeddings)
+            synced = True
+        except Exception as e:
+            print(f"Library update failed for document {document_id}, it will be rebuilt on the next run: {e}")
+            synced = False
+        if synced != library_synced:
+            # update() leaves updated_at, and so every cache entry for the index, alone
+            RAGIndex.objects.filter(document_id=document_id).update(library_synced=synced)
+        stage_seconds['library_update'] = time.perf_counter() - start
+    except BaseException:
+        if not committed:
+            # Nothing points at the new version yet
+            remove_index_files(index_path)
+        raise
+    finally:
+        rag_processor.cleanup()
+
+    stage_seconds['total'] = time.perf_counter() - started
+    return stage_seconds
+
+
+def load_previous_embeddings(document: Document) -> Optional[PreviousEmbeddings]:
+    """Vectors of a document's currently indexed version, keyed by chunk content hash.
+
+    Hashes come from the chunk store saved next to the vectors, so they always describe
+    the same rows. Returns None when the document was never indexed or used another model.
+    """
+    rag_index = RAGIndex.objects.filter(document=document).first()
+    if rag_index is None or rag_index.embedding_model != settings.RAG_EMBEDDING_MODEL:
+        return None
+    embeddings_path = os.path.join(rag_index.index_path, EMBEDDINGS_FILE)
+    if not os.path.exists(embeddings_path):
+        return None
+
+    chunks = ChunkStore(rag_index.index_path)
+    embeddings = np.load(embeddings_path, mmap_mode='r')
+    if len(chunks) != len(embeddings):
+        return None
+    return PreviousEmbeddings({content_hash(chunks.text(i)): i for i in range(len(chunks))}, embeddings)
+
+
+def sync_chunks(document: Document, texts: Iterable[str]) -> Tuple[List[int], List[int]]:
+    """Bring a document's DocumentChunk rows in line with a new list of chunk texts.
+
+    Rows are matched by content hash: unchanged chunks keep their row (renumbered if they
+    moved), stale rows are deleted and only new chunks are inserted. Returns the old chunk
+    indexes whose vectors must be removed and the new ones whose vectors must be added.
+    """
+    batch_size = getattr(settings, 'RAG_CHUNK_BULK_BATCH_SIZE', 500)
+    existing = {}
+    rows = document.chunks.order_by('chunk_index').values_list('pk', 'chunk_index', 'content_hash')
+    for pk, chunk_index, chunk_hash in rows:
+        existing.setdefault(chunk_hash, []).append((pk, chunk_index))
+
+    moved, new_rows, removed, added = [], [], [], []
+    for new_index, text in enumerate(texts):
+        chunk_hash = content_hash(text)
+        matches = existing.get(chunk_hash)
+        if matches:
+            pk, old_index = matches.pop(0)
+            if old_index != new_index:
+                moved.append(DocumentChunk(pk=pk, chunk_index=new_index))
+                removed.append(old_index)
+                added.append(new_index)
+        else:
+            new_rows.append(DocumentChunk(
+                document=document, chunk_index=new_index, content=text, content_hash=chunk_hash
+            ))
+            added.append(new_index)
+
+    stale = [row for matches in existing.values() for row in matches]
+    removed.extend(chunk_index for _, chunk_index in stale)
+    stale_pks = [pk for pk, _ in stale]
+    for start in range(0, len(stale_pks), batch_size):
+        DocumentChunk.objects.filter(pk__in=stale_pks[start:start + batch_size]).delete()
+
+    # Renumber through negative indexes so moved rows never collide on (document, chunk_index)
+    for chunk in moved:
+        chunk.chunk_index = -chunk.chunk_index - 1
+    DocumentChunk.objects.bulk_update(moved, ['chunk_index'], batch_size=batch_size)
+    for chunk in moved:
+        chunk.chunk_index = -chunk.chunk_index - 1
+    DocumentChunk.objects.bulk_update(moved, ['chunk_index'], batch_size=batch_size)
+
+    DocumentChunk.objects.bulk_create(new_rows, batch_size=batch_size)
+    return removed, added
+
+
+def save_chunks(document: Document, texts: Iterable[str]) -> int:
+    """Insert DocumentChunk rows with batched bulk_create, reading texts lazily."""
+    batch_size = getattr(settings, 'RAG_CHUNK_BULK_BATCH_SIZE', 500)
+    texts = iter(texts)
+    saved = 0
+    while True:
+        batch = [
+            DocumentChunk(document=document, chunk_index=saved + i, content=text, content_hash=content_hash(text))
+            for i, text in enumerate(islice(texts, batch_size))
+        ]
+        if not batch:
+            return saved
+        DocumentChunk.objects.bulk_create(batch, batch_size=batch_size)
+        saved += len(batch)
+
+
+def enqueue_document(document: Document) -> IngestionJob:
+    """Queue a document for processing by the ingestion worker."""
+    Document.objects.filter(id=document.id).update(status=Document.STATUS_PENDING, progress=0)
+    return IngestionJob.objects.create(
+        document=document,
+        max_attempts=getattr(settings, 'RAG_INGESTION_MAX_ATTEMPTS', 3),
+    )
+
+
+def claim_next_job() -> Optional[int]:
+    """Atomically mark the oldest runnable job as running and return its id.
+
+    The conditional UPDATE makes claiming safe across several worker processes without
+    relying on SELECT ... FOR UPDATE, which SQLite does not support.
+    """
+    now = timezone.now()
+    candidates = (
+        IngestionJob.objects
+        .filter(status=IngestionJob.STATUS_QUEUED, run_after__lte=now)
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:10]
+    )
+    for job_id in candidates:
+        claimed = IngestionJob.objects.filter(id=job_id, status=IngestionJob.STATUS_QUEUED).update(
+            status=IngestionJob.STATUS_RUNNING,
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return job_id
+    return None
+
+
+def run_job(job_id: int) -> bool:
+    """Run a claimed job; meant to be executed inside a worker process.
+
+    Stage timings are stored on the job, since the web process cannot see this process's
+    memory; a sampled fraction of jobs is also profiled (see RAG_PROFILE_SAMPLE_RATE).
+    """
+    job = IngestionJob.objects.get(id=job_id)
+    Document.objects.filter(id=job.document_id).update(status=Document.STATUS_PROCESSING, progress=0)
+    try:
+        stage_seconds = get_profiler().call(f'ingest-{job.document_id}', process_document_rag, job.document_id)
+    except Exception as e:
+        fail_job(job_id, str(e))
+        return False
+
+    IngestionJob.objects.filter(id=job_id).update(
+        status=IngestionJob.STATUS_DONE,
+        finished_at=timezone.now(),
+        last_error=None,
+        stage_seconds=stage_seconds,
+    )
+    return True
+
+
+def fail_job(job_id: int, error: str):
+    """Record a failed attempt, scheduling a retry with exponential backoff while attempts remain."""
+    job = IngestionJob.objects.get(id=job_id)
+    job.last_error = error
+    if job.attempts < job.max_attempts:
+        base_delay = getattr(settings, 'RAG_INGESTION_RETRY_DELAY', 30)
+        job.status = IngestionJob.STATUS_QUEUED
+        job.run_after = timezone.now() + timedelta(seconds=base_delay * 2 ** (job.attempts - 1))
+        document_status = Document.STATUS_PENDING
+    else:
+        job.status = IngestionJob.STATUS_FAILED
+        job.finished_at = timezone.now()
+        document_status = Document.STATUS_FAILED
+    job.save()
+    Document.objects.filter(id=job.document_id).update(status=document_status, processing_error=error)
+
+
+def requeue_stale_jobs(timeout_seconds: int) -> int:
+    """Return jobs orphaned by a crashed worker to the queue."""
+    cutoff = timezone.now() - timedelta(seconds=timeout_seconds)
+    return IngestionJob.objects.filter(
+        status=IngestionJob.STATUS_RUNNING,
+        started_at__lt=cutoff,
+    ).update(status=IngestionJob.STATUS_QUEUED, run_after=timezone.now())
+
+
+def ingestion_latency(limit: int = 1024) -> StageLatency:
+    """Stage timings of the most recently finished ingestion jobs, aggregated for reporting."""
+    latency = StageLatency(window=limit)
+    recent = (
+        IngestionJob.objects
+        .filter(status=IngestionJob.STATUS_DONE)
+        .exclude(stage_seconds={})
+        .order_by('-finished_at')
+        .values_list('stage_seconds', flat=True)[:limit]
+    )
+    for stage_seconds in reversed(list(recent)):
+        for stage, seconds in stage_seconds.items():
+            latency.observe('ingest', stage, seconds)
+    return latency
@@ -0,0 +1,150 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Iterable, List, Tuple
+import numpy as np
+
+
+TERMS_FILE = 'lexical_terms.json'
+DOC_IDS_FILE = 'lexical_doc_ids.npy'
+TERM_FREQS_FILE = 'lexical_tfs.npy'
+DOC_LENGTHS_FILE = 'lexical_doc_lengths.npy'
+
+# Standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in is it of on or that the this to was were which with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased alphanumeric tokens, so "Article 370" and "Schedule VII" survive intact."""
+    return [token for token in TOKEN_RE.findall(text.casefold()) if token not in STOPWORDS]
+
+
+def has_lexical_index(directory: str) -> bool:
+    return os.path.exists(os.path.join(directory, TERMS_FILE))
+
+
+class LexicalIndexWriter:
+    """Build a BM25 inverted index one chunk at a time, in the same order as the chunk store.
+
+    Postings are accumulated as compact integer arrays and written sorted by term, so each
+    term's postings are one contiguous slice of the memory-mapped arrays.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._vocabulary = {}
+        self._term_ids = []
+        self._doc_ids = []
+        self._term_freqs = []
+        self._lengths = []
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def append(self, text: str):
+        doc_id = len(self._lengths)
+        counts = Counter(tokenize(text))
+        self._lengths.append(sum(counts.values()))
+        if not counts:
+            return
+        self._term_ids.append(np.fromiter(
+            (self._vocabulary.setdefault(term, len(self._vocabulary)) for term in counts), np.int32, len(counts)
+        ))
+        self._term_freqs.append(np.fromiter(counts.values(), np.int32, len(counts)))
+        self._doc_ids.append(np.full(len(counts), doc_id, dtype=np.int32))
+
+    def abort(self):
+        """Drop the buffered postings without writing anything."""
+        self._vocabulary = {}
+        self._term_ids, self._doc_ids, self._term_freqs, self._lengths = [], [], [], []
+
+    def close(self) -> int:
+        if self._term_ids:
+            term_ids = np.concatenate(self._term_ids)
+            doc_ids = np.concatenate(self._doc_ids)
+            term_freqs = np.concatenate(self._term_freqs)
+        else:
+            term_ids = doc_ids = term_freqs = np.zeros(0, dtype=np.int32)
+
+        # Stable sort keeps each term's postings in ascending chunk order
+        order = np.argsort(term_ids, kind='stable')
+        offsets = np.zeros(len(self._vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(self._vocabulary)), out=offsets[1:])
+
+        np.save(os.path.join(self.directory, DOC_IDS_FILE), doc_ids[order])
+        np.save(os.path.join(self.directory, TERM_FREQS_FILE),
+                np.minimum(term_freqs[order], np.iinfo(np.uint16).max).astype(np.uint16))
+        lengths = np.array(self._lengths, dtype=np.int32)
+        np.save(os.path.join(self.directory, DOC_LENGTHS_FILE), lengths)
+        with open(os.path.join(self.directory, TERMS_FILE), 'w') as f:
+            json.dump({
+                "num_docs": len(lengths),
+                "avg_length": float(lengths.mean()) if len(lengths) else 0.0,
+                "terms": {
+                    term: [int(offsets[term_id]), int(offsets[term_id + 1])]
+                    for term, term_id in self._vocabulary.items()
+                },
+            }, f)
+        return len(self)
+
+
+def write_lexical_index(directory: str, texts: Iterable[str]) -> int:
+    writer = LexicalIndexWriter(directory)
+    for text in texts:
+        writer.append(text)
+    return writer.close()
+
+
+class LexicalIndex:
+    """Read-only BM25 index over a document's chunks.
+
+    Only the term dictionary is held in memory; postings and chunk lengths are memory-mapped,
+    so a lookup touches just the postings of the query's terms.
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, TERMS_FILE)) as f:
+            meta = json.load(f)
+        self.num_docs = meta["num_docs"]
+        self.avg_length = meta["avg_length"] or 1.0
+        self.terms = meta["terms"]
+        self.doc_ids = np.load(os.path.join(directory, DOC_IDS_FILE), mmap_mode='r')
+        self.term_freqs = np.load(os.path.join(directory, TERM_FREQS_FILE), mmap_mode='r')
+        self.doc_lengths = np.load(os.path.join(directory, DOC_LENGTHS_FILE), mmap_mode='r')
+
+    def search(self, query: str, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (chunk ids, BM25 scores) of the top-k chunks, best first."""
+        doc_ids, scores = [], []
+        for term in set(tokenize(query)):
+            span = self.terms.get(term)
+            if span is None:
+                continue
+            start, end = span
+            ids = np.asarray(self.doc_ids[start:end])
+            tf = self.term_freqs[start:end].astype(np.float32)
+            df = end - start
+            idf = math.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[ids] / self.avg_length)
+            doc_ids.append(ids)
+            scores.append(idf * tf * (BM25_K1 + 1) / (tf + norm))
+
+        if not doc_ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        # Sum the per-term scores of every chunk that matched at least one term
+        unique_ids, inverse = np.unique(np.concatenate(doc_ids), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(scores))
+        if len(totals) > k:
+            top = np.argpartition(-totals, k - 1)[:k]
+        else:
+            top = np.arange(len(totals))
+        top = top[np.argsort(-totals[top], kind='stable')]
+        return unique_ids[top].astype(np.int64), totals[top].astype(np.float32)
@@ -0,0 +1,222 @@
+import heapq
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+import faiss
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+from .models import DocumentChunk
+from .index_cache import index_cache
+from .micro_batcher import get_query_batcher
+from .rag_processor import FAISS_MMAP_FLAGS, RAGProcessor
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# FAISS ids pack (document_id, chunk_index) into one int64
+CHUNK_INDEX_BITS = 32
+
+
+def encode_id(document_id: int, chunk_index: int) -> int:
+    return (document_id << CHUNK_INDEX_BITS) | chunk_index
+
+
+def decode_id(vector_id: int) -> Tuple[int, int]:
+    return int(vector_id) >> CHUNK_INDEX_BITS, int(vector_id) & ((1 << CHUNK_INDEX_BITS) - 1)
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive inter-process lock so concurrent ingestion workers never lose each other's updates."""
+    with open(f"{path}.lock", 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class LibraryIndex:
+    """Cross-document FAISS index split into shards by document id.
+
+    Each shard is an IndexIDMap2 whose ids encode (document_id, chunk_index), so a document
+    can be added or removed without touching the other shards, and a query is answered by
+    searching every shard and merging their top-k.
+    """
+
+    def __init__(self, directory: str, num_shards: int = 4):
+        self.directory = directory
+        self.num_shards = num_shards
+        self._loaded: Dict[int, Tuple[tuple, faiss.Index]] = {}
+        self._lock = threading.Lock()
+
+    def _shard_path(self, shard: int) -> str:
+        return os.path.join(self.directory, f'shard_{shard}.faiss')
+
+    def _shard_for(self, document_id: int) -> int:
+        return document_id % self.num_shards
+
+    @contextmanager
+    def _update_shard(self, shard: int, dimension: Optional[int] = None):
+        """Yield a writable copy of a shard and atomically replace the file afterwards."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._shard_path(shard)
+        with _file_lock(path):
+            if os.path.exists(path):
+                index = faiss.read_index(path)
+            elif dimension is not None:
+                index = faiss.IndexIDMap2(faiss.IndexFlatL2(dimension))
+            else:
+                yield None
+                return
+            yield index
+            tmp_path = f"{path}.tmp"
+            faiss.write_index(index, tmp_path)
+            os.replace(tmp_path, path)
+
+    @staticmethod
+    def _document_selector(document_id: int):
+        return faiss.IDSelectorRange(encode_id(document_id, 0), encode_id(document_id + 1, 0))
+
+    def add_document(self, document_id: int, embeddings: np.ndarray):
+        """Add (or replace) every chunk vector of a document."""
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        ids = np.arange(len(embeddings), dtype=np.int64) + encode_id(document_id, 0)
+        with self._update_shard(self._shard_for(document_id), embeddings.shape[1]) as index:
+            index.remove_ids(self._document_selector(document_id))
+            index.add_with_ids(embeddings, ids)
+
+    def update_document(self, document_id: int, removed_chunks: List[int], added_chunks: List[int],
+                        embeddings: np.ndarray):
+        """Remove and add individual chunk vectors of a document by id, leaving the rest untouched.
+
+        embeddings holds the document's full new set of vectors; only the added rows are read.
+        """
+        base_id = encode_id(document_id, 0)
+        added_chunks = np.asarray(added_chunks, dtype=np.int64)
+        with self._update_shard(self._shard_for(document_id), embeddings.shape[1]) as index:
+            if len(removed_chunks):
+                index.remove_ids(np.asarray(removed_chunks, dtype=np.int64) + base_id)
+            if len(added_chunks):
+                index.add_with_ids(
+                    np.ascontiguousarray(embeddings[added_chunks], dtype=np.float32), added_chunks + base_id
+                )
+
+    def remove_document(self, document_id: int) -> int:
+        """Remove every chunk vector of a document; returns how many were removed."""
+        with self._update_shard(self._shard_for(document_id)) as index:
+            if index is None:
+                return 0
+            return index.remove_ids(self._document_selector(document_id))
+
+    def _shards(self) -> List[faiss.Index]:
+        """Return the current shards, re-reading any file rewritten since it was last loaded."""
+        shards = []
+        with self._lock:
+            for shard in range(self.num_shards):
+                path = self._shard_path(shard)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    self._loaded.pop(shard, None)
+                    continue
+                version = (stat.st_ino, stat.st_mtime_ns)
+                loaded = self._loaded.get(shard)
+                if loaded is None or loaded[0] != version:
+                    loaded = self._loaded[shard] = (version, faiss.read_index(path, FAISS_MMAP_FLAGS))
+                shards.append(loaded[1])
+        return shards
+
+    def search(self, query_embeddings: np.ndarray, k: int = 5) -> List[Tuple[float, int, int]]:
+        """Scatter the query over all shards and gather the global top-k.
+
+        Returns (distance, document_id, chunk_index) tuples, nearest first.
+        """
+        hits = []
+        for index in self._shards():
+            if index.ntotal == 0:
+                continue
+            distances, ids = index.search(query_embeddings, min(k, index.ntotal))
+            hits.extend(
+                (float(distance), *decode_id(vector_id))
+                for distance, vector_id in zip(distances[0], ids[0]) if vector_id >= 0
+            )
+        return heapq.nsmallest(k, hits)
+
+    def ntotal(self) -> int:
+        return sum(index.ntotal for index in self._shards())
+
+
+_libraries: Dict[str, LibraryIndex] = {}
+_libraries_lock = threading.Lock()
+
+
+def library_key(user_id: int) -> str:
+    """Name of the library a user's documents belong to."""
+    if getattr(settings, 'RAG_LIBRARY_SCOPE', 'user') == 'global':
+        return 'global'
+    return f'user_{user_id}'
+
+
+def get_library_index(user_id: int) -> LibraryIndex:
+    """Return the (process-wide) library index holding a user's documents."""
+    key = library_key(user_id)
+    with _libraries_lock:
+        library = _libraries.get(key)
+        if library is None:
+            directory = os.path.join(settings.MEDIA_ROOT, 'indexes', 'library', key)
+            library = _libraries[key] = LibraryIndex(directory, getattr(settings, 'RAG_LIBRARY_SHARDS', 4))
+        return library
+
+
+def search_library(user_id: int, query: str, k: int = 5,
+                   query_embedding: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+    """Search every document in a user's library and return the top-k chunks with their sources."""
+    if query_embedding is None:
+        rag_processor = RAGProcessor(
+            model_name=settings.RAG_EMBEDDING_MODEL,
+            query_batcher=get_query_batcher(settings.RAG_EMBEDDING_MODEL),
+            query_cache=index_cache.query_embeddings,
+        )
+        query_embedding = rag_processor.encode_query(query)
+    hits = get_library_index(user_id).search(query_embedding, k)
+    if not hits:
+        return []
+
+    lookup = Q()
+    for _, document_id, chunk_index in hits:
+        lookup |= Q(document_id=document_id, chunk_index=chunk_index)
+    chunks = {
+        (chunk.document_id, chunk.chunk_index): chunk
+        for chunk in DocumentChunk.objects.filter(lookup).select_related('document')
+    }
+
+    results = []
+    for distance, document_id, chunk_index in hits:
+        chunk = chunks.get((document_id, chunk_index))
+        if chunk is None:
+            # Document deleted or reprocessed since the shard was loaded
+            continue
+        results.append({
+            "content": chunk.content,
+            "similarity_score": 1 / (1 + distance),
+            "rank": len(results) + 1,
+            "document_id": document_id,
+            "document_title": chunk.document.title,
+            "chunk_index": chunk_index,
+        })
+    return results
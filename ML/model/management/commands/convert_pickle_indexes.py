@@ -0,0 +1,38 @@
+import os
+from django.core.management.base import BaseCommand
+from model.models import RAGIndex
+from model.rag_processor import RAGProcessor
+
+
+class Command(BaseCommand):
+    help = "Convert legacy pickled RAG indexes to the native FAISS + memory-mapped format."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Delete each .pkl file once it has been converted.',
+        )
+
+    def handle(self, *args, **options):
+        converted = failed = 0
+        for rag_index in RAGIndex.objects.filter(index_path__endswith='.pkl'):
+            rag_processor = RAGProcessor(model_name=rag_index.embedding_model)
+            if not rag_processor.load_pickle_index(rag_index.index_path):
+                self.stderr.write(f"Could not load {rag_index.index_path}")
+                failed += 1
+                continue
+
+            directory = rag_index.index_path[:-len('.pkl')]
+            rag_processor.save_index(directory)
+
+            old_path = rag_index.index_path
+            rag_index.index_path = directory
+            rag_index.save()
+            if options['delete']:
+                os.remove(old_path)
+
+            converted += 1
+            self.stdout.write(f"Converted {old_path} -> {directory}")
+
+        self.stdout.write(self.style.SUCCESS(f"Converted {converted} index(es), {failed} failed"))
@@ -0,0 +1,100 @@
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.core.management.base import BaseCommand
+from model.context_packing import get_token_counter
+
+
+def stub_completion(messages, model, max_tokens):
+    """A deterministic chat completion: the first sentences of the excerpts in the last message."""
+    counter = get_token_counter()
+    prompt = "\n".join(message.get('content') or '' for message in messages)
+    last = (messages[-1].get('content') or '') if messages else ''
+    excerpts = last.split('\n\nQuestion:', 1)[0].removeprefix('Excerpts:').strip()
+    sentences = re.split(r'(?<=[.!?])\s+', excerpts)
+    text = counter.truncate(" ".join(sentences[:3]) or "The excerpts do not contain an answer.", max_tokens)
+    prompt_tokens = counter.count(prompt)
+    completion_tokens = counter.count(text)
+    return {
+        "id": f"chatcmpl-stub-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    model = 'stub'
+    delay = 0.0
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send(200, {"object": "list", "data": [{"id": self.model, "object": "model", "owned_by": "stub"}]})
+        else:
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        except ValueError:
+            self._send(400, {"error": {"message": "Request body is not JSON"}})
+            return
+        if request.get('stream'):
+            self._send(400, {"error": {"message": "Streaming is not supported by the stub"}})
+            return
+        if self.delay:
+            time.sleep(self.delay)
+        self._send(200, stub_completion(request.get('messages') or [], request.get('model') or self.model,
+                                        request.get('max_tokens') or 512))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = ("Serve a minimal OpenAI-compatible chat completions API that answers with excerpts of "
+            "the prompt, for developing and load testing with RAG_GENERATOR = 'openai' without a model.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8080)
+        parser.add_argument('--model', default='stub', help='Model name reported by /v1/models.')
+        parser.add_argument(
+            '--delay',
+            type=float,
+            default=0.0,
+            help='Seconds to sleep per completion, to simulate model latency.',
+        )
+
+    def handle(self, *args, **options):
+        handler = type('Handler', (StubHandler,), {'model': options['model'], 'delay': options['delay']})
+        server = ThreadingHTTPServer((options['host'], options['port']), handler)
+        self.stdout.write(f"OpenAI-compatible stub listening on http://{options['host']}:{options['port']}/v1")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,95 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _init_worker(processes):
+    django.setup()
+    from model.ingestion import set_concurrent_jobs
+    set_concurrent_jobs(processes)
+
+
+def _run_job(job_id):
+    # Imported lazily: spawned children unpickle this function before _init_worker sets up Django
+    from model.ingestion import run_job
+    return run_job(job_id)
+
+
+class Command(BaseCommand):
+    help = "Process queued document ingestion jobs using a local process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=getattr(settings, 'RAG_INGESTION_WORKERS', 2),
+            help='Number of worker processes.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'RAG_INGESTION_POLL_INTERVAL', 2.0),
+            help='Seconds to sleep when the queue is empty.',
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=getattr(settings, 'RAG_INGESTION_STALE_AFTER', 3600),
+            help='Requeue running jobs started more than this many seconds ago on startup.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is drained instead of polling forever.',
+        )
+
+    def handle(self, *args, **options):
+        from model.ingestion import claim_next_job, fail_job, requeue_stale_jobs
+
+        processes = options['processes']
+        requeued = requeue_stale_jobs(options['stale_after'])
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+        # Spawned children set up Django themselves and never share the parent's connections
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        pool = ProcessPoolExecutor(max_workers=processes, mp_context=context,
+                                   initializer=_init_worker, initargs=(processes,))
+        running = {}
+        try:
+            while True:
+                for future, job_id in list(running.items()):
+                    if not future.done():
+                        continue
+                    try:
+                        ok = future.result()
+                        self.stdout.write(f"Job {job_id} {'finished' if ok else 'failed'}")
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        fail_job(job_id, str(e))
+                        self.stderr.write(f"Job {job_id} crashed: {e}")
+                    del running[future]
+
+                job_id = claim_next_job() if len(running) < processes else None
+                if job_id is not None:
+                    self.stdout.write(f"Starting job {job_id}")
+                    running[pool.submit(_run_job, job_id)] = job_id
+                    continue
+
+                if not running and options['once']:
+                    break
+                time.sleep(options['poll_interval'] if not running else 0.2)
+        except BrokenProcessPool:
+            # A child died hard (e.g. OOM killed); give its jobs another attempt
+            for job_id in running.values():
+                fail_job(job_id, 'Worker process terminated unexpectedly')
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
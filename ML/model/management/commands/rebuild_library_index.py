@@ -0,0 +1,41 @@
+import os
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from model.library_index import get_library_index
+from model.models import RAGIndex
+from model.rag_processor import EMBEDDINGS_FILE
+
+
+class Command(BaseCommand):
+    help = "Add every processed document to its owner's cross-document library index."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--unsynced',
+            action='store_true',
+            help='Only re-add documents whose last library update failed.',
+        )
+
+    def handle(self, *args, **options):
+        added = skipped = 0
+        rag_indexes = RAGIndex.objects.select_related('document').filter(document__is_processed=True)
+        if options['unsynced']:
+            rag_indexes = rag_indexes.filter(library_synced=False)
+        for rag_index in rag_indexes:
+            embeddings_path = os.path.join(rag_index.index_path, EMBEDDINGS_FILE)
+            if rag_index.embedding_model != settings.RAG_EMBEDDING_MODEL or not os.path.exists(embeddings_path):
+                # Other embedding spaces and legacy .pkl indexes cannot join the library
+                self.stderr.write(f"Skipping {rag_index.document.title}")
+                skipped += 1
+                continue
+
+            document = rag_index.document
+            get_library_index(document.uploaded_by_id).add_document(
+                document.id, np.load(embeddings_path, mmap_mode='r')
+            )
+            if not rag_index.library_synced:
+                RAGIndex.objects.filter(pk=rag_index.pk).update(library_synced=True)
+            added += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Added {added} document(s), skipped {skipped}"))
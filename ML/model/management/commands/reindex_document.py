@@ -0,0 +1,27 @@
+import shutil
+from django.core.management.base import BaseCommand, CommandError
+from model.ingestion import enqueue_document
+from model.models import Document
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue a document for reprocessing, optionally replacing its PDF first. Chunks that "
+        "did not change keep their rows and vectors; only new or edited ones are embedded."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('document_id', type=int)
+        parser.add_argument('--file', help='New version of the PDF to copy over the stored one.')
+
+    def handle(self, *args, **options):
+        try:
+            document = Document.objects.get(id=options['document_id'])
+        except Document.DoesNotExist:
+            raise CommandError(f"Document {options['document_id']} does not exist")
+
+        if options['file']:
+            shutil.copyfile(options['file'], document.file_path)
+
+        job = enqueue_document(document)
+        self.stdout.write(self.style.SUCCESS(f"Queued {document.title} as job {job.id}"))
@@ -0,0 +1,165 @@
+import asyncio
+import cProfile
+import functools
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+import numpy as np
+from django.conf import settings
+
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class StageLatency:
+    """In-process latency recorder for the stages of the query and ingestion pipelines.
+
+    Samples are kept per (scope, stage), e.g. ("query", "encode"); quantiles are computed
+    over the most recent window samples while count and sum cover the whole process life,
+    matching a Prometheus summary.
+    """
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self._samples: Dict[Tuple[str, str], deque] = {}
+        self._totals: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, scope: str, stage: str, seconds: float):
+        key = (scope, stage)
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+                self._totals[key] = [0, 0.0]
+            samples.append(seconds)
+            totals = self._totals[key]
+            totals[0] += 1
+            totals[1] += seconds
+
+    @contextmanager
+    def time(self, scope: str, stage: str) -> Iterator[None]:
+        """Record how long the with-block takes, measured with perf_counter."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(scope, stage, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """{scope: {stage: {count, sum, p50, p95, p99}}} with latencies in seconds."""
+        with self._lock:
+            items = [(key, np.array(samples), tuple(self._totals[key])) for key, samples in self._samples.items()]
+        result: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for (scope, stage), samples, (count, total) in sorted(items, key=lambda item: item[0]):
+            values = np.quantile(samples, QUANTILES)
+            stats = {"count": count, "sum": total}
+            stats.update({f"p{int(q * 100)}": float(value) for q, value in zip(QUANTILES, values)})
+            result.setdefault(scope, {})[stage] = stats
+        return result
+
+    def prometheus(self, name: str = 'rag_stage_seconds') -> str:
+        """The recorded latencies as one Prometheus summary in the text exposition format."""
+        lines = [
+            f"# HELP {name} Latency of RAG pipeline stages in seconds.",
+            f"# TYPE {name} summary",
+        ]
+        for scope, stages in self.snapshot().items():
+            for stage, stats in stages.items():
+                labels = f'scope="{scope}",stage="{stage}"'
+                for q in QUANTILES:
+                    lines.append(f'{name}{{{labels},quantile="{q}"}} {stats[f"p{int(q * 100)}"]!r}')
+                lines.append(f"{name}_sum{{{labels}}} {stats['sum']!r}")
+                lines.append(f"{name}_count{{{labels}}} {stats['count']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+stage_latency = StageLatency()
+
+
+def record_latency(view):
+    """Decorator recording a view's latency as the ("request", <view name>) stage."""
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            with stage_latency.time('request', view.__name__):
+                return await view(*args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with stage_latency.time('request', view.__name__):
+                return view(*args, **kwargs)
+    return wrapper
+
+
+def prometheus_gauges(prefix: str, stats: Dict[str, Any]) -> str:
+    """Numeric values of a stats() dict as Prometheus gauges named <prefix>_<key>."""
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f"# TYPE {prefix}_{key} gauge")
+            lines.append(f"{prefix}_{key} {value!r}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+class SampledProfiler:
+    """Run a random fraction of calls under cProfile and dump each profile to directory.
+
+    Only one call is profiled at a time; concurrent calls are never sampled. Dumps are
+    named <name>-<timestamp>-<pid>-<n>.prof and can be read with pstats or snakeviz.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, directory: Optional[str] = None):
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self._lock = threading.Lock()
+        self.profiles_written = 0
+
+    @contextmanager
+    def sample(self, name: str) -> Iterator[Optional[cProfile.Profile]]:
+        if (not self.sample_rate or not self.directory or random.random() >= self.sample_rate
+                or not self._lock.acquire(blocking=False)):
+            yield None
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                yield profile
+            finally:
+                profile.disable()
+                os.makedirs(self.directory, exist_ok=True)
+                stamp = time.strftime('%Y%m%d-%H%M%S')
+                filename = f"{name}-{stamp}-{os.getpid()}-{self.profiles_written}.prof"
+                profile.dump_stats(os.path.join(self.directory, filename))
+                self.profiles_written += 1
+        finally:
+            self._lock.release()
+
+    def call(self, name: str, fn, *args, **kwargs) -> Any:
+        """fn(*args, **kwargs), profiled if sampled."""
+        with self.sample(name):
+            return fn(*args, **kwargs)
+
+
+_profiler = None
+
+
+def get_profiler() -> SampledProfiler:
+    """Return the process-wide profiler configured by RAG_PROFILE_SAMPLE_RATE and RAG_PROFILE_DIR."""
+    global _profiler
+    if _profiler is None:
+        _profiler = SampledProfiler(
+            getattr(settings, 'RAG_PROFILE_SAMPLE_RATE', 0.0),
+            getattr(settings, 'RAG_PROFILE_DIR', None),
+        )
+    return _profiler
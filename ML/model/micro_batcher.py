@@ -0,0 +1,111 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+from django.conf import settings
+from .embedding_registry import get_embedding_model
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-item calls into one batched call.
+
+    Items are queued for a dedicated batching thread. It takes the oldest waiting item, keeps
+    collecting until max_batch_size items are pending or max_wait seconds have passed since
+    that item arrived, runs batch_fn over the batch and resolves each item's future. Callers
+    on the event loop await submit_async and so hold no executor thread while they wait,
+    which lets a batch grow beyond the number of query workers.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_wait: float = 0.005,
+                 max_batch_size: int = 32):
+        self.batch_fn = batch_fn
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def submit_future(self, item: Any) -> Future:
+        """Queue item for the next batch; the returned future resolves to its result."""
+        future: Future = Future()
+        with self._lock:
+            # Also restarts the thread in a worker forked after the batcher was created
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._collect, name='rag-query-batcher', daemon=True)
+                self._thread.start()
+        self._queue.put((item, future, time.monotonic()))
+        return future
+
+    def submit(self, item: Any) -> Any:
+        """Add item to a batch and block the calling thread until its result is ready."""
+        return self.submit_future(item).result()
+
+    async def submit_async(self, item: Any) -> Any:
+        """Add item to a batch and wait for its result without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit_future(item))
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = batch[0][2] + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            # Callers that stopped waiting (e.g. a timed out request) cancelled their futures
+            self._run([(item, future) for item, future, _ in batch if future.set_running_or_notify_cancel()])
+
+    def _run(self, batch: List[tuple]):
+        if not batch:
+            return
+        try:
+            results = self.batch_fn([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch function returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        with self._lock:
+            self.batches += 1
+            self.items += len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            }
+
+
+_batchers: Dict[str, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_query_batcher(model_name: str) -> Optional[MicroBatcher]:
+    """Return the process-wide query micro-batcher for a model, or None when disabled."""
+    window_ms = getattr(settings, 'RAG_QUERY_BATCH_WINDOW_MS', 0)
+    if not window_ms:
+        return None
+    with _batchers_lock:
+        batcher = _batchers.get(model_name)
+        if batcher is None:
+            batcher = _batchers[model_name] = MicroBatcher(
+                lambda queries: get_embedding_model(model_name).encode(queries),
+                max_wait=window_ms / 1000,
+                max_batch_size=getattr(settings, 'RAG_QUERY_BATCH_MAX_SIZE', 32),
+            )
+        return batcher
+
+
+def get_batcher_stats() -> Dict[str, Dict[str, Any]]:
+    with _batchers_lock:
+        return {name: batcher.stats() for name, batcher in _batchers.items()}
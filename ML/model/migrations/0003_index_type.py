@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model', '0002_ingestion_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ragindex',
+            name='index_params',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='ragindex',
+            name='index_type',
+            field=models.CharField(default='flat', max_length=20),
+        ),
+    ]
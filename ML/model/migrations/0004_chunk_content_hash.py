@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:48
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_existing_chunks(apps, schema_editor):
+    DocumentChunk = apps.get_model('model', 'DocumentChunk')
+    batch = []
+    for chunk in DocumentChunk.objects.only('id', 'content').iterator(chunk_size=1000):
+        chunk.content_hash = hashlib.sha1(chunk.content.encode('utf-8')).hexdigest()
+        batch.append(chunk)
+        if len(batch) >= 1000:
+            DocumentChunk.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    if batch:
+        DocumentChunk.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model', '0003_index_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentchunk',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.RunPython(hash_existing_chunks, migrations.RunPython.noop),
+    ]
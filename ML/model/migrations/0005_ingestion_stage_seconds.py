@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model', '0004_chunk_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='stage_seconds',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
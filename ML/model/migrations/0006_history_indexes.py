@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model', '0005_ingestion_stage_seconds'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['uploaded_by', '-upload_date', '-id'], name='model_docum_uploade_3422f8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='query',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='model_query_user_id_084366_idx'),
+        ),
+    ]
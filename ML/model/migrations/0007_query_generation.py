@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model', '0006_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='query',
+            name='completion_tokens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='query',
+            name='generation_model',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='query',
+            name='generation_time',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='query',
+            name='prompt_tokens',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('model', '0007_query_generation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ragindex',
+            name='library_synced',
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -1,8 +1,20 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Document(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_PROCESSED = 'processed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_PROCESSED, 'Processed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
     title = models.CharField(max_length=200)
     file_path = models.CharField(max_length=500)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -10,6 +22,15 @@ class Document(models.Model):
     is_processed = models.BooleanField(default=False)
     num_chunks = models.IntegerField(default=0)
     file_size = models.IntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    progress = models.IntegerField(default=0)
+    processing_error = models.TextField(blank=True, null=True)
+    
+    class Meta:
+        indexes = [
+            # Serves the newest-first, keyset-paginated document list of one user
+            models.Index(fields=['uploaded_by', '-upload_date', '-id']),
+        ]
     
     def __str__(self):
         return self.title
@@ -19,6 +40,8 @@ class DocumentChunk(models.Model):
     document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='chunks')
     chunk_index = models.IntegerField()
     content = models.TextField()
+    # SHA-1 of content, used to reuse unchanged chunks when a document is reprocessed
+    content_hash = models.CharField(max_length=40, blank=True, default='')
     embedding_path = models.CharField(max_length=500, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -36,6 +59,17 @@ class Query(models.Model):
     document = models.ForeignKey(Document, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     response_time = models.FloatField(default=0.0)
+    # Generator stage accounting; cached answers report the tokens of the original generation
+    generation_model = models.CharField(max_length=200, blank=True, default='')
+    prompt_tokens = models.IntegerField(default=0)
+    completion_tokens = models.IntegerField(default=0)
+    generation_time = models.FloatField(default=0.0)
+    
+    class Meta:
+        indexes = [
+            # Serves the newest-first, keyset-paginated query history of one user
+            models.Index(fields=['user', '-created_at', '-id']),
+        ]
     
     def __str__(self):
         return f"Query by {self.user.username} on {self.created_at}"
@@ -45,8 +79,44 @@ class RAGIndex(models.Model):
     document = models.OneToOneField(Document, on_delete=models.CASCADE, related_name='rag_index')
     index_path = models.CharField(max_length=500)
     embedding_model = models.CharField(max_length=100, default='all-MiniLM-L6-v2')
+    index_type = models.CharField(max_length=20, default='flat')
+    index_params = models.JSONField(default=dict, blank=True)
+    # False after a failed library update; the next ingestion then re-adds every vector
+    library_synced = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"RAG Index for {self.document.title}"
+
+
+class IngestionJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='ingestion_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    stage_seconds = models.JSONField(default=dict, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+    
+    def __str__(self):
+        return f"Ingestion of {self.document.title} ({self.status})"
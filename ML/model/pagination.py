@@ -0,0 +1,48 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import List, Optional, Tuple
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that was not produced by encode_cursor."""
+
+
+def encode_cursor(timestamp: datetime, pk: int) -> str:
+    """Opaque, URL-safe cursor pointing just past the row (timestamp, pk)."""
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{pk}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, pk = raw.rsplit('|', 1)
+        parsed = parse_datetime(timestamp)
+        if parsed is None:
+            raise ValueError(timestamp)
+        return parsed, int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def keyset_page(queryset: QuerySet, field: str, cursor: Optional[str], page_size: int) -> Tuple[List, Optional[str]]:
+    """One page of queryset, newest first by (field, id), starting after cursor.
+
+    Unlike OFFSET pagination the database seeks straight to the cursor through an index on
+    (owner, field, id), so every page costs the same however deep it is. Returns the rows
+    and the cursor of the next page, or None on the last page.
+    """
+    queryset = queryset.order_by(f'-{field}', '-id')
+    if cursor:
+        timestamp, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(**{f'{field}__lt': timestamp}) | Q(**{field: timestamp, 'id__lt': pk}))
+
+    # One extra row tells whether another page exists
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, field), last.pk)
@@ -0,0 +1,61 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+from PyPDF2 import PdfReader
+
+
+# (1-based page number, extracted text, seconds spent extracting it)
+PageResult = Tuple[int, str, float]
+
+# Documents shorter than this are extracted serially; process start-up would dominate
+MIN_PAGES_FOR_PARALLEL = 64
+
+
+def count_pages(pdf_path: str) -> int:
+    with open(pdf_path, 'rb') as file:
+        return len(PdfReader(file).pages)
+
+
+def iter_page_results(pdf_path: str, start: int = 0, end: Optional[int] = None) -> Iterator[PageResult]:
+    """Yield (page_no, text, seconds) for pages [start, end) in order."""
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PdfReader(file)
+        pages = pdf_reader.pages
+        end = len(pages) if end is None else min(end, len(pages))
+        for page_index in range(start, end):
+            page_start = time.perf_counter()
+            text = pages[page_index].extract_text() or ""
+            yield page_index + 1, text, time.perf_counter() - page_start
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[PageResult]:
+    return list(iter_page_results(pdf_path, start, end))
+
+
+def iter_pages(pdf_path: str, workers: Optional[int] = None) -> Iterator[PageResult]:
+    """Yield every page in order, sharding page ranges across a process pool for large documents.
+
+    Shards are yielded as soon as they and all earlier shards have finished.
+    """
+    num_pages = count_pages(pdf_path)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or num_pages < MIN_PAGES_FOR_PARALLEL:
+        yield from iter_page_results(pdf_path, 0, num_pages)
+        return
+
+    # A few shards per worker keeps the pool busy when some pages are much slower than others
+    shard_size = max(1, -(-num_pages // (workers * 4)))
+    ranges = [(start, min(start + shard_size, num_pages)) for start in range(0, num_pages, shard_size)]
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=context) as pool:
+        futures = [pool.submit(_extract_page_range, pdf_path, start, end) for start, end in ranges]
+        for future in futures:
+            yield from future.result()
+
+
+def extract_pages(pdf_path: str, workers: Optional[int] = None) -> List[PageResult]:
+    """Extract every page, in page order, in parallel for large documents."""
+    return list(iter_pages(pdf_path, workers))
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from django.conf import settings
+from .metrics import get_profiler
+
+
+class QueryQueueFull(Exception):
+    """Raised when every worker is busy and the pending queue is at capacity."""
+
+
+class QueryExecutor:
+    """Bounded thread pool that runs CPU-bound query work (index loading, encoding, FAISS
+    search) off the event loop so async views never block it.
+
+    At most max_workers calls run at once and at most max_pending more wait for a worker;
+    beyond that submissions are rejected immediately so callers can answer 429. A sampled
+    fraction of calls is profiled on the worker thread (see RAG_PROFILE_SAMPLE_RATE).
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 256):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='rag-query')
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _release(self, _future):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self._slots.release()
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Run fn(*args) on the pool and await its result.
+
+        Raises QueryQueueFull when saturated and asyncio.TimeoutError after timeout seconds.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise QueryQueueFull()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._executor.submit(get_profiler().call, f'query-{fn.__name__}', fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        # The slot is only freed once the work really finishes, even if the caller gave up
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            # Cancels the work if it is still queued; running work cannot be interrupted
+            with self._lock:
+                self.timed_out += 1
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+            }
+
+
+query_executor = QueryExecutor(
+    max_workers=getattr(settings, 'RAG_QUERY_WORKERS', 4),
+    max_pending=getattr(settings, 'RAG_QUERY_MAX_PENDING', 256),
+)
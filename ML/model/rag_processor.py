@@ -1,48 +1,161 @@
 import os
 import pickle
-from typing import List, Dict, Any
-from PyPDF2 import PdfReader
-from sentence_transformers import SentenceTransformer
+import shutil
+import tempfile
+import time
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 import faiss
 import numpy as np
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
+from .embedding_registry import get_embedding_model
+from .embedding_cache import EmbeddingCache
+from .chunking import ChunkSpan, TextChunker
+from .chunk_store import ChunkStore, ChunkStoreWriter, content_hash, write_chunk_store
+from .pdf_extraction import count_pages, extract_pages, iter_pages
+from .index_factory import QUANTIZED_TYPES, build_index_from_vectors, index_memory_bytes, rescore
+from .lexical_index import LexicalIndex, LexicalIndexWriter, has_lexical_index, write_lexical_index
+from .metrics import stage_latency
+from .context_packing import pack_context
+
+
+INDEX_FILE = 'index.faiss'
+EMBEDDINGS_FILE = 'embeddings.npy'
+EMBEDDINGS_SPILL_FILE = 'embeddings.f32'
+# Newer FAISS maps codes of every index type with IO_FLAG_MMAP_IFC; combining it with
+# IO_FLAG_MMAP breaks IVF loading, so use whichever the installed version offers. Releases
+# without IO_FLAG_MMAP_IFC (before 1.11) only map IVF inverted lists and read flat, SQ and
+# PQ codes fully into memory
+FAISS_MMAP_FLAGS = (getattr(faiss, 'IO_FLAG_MMAP_IFC', 0) or faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+# Reciprocal rank fusion constant: a hit at rank r contributes 1 / (RRF_K + r)
+RRF_K = 60
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a question for cache keys: case-folded with whitespace collapsed.
+
+    Matches the default all-MiniLM-L6-v2 model, whose tokenizer is uncased anyway.
+    """
+    return " ".join(query.casefold().split())
+
+
+class PreviousEmbeddings:
+    """Embeddings of an earlier version of a document, looked up by chunk content hash."""
+    
+    def __init__(self, rows: Dict[str, int], embeddings: np.ndarray):
+        self.rows = rows
+        self.embeddings = embeddings
+    
+    def get_many(self, texts: List[str]) -> Dict[int, np.ndarray]:
+        """Map positions in texts to the vectors of identical chunks in the previous version."""
+        found = {}
+        for i, text in enumerate(texts):
+            row = self.rows.get(content_hash(text))
+            if row is not None:
+                found[i] = np.asarray(self.embeddings[row], dtype=np.float32)
+        return found
 
 
 class RAGProcessor:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        self.embedding_model = SentenceTransformer(model_name)
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-        )
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", extraction_workers: Optional[int] = None,
+                 batch_size: int = 256, work_dir: Optional[str] = None,
+                 embedding_cache: Optional[EmbeddingCache] = None,
+                 index_type: str = 'flat', index_params: Optional[Dict[str, Any]] = None,
+                 query_batcher=None, query_cache=None, hybrid: bool = True, hybrid_candidates: int = 20,
+                 rescore_factor: int = 4, previous_embeddings: Optional[PreviousEmbeddings] = None,
+                 context_max_chars: Optional[int] = None, context_max_tokens: Optional[int] = None):
+        self.model_name = model_name
+        self.context_max_chars = context_max_chars
+        self.context_max_tokens = context_max_tokens
+        self.previous_embeddings = previous_embeddings
+        self.reused_embeddings = 0
+        self.rescore_factor = rescore_factor
+        self.hybrid = hybrid
+        self.hybrid_candidates = hybrid_candidates
+        self.lexical_index = None
+        self.query_batcher = query_batcher
+        self.query_cache = query_cache
+        self.extraction_workers = extraction_workers
+        self.batch_size = batch_size
+        self.work_dir = work_dir
+        self._staging_dir = None
+        self.embedding_cache = embedding_cache
+        self.embedding_cache_hits = 0
+        self.embedding_cache_misses = 0
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        self._embedding_model = None
+        self.chunk_size = 1000
+        self.chunk_overlap = 200
+        self.chunker = TextChunker(self.chunk_size, self.chunk_overlap)
         self.index = None
-        self.documents = []
+        self.documents = ChunkStore.from_texts([])
         self.embeddings = []
+        self.page_timings = []
+        self.stage_seconds: Dict[str, float] = {}
+    
+    @property
+    def embedding_model(self):
+        """Shared embedding model, resolved on first use so index-only work never loads it."""
+        if self._embedding_model is None:
+            self._embedding_model = get_embedding_model(self.model_name)
+        return self._embedding_model
         
     def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extract text from PDF file."""
-        text = ""
+        """Extract text from PDF file, in parallel for large documents."""
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
+            pages = extract_pages(pdf_path, workers=self.extraction_workers)
         except Exception as e:
             print(f"Error reading PDF: {e}")
             return ""
-        return text
+        self.page_timings = [(page_no, seconds) for page_no, _, seconds in pages]
+        return "".join(page_text + "\n" for _, page_text, _ in pages)
     
-    def chunk_text(self, text: str) -> List[Document]:
+    def iter_pdf_pages(self, pdf_path: str) -> Iterator[Tuple[int, str]]:
+        """Lazily yield (page_no, text) for each page, recording per-page timings."""
+        self.page_timings = []
+        for page_no, page_text, seconds in iter_pages(pdf_path, workers=self.extraction_workers):
+            self.page_timings.append((page_no, seconds))
+            yield page_no, page_text
+    
+    def slowest_pages(self, n: int = 5) -> List[Tuple[int, float]]:
+        """Return the n pages that took longest to extract in the last run."""
+        return sorted(self.page_timings, key=lambda timing: timing[1], reverse=True)[:n]
+    
+    def chunk_text(self, text: str) -> ChunkStore:
         """Split text into chunks."""
-        documents = self.text_splitter.split_text(text)
-        return [Document(page_content=doc) for doc in documents]
+        return ChunkStore.from_texts(text[start:end] for start, end in self.chunker.split(text))
+    
+    def iter_chunks(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[str, ChunkSpan]]:
+        """Incrementally split a stream of pages into (text, span) chunks, buffering about one chunk of text."""
+        return self.chunker.iter_spans(pages)
     
     def generate_embeddings(self, texts: List[str]) -> np.ndarray:
-        """Generate embeddings for text chunks."""
-        embeddings = self.embedding_model.encode(texts)
-        return np.array(embeddings)
+        """Generate embeddings for text chunks.
+        
+        Chunks unchanged since the previous version of the document reuse its vectors, and
+        only those still missing from the embedding cache are encoded.
+        """
+        if self.previous_embeddings is None and self.embedding_cache is None:
+            embeddings = self.embedding_model.encode(texts)
+            return np.array(embeddings)
+        
+        known = self.previous_embeddings.get_many(texts) if self.previous_embeddings is not None else {}
+        self.reused_embeddings += len(known)
+        missing = [i for i in range(len(texts)) if i not in known]
+        
+        if missing and self.embedding_cache is not None:
+            cached = self.embedding_cache.get_many(self.model_name, [texts[i] for i in missing])
+            known.update((missing[j], vector) for j, vector in cached.items())
+            self.embedding_cache_hits += len(cached)
+            missing = [i for i in missing if i not in known]
+            self.embedding_cache_misses += len(missing)
+        
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            encoded = np.asarray(self.embedding_model.encode(missing_texts), dtype=np.float32)
+            if self.embedding_cache is not None:
+                self.embedding_cache.put_many(self.model_name, missing_texts, encoded)
+            known.update(zip(missing, encoded))
+        return np.stack([known[i] for i in range(len(texts))])
     
     def create_faiss_index(self, embeddings: np.ndarray) -> faiss.IndexFlatL2:
         """Create FAISS index for similarity search."""
@@ -51,88 +164,350 @@ class RAGProcessor:
         index.add(embeddings.astype('float32'))
         return index
     
-    def process_pdf(self, pdf_path: str) -> Dict[str, Any]:
-        """Process PDF and create RAG system."""
-        # Extract text from PDF
-        text = self.extract_text_from_pdf(pdf_path)
-        if not text:
-            return {"error": "Failed to extract text from PDF"}
+    def process_pdf(self, pdf_path: str, progress_callback: Optional[Callable[[float], None]] = None) -> Dict[str, Any]:
+        """Process PDF and create RAG system.
         
-        # Chunk text
-        documents = self.chunk_text(text)
-        self.documents = documents
+        Pages are extracted lazily, chunked incrementally and embedded in batches of batch_size.
+        Chunk text and embeddings are spilled to a staging directory (moved into place by
+        save_index) instead of being kept in memory, and the index is then built from the
+        memory-mapped embeddings. progress_callback, if given, is called with the completed
+        fraction. Wall time per stage is reported in stage_seconds.
+        """
+        report = progress_callback or (lambda fraction: None)
         
-        # Generate embeddings
-        texts = [doc.page_content for doc in documents]
-        embeddings = self.generate_embeddings(texts)
-        self.embeddings = embeddings
+        self.cleanup()
+        self.index = None
+        self.embedding_cache_hits = self.embedding_cache_misses = self.reused_embeddings = 0
+        self.stage_seconds = {"embed": 0.0, "spill": 0.0}
+        started = time.perf_counter()
+        self._staging_dir = tempfile.mkdtemp(prefix='rag_', dir=self.work_dir)
+        chunk_writer = ChunkStoreWriter(self._staging_dir)
+        lexical_writer = LexicalIndexWriter(self._staging_dir)
+        spill_path = os.path.join(self._staging_dir, EMBEDDINGS_SPILL_FILE)
+        self._spilled_vectors = 0
+        self._dimension = None
         
-        # Create FAISS index
-        self.index = self.create_faiss_index(embeddings)
+        try:
+            num_pages = max(count_pages(pdf_path), 1)
+            with open(spill_path, 'wb') as spill:
+                batch = []
+                for chunk, span in self.iter_chunks(self.iter_pdf_pages(pdf_path)):
+                    batch.append((chunk, span))
+                    if len(batch) >= self.batch_size:
+                        self._add_batch(batch, chunk_writer, lexical_writer, spill)
+                        batch = []
+                        report(0.9 * len(self.page_timings) / num_pages)
+                if batch:
+                    self._add_batch(batch, chunk_writer, lexical_writer, spill)
+            chunk_writer.close()
+            lexical_writer.close()
+            # Page extraction and chunking are interleaved with the batches; they get the rest
+            self.stage_seconds["extract_chunk"] = (
+                time.perf_counter() - started - self.stage_seconds["embed"] - self.stage_seconds["spill"]
+            )
+        except Exception as e:
+            print(f"Error reading PDF: {e}")
+            # Whatever the writers hold is discarded with the staging directory
+            chunk_writer.abort()
+            lexical_writer.abort()
+            self.cleanup()
+            return {"error": f"Failed to process PDF: {e}"}
+        
+        if not self._spilled_vectors:
+            self.cleanup()
+            return {"error": "Failed to extract text from PDF"}
+        
+        start = time.perf_counter()
+        self.embeddings = self._finalize_embeddings(spill_path)
+        self.documents = ChunkStore(self._staging_dir)
+        self.lexical_index = LexicalIndex(self._staging_dir) if self.hybrid else None
+        self.stage_seconds["finalize"] = time.perf_counter() - start
+        
+        # Build the index from the memory-mapped embeddings, training on a sample if needed
+        start = time.perf_counter()
+        self.index, self.index_type, self.index_params = build_index_from_vectors(
+            self.embeddings, self.index_type, self.index_params, batch_size=self.batch_size * 16
+        )
+        self.stage_seconds["index_build"] = time.perf_counter() - start
+        report(1.0)
         
         return {
             "status": "success",
-            "num_chunks": len(documents),
-            "embedding_dimension": embeddings.shape[1]
+            "num_chunks": len(self.documents),
+            "embedding_dimension": self.index.d,
+            "index_type": self.index_type,
+            "index_params": self.index_params,
+            "index_bytes_per_chunk": index_memory_bytes(self.index) / len(self.documents),
+            "num_pages": len(self.page_timings),
+            "extraction_seconds": sum(seconds for _, seconds in self.page_timings),
+            "slowest_pages": self.slowest_pages(),
+            "embedding_cache_hits": self.embedding_cache_hits,
+            "embedding_cache_misses": self.embedding_cache_misses,
+            "embedding_cache_hit_ratio": self.embedding_cache_hits / max(len(self.documents), 1),
+            "reused_embeddings": self.reused_embeddings,
+            "stage_seconds": dict(self.stage_seconds),
         }
     
-    def similarity_search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar documents."""
+    def _add_batch(self, batch: List[Tuple[str, ChunkSpan]], chunk_writer: ChunkStoreWriter,
+                   lexical_writer: LexicalIndexWriter, spill):
+        """Embed one batch of chunks, spill the vectors and text to disk and index its terms."""
+        texts = [chunk for chunk, _ in batch]
+        start = time.perf_counter()
+        embeddings = np.ascontiguousarray(self.generate_embeddings(texts), dtype=np.float32)
+        embedded = time.perf_counter()
+        self._dimension = embeddings.shape[1]
+        self._spilled_vectors += len(embeddings)
+        spill.write(embeddings.tobytes())
+        for chunk, span in batch:
+            chunk_writer.append(chunk, pages=(span.first_page, span.last_page), span=(span.start, span.end))
+            lexical_writer.append(chunk)
+        self.stage_seconds["embed"] += embedded - start
+        self.stage_seconds["spill"] += time.perf_counter() - embedded
+    
+    def _finalize_embeddings(self, spill_path: str) -> np.ndarray:
+        """Turn the raw embedding spill file into a memory-mapped .npy, copying block by block."""
+        shape = (self._spilled_vectors, self._dimension)
+        npy_path = os.path.join(self._staging_dir, EMBEDDINGS_FILE)
+        raw = np.memmap(spill_path, dtype=np.float32, mode='r', shape=shape)
+        out = np.lib.format.open_memmap(npy_path, mode='w+', dtype=np.float32, shape=shape)
+        step = self.batch_size * 16
+        for start in range(0, shape[0], step):
+            out[start:start + step] = raw[start:start + step]
+        out.flush()
+        del raw, out
+        os.remove(spill_path)
+        return np.load(npy_path, mmap_mode='r')
+    
+    def cleanup(self):
+        """Remove the staging directory of a processed document that was never saved."""
+        if self._staging_dir is not None:
+            shutil.rmtree(self._staging_dir, ignore_errors=True)
+            self._staging_dir = None
+    
+    def encode_query(self, query: str) -> np.ndarray:
+        """Embed a query as a (1, dimension) float32 array ready for FAISS."""
+        with stage_latency.time('query', 'encode'):
+            return self._encode_cached(query)
+    
+    def _encode_cached(self, query: str) -> np.ndarray:
+        if self.query_cache is not None:
+            key = (self.model_name, normalize_query(query))
+            query_embedding = self.query_cache.get(key)
+            if query_embedding is None:
+                query_embedding = self._encode_single(query)
+                self.query_cache.put(key, query_embedding, query_embedding.nbytes)
+            return query_embedding
+        return self._encode_single(query)
+    
+    def _encode_single(self, query: str) -> np.ndarray:
+        if self.query_batcher is not None:
+            # Coalesced with concurrent queries into one encode call
+            return np.asarray(self.query_batcher.submit(query), dtype=np.float32)[None, :]
+        return self.encode_queries([query])
+    
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed several queries in one encode call as an (n, dimension) float32 array."""
+        return np.asarray(self.embedding_model.encode(queries), dtype=np.float32)
+    
+    def similarity_search(self, query: str, k: int = 5,
+                          query_embedding: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Search for similar documents, encoding the query unless its embedding is given."""
         if self.index is None:
             return []
         
-        # Generate query embedding
-        query_embedding = self.embedding_model.encode([query])
+        if query_embedding is None:
+            query_embedding = self.encode_query(query)
+        return self.search_embeddings(query_embedding, k, queries=[query])[0]
+    
+    def search_embeddings(self, query_embeddings: np.ndarray, k: int = 5,
+                          queries: Optional[List[str]] = None) -> List[List[Dict[str, Any]]]:
+        """Search the index with many query embeddings at once; returns one result list per query.
+        
+        Candidates from a quantized index are rescored against the full-precision embeddings.
+        When the query texts are given and a lexical index is loaded, each query's vector
+        hits are fused with its BM25 hits.
+        """
+        if self.index is None:
+            return [[] for _ in range(len(query_embeddings))]
+        
+        with stage_latency.time('query', 'search'):
+            # One FAISS call for the whole batch
+            distances, indices = self.index.search(query_embeddings, self._candidates(k, queries))
+            refined = [
+                self._refine(queries[row] if queries is not None else None, query_embeddings[row],
+                             row_distances, row_indices, k)
+                for row, (row_distances, row_indices) in enumerate(zip(distances, indices))
+            ]
+        
+        with stage_latency.time('query', 'read_chunks'):
+            return [list(self.iter_hits(row_distances, row_indices)) for row_distances, row_indices in refined]
+    
+    def search_ids(self, query: str, k: int = 5,
+                   query_embedding: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Distances and chunk ids of a query's nearest neighbours, without reading any chunk text."""
+        if query_embedding is None:
+            query_embedding = self.encode_query(query)
+        with stage_latency.time('query', 'search'):
+            distances, indices = self.index.search(query_embedding, self._candidates(k, [query]))
+            return self._refine(query, query_embedding[0], distances[0], indices[0], k)
+    
+    def _rescoring(self) -> bool:
+        """Whether the index stores lossy codes and exact embeddings are available to correct them."""
+        return self.index_type in QUANTIZED_TYPES and self.rescore_factor > 1 and len(self.embeddings) > 0
+    
+    def _candidates(self, k: int, queries: Optional[List[str]]) -> int:
+        """How many vector hits to fetch: extra ones when they are rescored or fused."""
+        candidates = k * self.rescore_factor if self._rescoring() else k
+        if queries is not None and self.lexical_index is not None:
+            candidates = max(candidates, self.hybrid_candidates)
+        return candidates
+    
+    def _refine(self, query: Optional[str], query_embedding: np.ndarray, distances: np.ndarray,
+                indices: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Turn one row of raw FAISS candidates into the final top-k (distances, ids)."""
+        if self._rescoring():
+            distances, indices = rescore(self.embeddings, query_embedding, indices, len(indices))
+        if query is not None and self.lexical_index is not None:
+            return self._fuse(query, query_embedding, distances, indices, k)
+        return distances[:k], indices[:k]
+    
+    def _fuse(self, query: str, query_embedding: np.ndarray, distances: np.ndarray,
+              indices: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Reciprocal rank fusion of vector hits with BM25 hits.
+        
+        Returns (distances, ids) of the fused top-k, best first. Chunks found only lexically
+        get their exact vector distance from the stored embeddings.
+        """
+        lexical_ids, _ = self.lexical_index.search(query, max(k, self.hybrid_candidates))
         
-        # Search in FAISS index
-        distances, indices = self.index.search(query_embedding.astype('float32'), k)
+        fused: Dict[int, float] = {}
+        vector_distances = {}
+        for rank, (distance, idx) in enumerate(zip(distances, indices)):
+            if idx >= 0:
+                fused[int(idx)] = 1 / (RRF_K + rank + 1)
+                vector_distances[int(idx)] = float(distance)
+        for rank, idx in enumerate(lexical_ids):
+            fused[int(idx)] = fused.get(int(idx), 0.0) + 1 / (RRF_K + rank + 1)
         
-        results = []
-        for i, (distance, idx) in enumerate(zip(distances[0], indices[0])):
-            if idx < len(self.documents):
-                results.append({
-                    "content": self.documents[idx].page_content,
+        top = sorted(fused, key=fused.get, reverse=True)[:k]
+        fused_distances = []
+        for idx in top:
+            distance = vector_distances.get(idx)
+            if distance is None:
+                if len(self.embeddings):
+                    delta = np.asarray(self.embeddings[idx], dtype=np.float32) - query_embedding
+                    distance = float(delta @ delta)
+                else:
+                    distance = float('inf')
+            fused_distances.append(distance)
+        return np.array(fused_distances, dtype=np.float32), np.array(top, dtype=np.int64)
+    
+    def iter_hits(self, distances: np.ndarray, indices: np.ndarray) -> Iterator[Dict[str, Any]]:
+        """Materialize ranked results one at a time from a row of FAISS output."""
+        for i, (distance, idx) in enumerate(zip(distances, indices)):
+            # FAISS pads with -1 when the index holds fewer than k vectors
+            if 0 <= idx < len(self.documents):
+                # Read straight from the chunk buffer; no per-chunk record is built
+                hit = {
+                    "content": self.documents.text(idx),
                     "similarity_score": float(1 / (1 + distance)),  # Convert distance to similarity
-                    "rank": i + 1
-                })
+                    "rank": i + 1,
+                    "chunk_index": int(idx),
+                }
+                pages = self.documents.pages(idx)
+                if pages:
+                    hit["pages"] = list(pages)
+                span = self.documents.span(idx)
+                if span:
+                    hit["offsets"] = list(span)
+                yield hit
+    
+    def save_index(self, directory: str):
+        """Save the FAISS index, embeddings and chunks to disk in their native formats.
+
+        Indexes are immutable once saved: directory should be a new path that no reader uses
+        yet (see ingestion.new_index_path), published by pointing RAGIndex.index_path at it.
+        """
+        if self._staging_dir is not None:
+            # Embeddings and chunks were already streamed to the staging directory
+            tmp_directory = self._staging_dir
+        else:
+            tmp_directory = f"{directory}.tmp"
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+            os.makedirs(tmp_directory)
+            np.save(os.path.join(tmp_directory, EMBEDDINGS_FILE), np.asarray(self.embeddings, dtype=np.float32))
+            write_chunk_store(tmp_directory, self.documents.texts())
+            write_lexical_index(tmp_directory, self.documents.texts())
+        
+        faiss.write_index(self.index, os.path.join(tmp_directory, INDEX_FILE))
         
-        return results
+        # Only complete indexes ever appear under their final name
+        shutil.rmtree(directory, ignore_errors=True)
+        shutil.move(tmp_directory, directory)
+        self._staging_dir = None
     
-    def save_index(self, filepath: str):
-        """Save the FAISS index and documents to disk."""
-        data = {
-            'index': self.index,
-            'documents': self.documents,
-            'embeddings': self.embeddings
-        }
-        with open(filepath, 'wb') as f:
-            pickle.dump(data, f)
+    def load_index(self, path: str):
+        """Load the FAISS index, embeddings and chunks from disk."""
+        if path.endswith('.pkl'):
+            return self.load_pickle_index(path)
+        try:
+            self.index = faiss.read_index(os.path.join(path, INDEX_FILE), FAISS_MMAP_FLAGS)
+            self.embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode='r')
+            self.documents = ChunkStore(path)
+            # Indexes saved before hybrid search existed have no lexical part
+            self.lexical_index = LexicalIndex(path) if self.hybrid and has_lexical_index(path) else None
+            return True
+        except Exception as e:
+            print(f"Error loading index: {e}")
+            return False
     
-    def load_index(self, filepath: str):
-        """Load the FAISS index and documents from disk."""
+    def load_pickle_index(self, filepath: str):
+        """Load an index saved in the legacy single-pickle format."""
         try:
             with open(filepath, 'rb') as f:
                 data = pickle.load(f)
             self.index = data['index']
-            self.documents = data['documents']
+            self.documents = ChunkStore.from_texts(doc.page_content for doc in data['documents'])
             self.embeddings = data['embeddings']
             return True
         except Exception as e:
             print(f"Error loading index: {e}")
             return False
     
-    def get_answer_with_context(self, query: str, k: int = 3) -> Dict[str, Any]:
+    def memory_usage(self) -> int:
+        """Approximate number of bytes held by the loaded index, embeddings and chunks."""
+        size = 0
+        if self.index is not None:
+            size += index_memory_bytes(self.index)
+        # Memory-mapped embeddings and chunks live in the shared page cache
+        if isinstance(self.embeddings, np.ndarray) and not isinstance(self.embeddings, np.memmap):
+            size += self.embeddings.nbytes
+        if not self.documents.is_mapped:
+            size += self.documents.nbytes
+        return size
+    
+    def get_answer_with_context(self, query: str, k: int = 3,
+                                query_embedding: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """Get relevant context for answering the query."""
-        similar_docs = self.similarity_search(query, k)
+        return self.build_context(query, self.similarity_search(query, k, query_embedding),
+                                  self.context_max_chars, self.context_max_tokens)
+    
+    @staticmethod
+    def build_context(query: str, similar_docs: List[Dict[str, Any]], max_chars: Optional[int] = None,
+                      max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Assemble the answer context from search results.
         
+        Overlapping and adjacent chunks are merged so no text is repeated, and the result is
+        packed most relevant first into the optional character and token budgets.
+        """
         if not similar_docs:
             return {"error": "No relevant documents found"}
         
-        context = "\n\n".join([doc["content"] for doc in similar_docs])
+        with stage_latency.time('query', 'context'):
+            packed = pack_context(similar_docs, max_chars, max_tokens)
         
         return {
             "query": query,
-            "context": context,
             "similar_documents": similar_docs,
-            "context_length": len(context)
-        }
\ No newline at end of file
+            **packed,
+        }
@@ -0,0 +1,70 @@
+import gc
+from typing import Any, Dict, Optional
+from django.conf import settings
+from django.db import connections
+from .context_packing import get_token_counter
+from .embedding_registry import warm_up
+from .index_cache import index_cache
+from .library_index import get_library_index
+from .models import RAGIndex
+
+
+def preload(max_indexes: Optional[int] = None) -> Dict[str, Any]:
+    """Load the embedding models and the most recently updated document indexes into this
+    process, to be inherited by forked workers.
+
+    Index vectors, embeddings and chunk text are memory-mapped read-only, so every worker
+    shares one copy in the page cache whether or not it was preloaded. Loading in the master
+    additionally shares the model weights, the tokenizer and the in-memory parts of each index (lexical
+    term dictionaries, FAISS structures) copy-on-write. Nothing is encoded or searched here,
+    so no thread pools exist at fork time.
+
+    max_indexes defaults to RAG_PRELOAD_INDEXES; None loads every processed document.
+    """
+    if max_indexes is None:
+        max_indexes = getattr(settings, 'RAG_PRELOAD_INDEXES', None)
+
+    indexes = RAGIndex.objects.filter(document__is_processed=True).select_related('document').order_by('-updated_at')
+    if max_indexes is not None:
+        indexes = indexes[:max_indexes]
+    indexes = list(indexes)
+
+    warm_up({settings.RAG_EMBEDDING_MODEL, *getattr(settings, 'RAG_WARMUP_MODELS', []),
+             *(rag_index.embedding_model for rag_index in indexes)})
+    get_token_counter()
+
+    loaded = 0
+    for rag_index in indexes:
+        if index_cache.get(rag_index) is not None:
+            loaded += 1
+    library_vectors = sum(
+        get_library_index(user_id).ntotal()
+        for user_id in {rag_index.document.uploaded_by_id for rag_index in indexes}
+    )
+
+    # Children must open their own database connections
+    connections.close_all()
+    # Keep the cyclic GC from writing to (and so un-sharing) everything loaded so far
+    gc.freeze()
+    return {"indexes": loaded, "library_vectors": library_vectors}
+
+
+def process_memory() -> Dict[str, int]:
+    """Resident, proportional and shared memory of this process in bytes (Linux only).
+
+    With workers sharing mapped indexes and a preloaded model, pss_bytes (memory divided
+    among the processes sharing it) stays well below rss_bytes.
+    """
+    fields = {'Rss': 'rss_bytes', 'Pss': 'pss_bytes', 'Shared_Clean': 'shared_clean_bytes',
+              'Shared_Dirty': 'shared_dirty_bytes', 'Private_Clean': 'private_clean_bytes',
+              'Private_Dirty': 'private_dirty_bytes', 'Anonymous': 'anonymous_bytes'}
+    memory = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in fields:
+                    memory[fields[name]] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return memory
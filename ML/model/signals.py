@@ -0,0 +1,25 @@
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import Document, RAGIndex
+from .index_cache import index_cache
+from .ingestion import remove_index_files
+from .library_index import get_library_index
+
+
+@receiver(post_delete, sender=Document)
+def remove_document_from_library(sender, instance, **kwargs):
+    """Drop a deleted document's vectors from its owner's library index."""
+    get_library_index(instance.uploaded_by_id).remove_document(instance.id)
+
+
+@receiver(post_delete, sender=RAGIndex)
+def remove_index_directory(sender, instance, **kwargs):
+    """Delete an index's files once the deletion of its row (e.g. with its document) commits."""
+    index_path, document_id = instance.index_path, instance.document_id
+
+    def remove():
+        index_cache.invalidate(document_id)
+        remove_index_files(index_path)
+
+    transaction.on_commit(remove)
@@ -0,0 +1,37 @@
+from django.test import SimpleTestCase
+from ..chunking import TextChunker
+
+
+class TextChunkerTests(SimpleTestCase):
+    def pages(self):
+        pages = []
+        for page in range(1, 13):
+            paragraphs = [f"Article {page * 3 + i}. " + " ".join(
+                f"Clause {j} of page {page} sets out the duties of the state." for j in range(page % 4 + 2)
+            ) for i in range(3)]
+            pages.append((page, "\n\n".join(paragraphs)))
+        return pages
+
+    def test_iter_spans_matches_split(self):
+        pages = self.pages()
+        text = "".join(page_text + "\n" for _, page_text in pages)
+        for chunker in (TextChunker(), TextChunker(chunk_size=300, chunk_overlap=60), TextChunker(chunk_size=120, chunk_overlap=0)):
+            streamed = list(chunker.iter_spans(pages))
+            self.assertEqual([(span.start, span.end) for _, span in streamed], chunker.split(text))
+            for chunk, span in streamed:
+                self.assertEqual(chunk, text[span.start:span.end])
+                self.assertLessEqual(span.first_page, span.last_page)
+
+    def test_chunks_respect_size_and_cover_the_text(self):
+        text = "".join(page_text + "\n" for _, page_text in self.pages())
+        chunker = TextChunker(chunk_size=300, chunk_overlap=60)
+        spans = chunker.split(text)
+        self.assertTrue(all(end - start <= chunker.chunk_size for start, end in spans))
+        self.assertTrue(all(a[0] < b[0] and a[1] <= b[1] for a, b in zip(spans, spans[1:])))
+        self.assertEqual(text[spans[-1][1]:].strip(), '')
+
+    def test_short_and_empty_text(self):
+        chunker = TextChunker()
+        self.assertEqual(chunker.split("  Article 1. Short.  "), [(2, 19)])
+        self.assertEqual(chunker.split(""), [])
+        self.assertEqual(list(chunker.iter_spans([])), [])
@@ -0,0 +1,43 @@
+from django.test import SimpleTestCase
+from ..context_packing import get_token_counter, merge_hits, pack_context
+
+
+class ContextPackingTests(SimpleTestCase):
+    text = " ".join(f"Sentence {i} of the article." for i in range(40))
+
+    def hit(self, chunk_index, start, end, rank, document_id=1):
+        return {"content": self.text[start:end], "document_id": document_id, "chunk_index": chunk_index,
+                "offsets": [start, end], "rank": rank}
+
+    def test_overlapping_and_adjacent_chunks_merge(self):
+        hits = [self.hit(1, 80, 200, 1), self.hit(0, 0, 100, 2), self.hit(5, 500, 600, 3)]
+        segments = merge_hits(hits)
+        self.assertEqual([segment.text for segment in segments], [self.text[0:200], self.text[500:600]])
+        self.assertEqual([segment.chunks for segment in segments], [2, 1])
+
+    def test_other_documents_and_unlocated_hits_stay_separate(self):
+        hits = [self.hit(0, 0, 100, 1), self.hit(1, 80, 200, 2, document_id=2),
+                {"content": "loose", "rank": 3}, {"content": "loose", "rank": 4}]
+        self.assertEqual(len(merge_hits(hits)), 3)
+
+    def test_pack_context_reports_savings(self):
+        counter = get_token_counter()
+        hits = [self.hit(0, 0, 100, 1), self.hit(1, 80, 200, 2)]
+        packed = pack_context(hits, counter=counter)
+        self.assertEqual(packed["context"], self.text[0:200])
+        self.assertEqual(packed["merged_chunks"], 1)
+        self.assertEqual(packed["unpacked_length"], 100 + 2 + 120)
+        self.assertEqual(packed["tokens_saved"], counter.count(self.text[0:100] + "\n\n" + self.text[80:200])
+                         - counter.count(self.text[0:200]))
+
+    def test_pack_context_budget(self):
+        counter = get_token_counter()
+        hits = [self.hit(0, 0, 300, 1), self.hit(5, 500, 600, 2)]
+        packed = pack_context(hits, max_tokens=counter.count(self.text[0:300]) // 2, counter=counter)
+        # The most relevant segment is truncated rather than dropped; the rest no longer fit
+        self.assertTrue(self.text.startswith(packed["context"]))
+        self.assertLessEqual(packed["context_tokens"], counter.count(self.text[0:300]) // 2)
+        self.assertEqual(packed["dropped_segments"], 1)
+        packed = pack_context(hits, max_chars=350, counter=counter)
+        self.assertEqual(packed["context"], self.text[0:300])
+        self.assertEqual(packed["dropped_segments"], 1)
@@ -0,0 +1,57 @@
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+import numpy as np
+from django.test import SimpleTestCase
+from ..embedding_cache import EmbeddingCache
+
+
+class EmbeddingCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'embeddings.sqlite3')
+
+    def test_round_trip_by_model_and_text(self):
+        cache = EmbeddingCache(self.path)
+        vectors = np.arange(8, dtype=np.float32).reshape(2, 4)
+        cache.put_many('model-a', ['first', 'second'], vectors)
+
+        found = cache.get_many('model-a', ['missing', 'second', 'first'])
+        self.assertEqual(sorted(found), [1, 2])
+        np.testing.assert_array_equal(found[1], vectors[1])
+        np.testing.assert_array_equal(found[2], vectors[0])
+        # The same text embedded by another model is a different entry
+        self.assertEqual(cache.get_many('model-b', ['first']), {})
+
+    def test_evicts_least_recently_used_vectors_beyond_max_rows(self):
+        cache = EmbeddingCache(self.path, max_rows=2)
+        with mock.patch('model.embedding_cache.time.time', return_value=100):
+            cache.put_many('m', ['a', 'b'], np.zeros((2, 4)))
+        with mock.patch('model.embedding_cache.time.time', return_value=200):
+            cache.get_many('m', ['a'])
+            cache.put_many('m', ['c'], np.zeros((1, 4)))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(sorted(cache.get_many('m', ['a', 'b', 'c'])), [0, 2])
+        self.assertEqual(cache.evictions, 1)
+
+    def test_unbounded_cache_keeps_everything(self):
+        cache = EmbeddingCache(self.path)
+        cache.put_many('m', [str(i) for i in range(5)], np.zeros((5, 4)))
+        self.assertEqual(len(cache), 5)
+
+    def test_upgrades_files_written_before_pruning(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("CREATE TABLE embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL) WITHOUT ROWID")
+        connection.execute("INSERT INTO embeddings VALUES (?, ?)",
+                           (EmbeddingCache.key('m', 'old'), np.ones(4, dtype=np.float32).tobytes()))
+        connection.commit()
+        connection.close()
+
+        cache = EmbeddingCache(self.path, max_rows=1)
+        with mock.patch('model.embedding_cache.time.time', return_value=50):
+            np.testing.assert_array_equal(cache.get_many('m', ['old'])[0], np.ones(4))
+        with mock.patch('model.embedding_cache.time.time', return_value=100):
+            cache.put_many('m', ['new'], np.zeros((1, 4)))
+        self.assertEqual(sorted(cache.get_many('m', ['old', 'new'])), [1])
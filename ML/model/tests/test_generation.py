@@ -0,0 +1,135 @@
+import threading
+from http.server import ThreadingHTTPServer
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from ..generation import (
+    AnswerGenerator, ExtractiveGenerator, OpenAICompatibleGenerator, _backend_from_settings, extractive_answer,
+    get_generator, uses_model,
+)
+from ..index_cache import LRUCache
+from ..management.commands.llm_stub import StubHandler
+from .test_views import QueryViewTestCase
+
+
+CONTEXT = (
+    "Article 1. India, that is Bharat, shall be a Union of States. The territory of India shall comprise "
+    "the territories of the States. Article 2. Parliament may admit new States. Article 3. Formation."
+)
+
+
+class CountingBackend:
+    model = 'counting'
+
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, question, context):
+        self.calls += 1
+        return f"answer {self.calls}", 40, 7
+
+
+def serve_stub(test_case) -> str:
+    """Run the llm_stub server for the rest of test_case and return its base URL."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    test_case.addCleanup(server.server_close)
+    test_case.addCleanup(server.shutdown)
+    return f'http://127.0.0.1:{server.server_port}/v1'
+
+
+class AnswerGeneratorTests(SimpleTestCase):
+    def test_repeated_questions_are_answered_from_the_cache(self):
+        backend = CountingBackend()
+        generator = AnswerGenerator(backend, LRUCache(max_entries=8))
+        first = generator.answer('What is India?', CONTEXT)
+        again = generator.answer('  what is INDIA?', CONTEXT)
+        self.assertEqual(backend.calls, 1)
+        self.assertEqual((first.cached, again.cached), (False, True))
+        # A hit keeps the tokens of the original generation
+        self.assertEqual(again._replace(cached=False), first)
+        self.assertEqual(generator.answer('What is India?', CONTEXT + " Article 4.").text, 'answer 2')
+
+    def test_without_a_cache_every_question_reaches_the_model(self):
+        backend = CountingBackend()
+        generator = AnswerGenerator(backend)
+        for _ in range(2):
+            generation = generator.answer('What is India?', CONTEXT)
+        self.assertEqual((backend.calls, generation.cached), (2, False))
+        self.assertEqual((generation.model, generation.prompt_tokens, generation.completion_tokens),
+                         ('counting', 40, 7))
+
+    def test_extractive_answer_is_the_context(self):
+        generation = extractive_answer(CONTEXT)
+        self.assertEqual(generation.text, f"Based on the Constitution:\n\n{CONTEXT}")
+        self.assertEqual((generation.model, generation.prompt_tokens, generation.cached), ('extractive', 0, False))
+
+    def test_openai_backend_against_the_stub_server(self):
+        backend = OpenAICompatibleGenerator('stub', base_url=serve_stub(self), max_tokens=64)
+        text, prompt_tokens, completion_tokens = backend.complete('What is India?', CONTEXT)
+        # The stub answers with the first three sentences of the excerpts
+        self.assertEqual(text, "Article 1. India, that is Bharat, shall be a Union of States. The territory of "
+                               "India shall comprise the territories of the States.")
+        self.assertGreater(prompt_tokens, completion_tokens)
+        self.assertGreater(completion_tokens, 0)
+
+
+class GeneratorSettingsTests(SimpleTestCase):
+    def setUp(self):
+        generator = mock.patch('model.generation._generator', None)
+        generator.start()
+        self.addCleanup(generator.stop)
+
+    def test_extractive_is_the_default_and_skips_the_cache(self):
+        self.assertFalse(uses_model())
+        generator = get_generator()
+        self.assertIsInstance(generator.backend, ExtractiveGenerator)
+        self.assertIsNone(generator.cache)
+
+    @override_settings(RAG_GENERATOR='openai', RAG_GENERATOR_MODEL='stub', RAG_ANSWER_CACHE_SIZE=4)
+    def test_model_backends_get_an_answer_cache(self):
+        self.assertTrue(uses_model())
+        generator = get_generator()
+        self.assertIsInstance(generator.backend, OpenAICompatibleGenerator)
+        self.assertEqual(generator.cache.max_entries, 4)
+        self.assertIs(get_generator(), generator)
+
+    @override_settings(RAG_GENERATOR='gpt')
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaisesRegex(ValueError, "Unknown RAG_GENERATOR 'gpt'"):
+            _backend_from_settings()
+
+
+class GeneratedAnswerViewTests(QueryViewTestCase):
+    def setUp(self):
+        super().setUp()
+        generator = mock.patch('model.generation._generator', None)
+        generator.start()
+        self.addCleanup(generator.stop)
+
+    def ask(self, generate=True):
+        return self.post('/api/query/', {'document_id': self.articles.id, 'question': 'personal liberty',
+                                         'generate': generate}).json()
+
+    def test_answers_are_opt_in(self):
+        self.assertNotIn('answer', self.ask(generate=False))
+        response = self.ask()
+        self.assertEqual(response['answer'], f"Based on the Constitution:\n\n{response['context']}")
+        self.assertEqual(response['usage']['model'], 'extractive')
+
+    def test_model_answers_report_usage_and_cache_hits(self):
+        with self.settings(RAG_GENERATOR='openai', RAG_GENERATOR_MODEL='stub', RAG_GENERATOR_BASE_URL=serve_stub(self)):
+            first, again = self.ask(), self.ask()
+        self.assertIn('Article 21', first['answer'])
+        self.assertNotIn('Based on the Constitution', first['answer'])
+        self.assertEqual((first['usage']['model'], first['usage']['cached'], again['usage']['cached']),
+                         ('stub', False, True))
+        self.assertEqual(again['usage']['prompt_tokens'], first['usage']['prompt_tokens'])
+
+    def test_failing_model_falls_back_to_the_context(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        closed_url = f'http://127.0.0.1:{server.server_port}/v1'
+        server.server_close()
+        with self.settings(RAG_GENERATOR='openai', RAG_GENERATOR_MODEL='stub', RAG_GENERATOR_BASE_URL=closed_url):
+            response = self.ask()
+        self.assertEqual(response['answer'], f"Based on the Constitution:\n\n{response['context']}")
+        self.assertEqual(response['usage']['model'], 'extractive')
@@ -0,0 +1,42 @@
+from unittest import mock
+from django.test import SimpleTestCase
+from ..index_cache import LRUCache
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used_entry(self):
+        cache = LRUCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+        self.assertEqual(cache.evictions, 1)
+
+    def test_byte_budget(self):
+        cache = LRUCache(max_bytes=100)
+        cache.put('a', 'x', size=60)
+        cache.put('b', 'y', size=60)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.current_bytes, 60)
+        # Entries larger than the whole budget are never stored
+        cache.put('huge', 'z', size=101)
+        self.assertIsNone(cache.get('huge'))
+        self.assertEqual(cache.get('b'), 'y')
+
+    def test_entries_expire_after_ttl(self):
+        cache = LRUCache(max_entries=10, ttl=30)
+        with mock.patch('model.index_cache.time.monotonic', return_value=1000.0):
+            cache.put('a', 1)
+        with mock.patch('model.index_cache.time.monotonic', return_value=1029.0):
+            self.assertEqual(cache.get('a'), 1)
+        with mock.patch('model.index_cache.time.monotonic', return_value=1030.0):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual((cache.expirations, cache.stats()["entries"]), (1, 0))
+
+    def test_replacing_a_key_keeps_sizes_consistent(self):
+        cache = LRUCache(max_bytes=100)
+        cache.put('a', 1, size=40)
+        cache.put('a', 2, size=30)
+        self.assertEqual((cache.get('a'), cache.current_bytes), (2, 30))
@@ -0,0 +1,96 @@
+import numpy as np
+from django.test import SimpleTestCase
+from ..chunk_store import ChunkStore
+from ..index_factory import (
+    INDEX_TYPES, MIN_VECTORS_FOR_ANN, QUANTIZED_TYPES, apply_search_params, build_index_from_vectors,
+    choose_index_type, rescore,
+)
+from ..rag_processor import RAGProcessor
+
+
+def clustered_vectors(n=2000, dimension=32, seed=0):
+    """Points around 20 centres, so approximate indexes have structure to find."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(20, dimension)) * 4
+    return (centres[rng.integers(0, 20, n)] + rng.normal(size=(n, dimension))).astype(np.float32)
+
+
+def exact_neighbours(vectors, queries, k):
+    distances = ((queries[:, None, :] - vectors[None, :, :]) ** 2).sum(axis=2)
+    return np.argsort(distances, axis=1)[:, :k]
+
+
+class IndexTypeTests(SimpleTestCase):
+    vectors = clustered_vectors()
+    queries = vectors[:50] + np.random.default_rng(1).normal(scale=0.1, size=(50, 32)).astype(np.float32)
+
+    def test_every_type_builds_and_finds_near_duplicates(self):
+        expected = exact_neighbours(self.vectors, self.queries, 1)[:, 0]
+        for index_type in INDEX_TYPES:
+            with self.subTest(index_type=index_type):
+                index, built_type, params = build_index_from_vectors(self.vectors, index_type)
+                self.assertEqual((built_type, index.ntotal), (index_type, len(self.vectors)))
+                _, ids = index.search(self.queries, 10)
+                # Lossy codes may reorder close neighbours, but the source point is still a candidate
+                self.assertGreaterEqual(np.mean([source in row for source, row in zip(expected, ids)]), 0.95)
+
+    def test_small_corpora_fall_back_to_exact_search(self):
+        index, index_type, params = build_index_from_vectors(self.vectors[:MIN_VECTORS_FOR_ANN - 1], 'hnsw')
+        self.assertEqual((index_type, params), ('flat', {}))
+
+    def test_auto_picks_by_corpus_size(self):
+        self.assertEqual([choose_index_type(n) for n in (5_000, 50_000, 500_000, 5_000_000)],
+                         ['flat', 'hnsw', 'ivf_flat', 'ivf_pq'])
+        _, index_type, _ = build_index_from_vectors(self.vectors, 'auto')
+        self.assertEqual(index_type, 'flat')
+
+    def test_overrides_and_search_params(self):
+        index, _, params = build_index_from_vectors(self.vectors, 'ivf_flat', {'nlist': 16, 'nprobe': 2})
+        self.assertEqual((index.nlist, index.nprobe), (16, 2))
+        apply_search_params(index, {'nprobe': 8})
+        self.assertEqual(index.nprobe, 8)
+        index, _, _ = build_index_from_vectors(self.vectors, 'hnsw', {'ef_search': 100})
+        self.assertEqual(index.hnsw.efSearch, 100)
+
+    def test_unknown_type(self):
+        with self.assertRaises(ValueError):
+            build_index_from_vectors(self.vectors, 'annoy')
+
+
+class RescoreTests(SimpleTestCase):
+    vectors = IndexTypeTests.vectors
+    queries = IndexTypeTests.queries
+
+    def processor(self, index_type, rescore_factor=4):
+        rag_processor = RAGProcessor(index_type=index_type, rescore_factor=rescore_factor, hybrid=False)
+        rag_processor.index, _, _ = build_index_from_vectors(self.vectors, index_type)
+        rag_processor.embeddings = self.vectors
+        rag_processor.documents = ChunkStore.from_texts(str(i) for i in range(len(self.vectors)))
+        return rag_processor
+
+    def test_rescore_ranks_candidates_by_exact_distance(self):
+        query = self.queries[0]
+        candidates = np.array([7, -1, 0, 3])
+        distances, ids = rescore(self.vectors, query, candidates, 2)
+        exact = ((self.vectors[[7, 0, 3]] - query) ** 2).sum(axis=1)
+        self.assertEqual(ids.tolist(), np.array([7, 0, 3])[np.argsort(exact)[:2]].tolist())
+        np.testing.assert_allclose(distances, np.sort(exact)[:2], rtol=1e-5)
+        self.assertEqual(len(rescore(self.vectors, query, np.array([-1, -1]), 2)[1]), 0)
+
+    def test_quantized_types_rank_hits_by_exact_distance(self):
+        expected = exact_neighbours(self.vectors, self.queries, 1)[:, 0]
+        for index_type in QUANTIZED_TYPES:
+            with self.subTest(index_type=index_type):
+                results = self.processor(index_type).search_embeddings(self.queries, 3)
+                self.assertEqual([hits[0]['chunk_index'] for hits in results], expected.tolist())
+                for query, hits in zip(self.queries, results):
+                    # Scores come from the full-precision vectors, not the lossy codes
+                    exact = [((self.vectors[hit['chunk_index']] - query) ** 2).sum() for hit in hits]
+                    np.testing.assert_allclose([hit['similarity_score'] for hit in hits],
+                                               [1 / (1 + distance) for distance in exact], rtol=1e-5)
+                    self.assertEqual(exact, sorted(exact))
+
+    def test_rescoring_fixes_what_pq_codes_get_wrong(self):
+        expected = exact_neighbours(self.vectors, self.queries, 1)[:, 0]
+        unrescored = self.processor('pq', rescore_factor=1).search_embeddings(self.queries, 1)
+        self.assertLess(np.mean([hits[0]['chunk_index'] for hits in unrescored] == expected), 1.0)
@@ -0,0 +1,122 @@
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from ..ingestion import (
+    claim_next_job, enqueue_document, fail_job, requeue_stale_jobs, run_job, save_chunks, sync_chunks,
+)
+from ..models import Document, IngestionJob
+
+
+class SyncChunksTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader')
+        self.document = Document.objects.create(title='doc', file_path='doc.pdf', uploaded_by=self.user)
+
+    def rows(self):
+        return list(self.document.chunks.order_by('chunk_index').values_list('chunk_index', 'content'))
+
+    def sync(self, old, new):
+        save_chunks(self.document, old)
+        pks = dict(self.document.chunks.values_list('content', 'pk'))
+        removed, added = sync_chunks(self.document, new)
+        self.assertEqual(self.rows(), list(enumerate(new)))
+        # Applying the returned changes to the old vector ids must give the new ones
+        self.assertEqual((set(range(len(old))) - set(removed)) | set(added), set(range(len(new))))
+        self.assertFalse(set(added) & (set(range(len(old))) - set(removed)))
+        return removed, added, pks
+
+    def test_inserted_and_edited_chunks(self):
+        removed, added, pks = self.sync(['a', 'b', 'c', 'd'], ['a', 'inserted', 'b', 'c edited', 'd'])
+        self.assertEqual(sorted(removed), [1, 2, 3])
+        self.assertEqual(added, [1, 2, 3, 4])
+        # Unchanged chunks keep their rows
+        current = dict(self.document.chunks.values_list('content', 'pk'))
+        for text in ('a', 'b', 'd'):
+            self.assertEqual(current[text], pks[text])
+
+    def test_unchanged_document_touches_nothing(self):
+        removed, added, _ = self.sync(['a', 'b', 'c'], ['a', 'b', 'c'])
+        self.assertEqual((removed, added), ([], []))
+
+    def test_swapped_chunks_do_not_collide(self):
+        removed, added, _ = self.sync(['a', 'b', 'c'], ['c', 'b', 'a'])
+        self.assertEqual(sorted(removed), [0, 2])
+        self.assertEqual(sorted(added), [0, 2])
+
+    def test_duplicate_and_removed_chunks(self):
+        removed, added, _ = self.sync(['a', 'a', 'b', 'c'], ['b', 'a'])
+        self.assertEqual(sorted(removed), [0, 1, 2, 3])
+        self.assertEqual(sorted(added), [0, 1])
+
+
+
+@override_settings(RAG_INGESTION_MAX_ATTEMPTS=2, RAG_INGESTION_RETRY_DELAY=10)
+class IngestionQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader')
+        self.document = Document.objects.create(title='doc', file_path='doc.pdf', uploaded_by=self.user)
+
+    def job(self):
+        return IngestionJob.objects.get(document=self.document)
+
+    def test_claims_the_oldest_runnable_job_once(self):
+        later = Document.objects.create(title='later', file_path='later.pdf', uploaded_by=self.user)
+        enqueue_document(self.document)
+        waiting = enqueue_document(later)
+        IngestionJob.objects.filter(pk=waiting.pk).update(run_after=timezone.now() + timedelta(minutes=5))
+
+        job_id = claim_next_job()
+        self.assertEqual(job_id, self.job().pk)
+        self.assertEqual((self.job().status, self.job().attempts), (IngestionJob.STATUS_RUNNING, 1))
+        # The other job is not due yet and the claimed one cannot be claimed again
+        self.assertIsNone(claim_next_job())
+
+    def test_successful_run_stores_stage_timings(self):
+        job_id = enqueue_document(self.document).pk
+        claim_next_job()
+        with mock.patch('model.ingestion.process_document_rag', return_value={'embed': 1.5}):
+            self.assertTrue(run_job(job_id))
+        job = self.job()
+        self.assertEqual(job.status, IngestionJob.STATUS_DONE)
+        self.assertEqual((job.stage_seconds, job.last_error), ({'embed': 1.5}, None))
+
+    def test_failures_retry_with_backoff_until_attempts_run_out(self):
+        job_id = enqueue_document(self.document).pk
+        with mock.patch('model.ingestion.process_document_rag', side_effect=RuntimeError('unreadable')):
+            claim_next_job()
+            before = timezone.now()
+            self.assertFalse(run_job(job_id))
+            job = self.job()
+            self.assertEqual((job.status, job.last_error), (IngestionJob.STATUS_QUEUED, 'unreadable'))
+            self.assertGreaterEqual(job.run_after, before + timedelta(seconds=10))
+            self.assertEqual(Document.objects.get(pk=self.document.pk).status, Document.STATUS_PENDING)
+
+            IngestionJob.objects.filter(pk=job_id).update(run_after=timezone.now())
+            claim_next_job()
+            self.assertFalse(run_job(job_id))
+        self.assertEqual(self.job().status, IngestionJob.STATUS_FAILED)
+        document = Document.objects.get(pk=self.document.pk)
+        self.assertEqual((document.status, document.processing_error), (Document.STATUS_FAILED, 'unreadable'))
+
+    def test_backoff_doubles_per_attempt(self):
+        job = enqueue_document(self.document)
+        IngestionJob.objects.filter(pk=job.pk).update(attempts=2, max_attempts=5)
+        before = timezone.now()
+        fail_job(job.pk, 'again')
+        delay = self.job().run_after - before
+        self.assertGreaterEqual(delay, timedelta(seconds=20))
+        self.assertLess(delay, timedelta(seconds=21))
+
+    def test_stale_running_jobs_are_requeued(self):
+        stale = enqueue_document(self.document)
+        other = Document.objects.create(title='other', file_path='other.pdf', uploaded_by=self.user)
+        fresh = enqueue_document(other)
+        now = timezone.now()
+        IngestionJob.objects.filter(pk=stale.pk).update(status=IngestionJob.STATUS_RUNNING,
+                                                        started_at=now - timedelta(hours=1))
+        IngestionJob.objects.filter(pk=fresh.pk).update(status=IngestionJob.STATUS_RUNNING, started_at=now)
+        self.assertEqual(requeue_stale_jobs(600), 1)
+        self.assertEqual(IngestionJob.objects.get(pk=stale.pk).status, IngestionJob.STATUS_QUEUED)
+        self.assertEqual(IngestionJob.objects.get(pk=fresh.pk).status, IngestionJob.STATUS_RUNNING)
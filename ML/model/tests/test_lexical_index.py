@@ -0,0 +1,84 @@
+import math
+import tempfile
+import numpy as np
+from django.test import SimpleTestCase
+from ..chunk_store import ChunkStore
+from ..lexical_index import BM25_B, BM25_K1, LexicalIndex, tokenize, write_lexical_index
+from ..rag_processor import RAGProcessor
+
+
+CHUNKS = [
+    "Article 370 gave special status to Jammu and Kashmir.",
+    "Article 21 protects life and personal liberty.",
+    "The President is elected by an electoral college.",
+    "Liberty of thought, expression, belief, faith and worship; liberty and liberty again.",
+]
+
+
+class LexicalIndexTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        write_lexical_index(self.directory, CHUNKS)
+        self.index = LexicalIndex(self.directory)
+
+    def test_tokenize_keeps_numbers_and_drops_stopwords(self):
+        self.assertEqual(tokenize("The Article 370 of the Constitution"), ['article', '370', 'constitution'])
+
+    def test_rare_terms_outrank_common_ones(self):
+        ids, scores = self.index.search("article 370", k=4)
+        self.assertEqual(ids[0], 0)
+        self.assertEqual(sorted(ids.tolist()), [0, 1])
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+
+    def test_scores_follow_bm25(self):
+        ids, scores = self.index.search("president", k=1)
+        lengths = [len(tokenize(chunk)) for chunk in CHUNKS]
+        idf = math.log(1 + (len(CHUNKS) - 1 + 0.5) / (1 + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[2] / np.mean(lengths))
+        self.assertEqual(ids.tolist(), [2])
+        self.assertAlmostEqual(float(scores[0]), idf * (BM25_K1 + 1) / (1 + norm), places=5)
+
+    def test_term_frequency_saturates_but_still_counts(self):
+        ids, _ = self.index.search("liberty", k=2)
+        self.assertEqual(ids.tolist(), [3, 1])
+
+    def test_unknown_terms_and_k(self):
+        self.assertEqual(len(self.index.search("habeas corpus")[0]), 0)
+        self.assertEqual(len(self.index.search("article liberty president", k=2)[0]), 2)
+
+
+class ReciprocalRankFusionTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        write_lexical_index(directory.name, CHUNKS)
+        self.rag_processor = RAGProcessor(hybrid_candidates=4)
+        self.rag_processor.lexical_index = LexicalIndex(directory.name)
+        self.rag_processor.documents = ChunkStore.from_texts(CHUNKS)
+        self.rag_processor.embeddings = np.eye(4, dtype=np.float32)
+
+    def test_chunks_found_both_ways_rank_first(self):
+        query_embedding = np.array([0, 0.9, 0, 0], dtype=np.float32)
+        # Vector ranking: 2, 1, 3; lexical ranking for "article 370": 0, 1
+        distances = np.array([0.5, 0.6, 0.7], dtype=np.float32)
+        fused_distances, ids = self.rag_processor._fuse("article 370", query_embedding, distances,
+                                                        np.array([2, 1, 3]), k=3)
+        # Chunk 1 is second in both lists; chunks 2 and 0 each top only one of them
+        self.assertEqual(ids[0], 1)
+        self.assertEqual(sorted(ids[1:].tolist()), [0, 2])
+        distances = dict(zip(ids.tolist(), fused_distances.tolist()))
+        # Vector hits keep their distance; lexical-only hits get their exact one
+        self.assertAlmostEqual(distances[1], 0.6, places=6)
+        self.assertAlmostEqual(distances[0], 1 + 0.81, places=5)
+
+    def test_agreement_beats_a_single_top_rank(self):
+        _, ids = self.rag_processor._fuse("president", np.zeros(4, dtype=np.float32),
+                                          np.array([0.1, 0.2], dtype=np.float32), np.array([0, 2]), k=2)
+        # Chunk 2 scores 1/(RRF_K + 2) + 1/(RRF_K + 1), beating chunk 0's single 1/(RRF_K + 1)
+        self.assertEqual(ids.tolist(), [2, 0])
+
+    def test_hybrid_search_widens_the_vector_candidates(self):
+        self.assertEqual(self.rag_processor._candidates(2, ["query"]), 4)
+        self.assertEqual(self.rag_processor._candidates(2, None), 2)
@@ -0,0 +1,91 @@
+import io
+import os
+import tempfile
+from unittest import mock
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from ..ingestion import save_chunks
+from ..library_index import LibraryIndex, get_library_index, search_library
+from ..models import Document, RAGIndex
+from ..rag_processor import EMBEDDINGS_FILE
+
+
+def vectors(*rows):
+    return np.array(rows, dtype=np.float32)
+
+
+class LibraryIndexTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.library = LibraryIndex(directory.name, num_shards=2)
+        self.library.add_document(1, vectors([1, 0, 0], [0, 1, 0]))
+        self.library.add_document(2, vectors([0, 0, 1]))
+
+    def nearest(self, query, k=1):
+        return [(document_id, chunk_index) for _, document_id, chunk_index in self.library.search(vectors(query), k)]
+
+    def test_search_merges_every_shard(self):
+        self.assertEqual(self.library.ntotal(), 3)
+        self.assertEqual(self.nearest([0, 0.9, 0]), [(1, 1)])
+        self.assertEqual(self.nearest([0, 0.1, 1]), [(2, 0)])
+        self.assertEqual(self.nearest([0.1, 0.2, 0.9], k=3), [(2, 0), (1, 1), (1, 0)])
+
+    def test_add_replaces_a_documents_vectors(self):
+        self.library.add_document(1, vectors([0, 1, 1]))
+        self.assertEqual(self.library.ntotal(), 2)
+        self.assertEqual(self.nearest([0, 1, 1], k=3), [(1, 0), (2, 0)])
+
+    def test_update_touches_only_the_changed_chunks(self):
+        # Chunk 1 is edited and chunk 2 added; chunk 0 keeps its vector
+        embeddings = vectors([1, 0, 0], [0, -1, 0], [5, 5, 5])
+        self.library.update_document(1, [1], [1, 2], embeddings)
+        self.assertEqual(self.library.ntotal(), 4)
+        self.assertEqual(self.nearest([0, -1, 0]), [(1, 1)])
+        self.assertEqual(self.nearest([5, 5, 5]), [(1, 2)])
+
+    def test_remove_document(self):
+        self.assertEqual(self.library.remove_document(1), 2)
+        self.assertEqual(self.nearest([1, 0, 0], k=3), [(2, 0)])
+        self.assertEqual(self.library.remove_document(1), 0)
+
+
+class LibrarySearchTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name, RAG_LIBRARY_SCOPE='user')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        libraries = mock.patch.dict('model.library_index._libraries', clear=True)
+        libraries.start()
+        self.addCleanup(libraries.stop)
+
+        self.media = media.name
+        self.user = User.objects.create_user('reader')
+        self.document = Document.objects.create(title='doc', file_path='doc.pdf', uploaded_by=self.user,
+                                                is_processed=True)
+        save_chunks(self.document, ['first chunk', 'second chunk'])
+
+    def test_results_carry_their_source_and_skip_other_users(self):
+        get_library_index(self.user.id).add_document(self.document.id, vectors([1, 0], [0, 1]))
+        results = search_library(self.user.id, 'ignored', 2, query_embedding=vectors([0, 1]))
+        self.assertEqual([(hit['document_title'], hit['chunk_index'], hit['content']) for hit in results],
+                         [('doc', 1, 'second chunk'), ('doc', 0, 'first chunk')])
+        other = User.objects.create_user('other')
+        self.assertEqual(search_library(other.id, 'ignored', 2, query_embedding=vectors([0, 1])), [])
+
+    def test_rebuild_repairs_unsynced_documents(self):
+        index_path = os.path.join(self.media, 'index')
+        os.makedirs(index_path)
+        np.save(os.path.join(index_path, EMBEDDINGS_FILE), vectors([1, 0], [0, 1]))
+        rag_index = RAGIndex.objects.create(document=self.document, index_path=index_path,
+                                            embedding_model='test-model', library_synced=False)
+
+        with override_settings(RAG_EMBEDDING_MODEL='test-model'):
+            call_command('rebuild_library_index', unsynced=True, stdout=io.StringIO())
+        self.assertEqual(get_library_index(self.user.id).ntotal(), 2)
+        rag_index.refresh_from_db()
+        self.assertTrue(rag_index.library_synced)
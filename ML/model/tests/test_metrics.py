@@ -0,0 +1,66 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from ..metrics import StageLatency, prometheus_gauges
+
+
+class PrometheusExpositionTests(SimpleTestCase):
+    def test_summary_quantiles_cover_the_window_and_totals_the_process(self):
+        latency = StageLatency(window=4)
+        for seconds in range(1, 9):
+            latency.observe('query', 'encode', float(seconds))
+        lines = latency.prometheus().splitlines()
+        self.assertEqual(lines[:2], [
+            '# HELP rag_stage_seconds Latency of RAG pipeline stages in seconds.',
+            '# TYPE rag_stage_seconds summary',
+        ])
+        labels = 'scope="query",stage="encode"'
+        # Quantiles over the last four samples (5..8); sum and count over all eight
+        self.assertEqual(lines[2:], [
+            f'rag_stage_seconds{{{labels},quantile="0.5"}} 6.5',
+            f'rag_stage_seconds{{{labels},quantile="0.95"}} {7.85!r}',
+            f'rag_stage_seconds{{{labels},quantile="0.99"}} {7.97!r}',
+            f'rag_stage_seconds_sum{{{labels}}} 36.0',
+            f'rag_stage_seconds_count{{{labels}}} 8',
+        ])
+
+    def test_series_are_sorted_and_named(self):
+        latency = StageLatency()
+        latency.observe('query', 'search', 0.25)
+        latency.observe('ingest', 'embed', 2.0)
+        body = latency.prometheus('rag_ingestion_stage_seconds')
+        self.assertIn('# TYPE rag_ingestion_stage_seconds summary', body)
+        self.assertEqual([line for line in body.splitlines() if '_count{' in line], [
+            'rag_ingestion_stage_seconds_count{scope="ingest",stage="embed"} 1',
+            'rag_ingestion_stage_seconds_count{scope="query",stage="search"} 1',
+        ])
+        # Nothing recorded yet still yields a valid, empty summary
+        self.assertEqual(len(StageLatency().prometheus().splitlines()), 2)
+
+    def test_gauges_keep_only_numbers(self):
+        body = prometheus_gauges('rag_index_cache', {'hits': 3, 'hit_rate': 0.75, 'enabled': True, 'path': '/tmp'})
+        self.assertEqual(body, '# TYPE rag_index_cache_hits gauge\nrag_index_cache_hits 3\n'
+                               '# TYPE rag_index_cache_hit_rate gauge\nrag_index_cache_hit_rate 0.75\n')
+        self.assertEqual(prometheus_gauges('rag_empty', {'enabled': False}), '')
+
+
+class MetricsViewTests(TestCase):
+    def test_anonymous_scrapes_are_forbidden(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.client.force_login(User.objects.create_user('reader'))
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    def test_staff_sessions_can_scrape(self):
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn('# TYPE rag_stage_seconds summary', body)
+        self.assertIn('# TYPE rag_ingestion_stage_seconds summary', body)
+        self.assertIn('# TYPE rag_query_executor_rejected gauge', body)
+
+    @override_settings(RAG_METRICS_TOKEN='scrape-secret')
+    def test_scrapers_authenticate_with_the_bearer_token(self):
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='scrape-secret').status_code, 403)
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+from django.test import SimpleTestCase
+from ..micro_batcher import MicroBatcher
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def batcher(self, max_wait=0.05, max_batch_size=8, batch_fn=None):
+        self.batches = []
+
+        def double(items):
+            self.batches.append(list(items))
+            return [item * 2 for item in items]
+        return MicroBatcher(batch_fn or double, max_wait=max_wait, max_batch_size=max_batch_size)
+
+    def submit_from_threads(self, batcher, items):
+        results = {}
+
+        def submit(item):
+            results[item] = batcher.submit(item)
+        threads = [threading.Thread(target=submit, args=(item,)) for item in items]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_concurrent_calls_share_batches_up_to_the_size_limit(self):
+        batcher = self.batcher(max_batch_size=8)
+        results = self.submit_from_threads(batcher, range(40))
+        self.assertEqual(results, {item: item * 2 for item in range(40)})
+        self.assertLessEqual(max(len(batch) for batch in self.batches), 8)
+        self.assertLess(len(self.batches), 40)
+        self.assertEqual(batcher.stats()["items"], 40)
+
+    def test_full_batch_is_sent_without_waiting_out_the_window(self):
+        batcher = self.batcher(max_wait=30, max_batch_size=4)
+        start = time.monotonic()
+        self.submit_from_threads(batcher, range(4))
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual([sorted(batch) for batch in self.batches], [[0, 1, 2, 3]])
+
+    def test_event_loop_callers_are_not_limited_by_threads(self):
+        batcher = self.batcher(max_wait=0.05, max_batch_size=64)
+
+        async def submit_all():
+            return await asyncio.gather(*(batcher.submit_async(item) for item in range(32)))
+        self.assertEqual(asyncio.run(submit_all()), [item * 2 for item in range(32)])
+        # Coroutines hold no thread while they wait, so they all fit one batch
+        self.assertEqual(len(self.batches), 1)
+
+    def test_batch_errors_reach_every_caller(self):
+        batcher = self.batcher(batch_fn=lambda items: items[:1], max_batch_size=2)
+        futures = [batcher.submit_future(item) for item in range(2)]
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, "1 results for 2 items"):
+                future.result(5)
+
+    def test_cancelled_items_are_skipped(self):
+        release = threading.Event()
+        seen = []
+
+        def blocking(items):
+            seen.append(list(items))
+            release.wait(5)
+            return items
+        batcher = self.batcher(max_wait=0.01, max_batch_size=1, batch_fn=blocking)
+        first = batcher.submit_future('first')
+        # Queued behind the running batch, then abandoned by its caller
+        abandoned = batcher.submit_future('abandoned')
+        self.assertTrue(abandoned.cancel())
+        last = batcher.submit_future('last')
+        release.set()
+        self.assertEqual((first.result(5), last.result(5)), ('first', 'last'))
+        self.assertEqual(seen, [['first'], ['last']])
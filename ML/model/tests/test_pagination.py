@@ -0,0 +1,44 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from ..models import Document, Query
+from ..pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('reader')
+        document = Document.objects.create(title='doc', file_path='doc.pdf', uploaded_by=user)
+        now = timezone.now()
+        for i in range(7):
+            query = Query.objects.create(user=user, document=document, question=f'q{i}')
+            # Pairs of queries share a timestamp so the id tiebreak matters
+            Query.objects.filter(pk=query.pk).update(created_at=now - timedelta(minutes=i // 2))
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        expected = list(Query.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        seen, cursor, pages = [], None, 0
+        while True:
+            rows, cursor = keyset_page(Query.objects.all(), 'created_at', cursor, 2)
+            seen.extend(row.pk for row in rows)
+            pages += 1
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 4)
+
+    def test_exact_last_page_has_no_cursor(self):
+        rows, cursor = keyset_page(Query.objects.all(), 'created_at', None, 7)
+        self.assertEqual((len(rows), cursor), (7, None))
+
+    def test_cursor_round_trip(self):
+        timestamp = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(timestamp, 42)), (timestamp, 42))
+
+    def test_invalid_cursors(self):
+        for cursor in ('garbage', 'bm90LWEtY3Vyc29y', encode_cursor(timezone.now(), 1)[:-3] + '!!!'):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+        with self.assertRaises(InvalidCursor):
+            keyset_page(Query.objects.all(), 'created_at', 'garbage', 2)
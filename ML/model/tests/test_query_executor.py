@@ -0,0 +1,45 @@
+import asyncio
+import threading
+from django.test import SimpleTestCase
+from ..query_executor import QueryExecutor, QueryQueueFull
+
+
+class QueryExecutorTests(SimpleTestCase):
+    def test_runs_work_off_the_event_loop(self):
+        executor = QueryExecutor(max_workers=2, max_pending=2)
+        loop_thread = threading.get_ident()
+
+        async def run():
+            return await executor.run(threading.get_ident)
+        self.assertNotEqual(asyncio.run(run()), loop_thread)
+        self.assertEqual(executor.stats()["completed"], 1)
+
+    def test_rejects_work_beyond_workers_plus_pending(self):
+        executor = QueryExecutor(max_workers=1, max_pending=1)
+        release = threading.Event()
+
+        async def saturate():
+            running = [asyncio.ensure_future(executor.run(release.wait, 5)) for _ in range(2)]
+            await asyncio.sleep(0)
+            with self.assertRaises(QueryQueueFull):
+                await executor.run(release.wait, 5)
+            release.set()
+            await asyncio.gather(*running)
+            # Finished work frees its slot
+            return await executor.run(int, '7')
+        self.assertEqual(asyncio.run(saturate()), 7)
+        self.assertEqual(executor.stats()["rejected"], 1)
+
+    def test_timeout_frees_the_caller_but_not_the_slot(self):
+        executor = QueryExecutor(max_workers=1, max_pending=0)
+        release = threading.Event()
+
+        async def time_out():
+            with self.assertRaises(asyncio.TimeoutError):
+                await executor.run(release.wait, 5, timeout=0.05)
+            # The abandoned call still occupies the only worker until it returns
+            with self.assertRaises(QueryQueueFull):
+                await executor.run(int, '1')
+            release.set()
+        asyncio.run(time_out())
+        self.assertEqual(executor.stats()["timed_out"], 1)
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import tempfile
+import threading
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from ..models import Document
+from ..rag_processor import RAGProcessor
+from ..query_executor import QueryQueueFull, query_executor
+from .utils import HashingEncoder, create_indexed_document, use_encoder
+
+
+ARTICLES = [
+    "Article 1. India, that is Bharat, shall be a Union of States.",
+    "Article 21. No person shall be deprived of his life or personal liberty.",
+    "Article 32. The right to move the Supreme Court for the enforcement of rights is guaranteed.",
+    "Article 368. Parliament may amend the Constitution by way of addition, variation or repeal.",
+]
+SCHEDULES = [
+    "The Seventh Schedule lists the Union, State and Concurrent subjects.",
+    "The Tenth Schedule covers disqualification on the ground of defection.",
+]
+
+
+class QueryViewTestCase(TestCase):
+    """Two indexed documents owned by reader and one owned by somebody else."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.encoder = HashingEncoder()
+        use_encoder(self, self.encoder)
+        self.user = User.objects.create_user('reader')
+        self.articles = create_indexed_document(self.user, 'articles', ARTICLES, directory.name, self.encoder)
+        self.schedules = create_indexed_document(self.user, 'schedules', SCHEDULES, directory.name, self.encoder)
+        other = User.objects.create_user('other')
+        self.private = create_indexed_document(other, 'private', ARTICLES, directory.name, self.encoder)
+        self.client.force_login(self.user)
+
+    def post(self, path, payload):
+        return self.client.post(path, json.dumps(payload), content_type='application/json')
+
+
+class BatchQueryTests(QueryViewTestCase):
+    def batch(self, queries):
+        return self.post('/api/query/batch/', {'queries': queries})
+
+    def test_answers_questions_across_documents_in_order(self):
+        self.encoder.calls.clear()
+        response = self.batch([
+            {'document_id': self.articles.id, 'question': 'amend the Constitution Parliament', 'k': 1},
+            {'document_id': self.schedules.id, 'question': 'defection disqualification'},
+            {'document_id': str(self.articles.id), 'question': 'personal liberty', 'k': 2},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['document_title'] for result in results], ['articles', 'schedules', 'articles'])
+        self.assertEqual([len(result['similar_documents']) for result in results], [1, 2, 2])
+        self.assertIn('Article 368', results[0]['context'])
+        self.assertIn('Tenth Schedule', results[1]['similar_documents'][0]['content'])
+        self.assertIn('Article 21', results[2]['similar_documents'][0]['content'])
+        # Every question shares the model, so they are embedded by a single encode call
+        self.assertEqual(len(self.encoder.calls), 1)
+
+    def test_missing_unprocessed_and_other_users_documents_fail_per_query(self):
+        pending = Document.objects.create(title='pending', file_path='pending.pdf', uploaded_by=self.user)
+        response = self.batch([
+            {'document_id': self.articles.id, 'question': 'Union of States'},
+            {'document_id': self.private.id, 'question': 'Union of States'},
+            {'document_id': pending.id, 'question': 'Union of States'},
+            {'document_id': 999999, 'question': 'Union of States'},
+        ])
+        results = response.json()['results']
+        self.assertEqual(results[0]['document_id'], self.articles.id)
+        self.assertEqual([result.get('error') for result in results[1:]],
+                         ['Document not found', 'Document is still being processed', 'Document not found'])
+
+    def test_invalid_requests(self):
+        for queries in ([], [{'document_id': self.articles.id}], [{'document_id': [1], 'question': 'q'}],
+                        [{'document_id': {'id': 1}, 'question': 'q'}], [{'document_id': 'one', 'question': 'q'}],
+                        [{'document_id': self.articles.id, 'question': 'q', 'k': 0}]):
+            with self.subTest(queries=queries):
+                self.assertEqual(self.batch(queries).status_code, 400)
+        with override_settings(RAG_MAX_BATCH_QUERIES=2):
+            self.assertEqual(self.batch([{'document_id': self.articles.id, 'question': 'q'}] * 3).status_code, 400)
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.batch([{'document_id': self.articles.id, 'question': 'q'}]).status_code, 401)
+
+
+class StreamQueryTests(QueryViewTestCase):
+    async def stream(self, payload):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post('/api/query/stream/', json.dumps(payload),
+                                                content_type='application/json')
+        if not response.streaming:
+            return response, None
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        events = []
+        for message in body.strip().split('\n\n'):
+            event, data = message.split('\n')
+            events.append((event.removeprefix('event: '), json.loads(data.removeprefix('data: '))))
+        return response, events
+
+    async def test_hits_then_context_then_done(self):
+        read_on = []
+        iter_hits = RAGProcessor.iter_hits
+
+        def recording_iter_hits(rag_processor, distances, indices):
+            for hit in iter_hits(rag_processor, distances, indices):
+                read_on.append(threading.current_thread().name)
+                yield hit
+        with mock.patch.object(RAGProcessor, 'iter_hits', recording_iter_hits):
+            response, events = await self.stream(
+                {'document_id': self.articles.id, 'question': 'Parliament may amend the Constitution', 'k': 3}
+            )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual([event for event, _ in events], ['hit', 'hit', 'hit', 'context', 'done'])
+        hits = [data for event, data in events if event == 'hit']
+        self.assertEqual([hit['rank'] for hit in hits], [1, 2, 3])
+        self.assertIn('Article 368', hits[0]['content'])
+        context = events[3][1]
+        self.assertEqual((context['document_title'], context['question']),
+                         ('articles', 'Parliament may amend the Constitution'))
+        self.assertIn('Article 368', context['context'])
+        # Chunk text is read from memory-mapped files on query workers, never on the event loop
+        self.assertTrue(read_on)
+        self.assertTrue(all(name.startswith('rag-query') for name in read_on))
+
+    async def test_only_the_owner_can_stream(self):
+        response, _ = await self.stream({'document_id': self.private.id, 'question': 'Union'})
+        self.assertEqual(response.status_code, 404)
+        await self.async_client.alogout()
+        response = await self.async_client.post('/api/query/stream/', json.dumps(
+            {'document_id': self.articles.id, 'question': 'Union'}), content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_invalid_requests(self):
+        for payload in ({'document_id': self.articles.id}, {'document_id': self.articles.id, 'question': 'q', 'k': 0}):
+            with self.subTest(payload=payload):
+                response, _ = await self.stream(payload)
+                self.assertEqual(response.status_code, 400)
+
+
+class ExecutorSaturationTests(QueryViewTestCase):
+    def query(self, path, payload, error):
+        with mock.patch.object(query_executor, 'run', mock.AsyncMock(side_effect=error)):
+            return self.post(path, payload)
+
+    def test_full_queue_answers_429_with_retry_after(self):
+        for path, payload in (
+            ('/api/query/', {'document_id': self.articles.id, 'question': 'Union'}),
+            ('/api/query/', {'scope': 'library', 'question': 'Union'}),
+            ('/api/query/stream/', {'document_id': self.articles.id, 'question': 'Union'}),
+            ('/api/query/batch/', {'queries': [{'document_id': self.articles.id, 'question': 'Union'}]}),
+        ):
+            with self.subTest(path=path):
+                response = self.query(path, payload, QueryQueueFull())
+                self.assertEqual(response.status_code, 429)
+                self.assertEqual(response['Retry-After'], '1')
+
+    def test_timeout_answers_504(self):
+        response = self.query('/api/query/', {'document_id': self.articles.id, 'question': 'Union'},
+                              asyncio.TimeoutError())
+        self.assertEqual((response.status_code, response.json()), (504, {'error': 'Query timed out'}))
+
+    def test_saturated_html_query_page_asks_to_retry(self):
+        with mock.patch.object(query_executor, 'run', mock.AsyncMock(side_effect=QueryQueueFull())):
+            response = self.client.post(f'/query/{self.articles.id}/', {'question': 'Union'})
+        self.assertEqual(response.status_code, 429)
+
+
+@override_settings(RAG_QUERY_BATCH_WINDOW_MS=50, RAG_QUERY_BATCH_MAX_SIZE=64)
+
+
+class MicroBatchedQueryTests(QueryViewTestCase):
+    def setUp(self):
+        super().setUp()
+        batchers = mock.patch.dict('model.micro_batcher._batchers', clear=True)
+        batchers.start()
+        self.addCleanup(batchers.stop)
+
+    async def test_concurrent_questions_share_one_encode_call(self):
+        questions = [f'question {i} about the Union of States' for i in range(3 * query_executor.max_workers)]
+        self.encoder.calls.clear()
+        responses = await asyncio.gather(*(
+            self.async_client.post('/api/query/', json.dumps({'document_id': self.articles.id, 'question': question}),
+                                   content_type='application/json')
+            for question in questions
+        ))
+        self.assertEqual([response.status_code for response in responses], [200] * len(questions))
+        # Waiting for the batch holds no query worker, so it outgrows the worker pool
+        self.assertEqual(sorted(map(sorted, self.encoder.calls)), [sorted(questions)])
@@ -0,0 +1,57 @@
+import hashlib
+import os
+import re
+from unittest import mock
+import numpy as np
+from ..chunk_store import ChunkStore
+from ..index_cache import index_cache
+from ..index_factory import build_index_from_vectors
+from ..models import Document, RAGIndex
+from ..rag_processor import RAGProcessor
+
+
+TEST_MODEL = 'test-hashing-encoder'
+
+
+class HashingEncoder:
+    """Deterministic bag-of-words encoder standing in for a SentenceTransformer in tests."""
+
+    dimension = 64
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"[a-z0-9]+", text.lower()):
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dimension] += 1.0
+            vectors[row] /= np.linalg.norm(vectors[row]) or 1.0
+        return vectors
+
+
+def use_encoder(test_case, encoder: HashingEncoder):
+    """Serve TEST_MODEL from encoder for the rest of test_case."""
+    for patcher in (
+        mock.patch.dict('model.embedding_registry._models', {TEST_MODEL: encoder}),
+        mock.patch.dict('model.embedding_registry._metrics', {TEST_MODEL: {'requests': 0}}),
+    ):
+        patcher.start()
+        test_case.addCleanup(patcher.stop)
+    index_cache.clear()
+    test_case.addCleanup(index_cache.clear)
+
+
+def create_indexed_document(user, title: str, texts, directory: str, encoder: HashingEncoder) -> Document:
+    """A processed document whose index over texts is saved under directory."""
+    document = Document.objects.create(title=title, file_path=f'{title}.pdf', uploaded_by=user,
+                                       is_processed=True, status=Document.STATUS_PROCESSED)
+    rag_processor = RAGProcessor(model_name=TEST_MODEL)
+    rag_processor.documents = ChunkStore.from_texts(texts)
+    rag_processor.embeddings = encoder.encode(texts)
+    rag_processor.index, _, _ = build_index_from_vectors(rag_processor.embeddings, 'flat')
+    index_path = os.path.join(directory, f'document_{document.id}')
+    rag_processor.save_index(index_path)
+    RAGIndex.objects.create(document=document, index_path=index_path, embedding_model=TEST_MODEL)
+    return document
@@ -6,5 +6,10 @@ urlpatterns = [
     path('upload/', views.upload_document, name='upload_document'),
     path('query/<int:document_id>/', views.query_document, name='query_document'),
     path('history/', views.query_history, name='query_history'),
+    path('api/history/', views.api_history, name='api_history'),
     path('api/query/', views.api_query, name='api_query'),
+    path('api/query/stream/', views.api_query_stream, name='api_query_stream'),
+    path('api/query/batch/', views.api_query_batch, name='api_query_batch'),
+    path('api/stats/', views.api_stats, name='api_stats'),
+    path('metrics', views.metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -1,16 +1,36 @@
+import asyncio
 import os
 import time
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, aget_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
-from .models import Document, DocumentChunk, Query, RAGIndex
+from django.db.models.functions import Substr
+from .models import Document, Query
 from .rag_processor import RAGProcessor
+from .embedding_registry import get_load_metrics
+from .index_cache import index_cache
+from .ingestion import enqueue_document, ingestion_latency
+from .library_index import search_library
+from .micro_batcher import get_batcher_stats
+from .query_executor import QueryQueueFull, query_executor
+from .metrics import prometheus_gauges, record_latency, stage_latency
+from .pagination import InvalidCursor, keyset_page
+from .serving import process_memory
+from .generation import extractive_answer, generate, generation_executor, generation_stats, uses_model
 import json
+import numpy as np
+
+
+# Characters of each stored answer loaded for history listings
+ANSWER_PREVIEW_CHARS = 500
+# Characters of a failed document's processing error loaded for the document list
+ERROR_PREVIEW_CHARS = 300
 
 
 @login_required
@@ -35,65 +55,39 @@ def upload_document(request):
             file_size=pdf_file.size
         )
         
-        # Process the document in background (for now, process immediately)
-        try:
-            process_document_rag(document.id)
-            messages.success(request, 'Document uploaded and processed successfully!')
-        except Exception as e:
-            messages.error(request, f'Error processing document: {str(e)}')
+        # Process the document in the background (see the rag_worker management command)
+        enqueue_document(document)
+        messages.success(request, 'Document uploaded! It will be available for queries once processing finishes.')
         
         return redirect('document_list')
     
     return render(request, 'model/upload_document.html')
 
 
-def process_document_rag(document_id):
-    """Process document to create RAG index."""
-    document = Document.objects.get(id=document_id)
-    
-    # Initialize RAG processor
-    rag_processor = RAGProcessor()
-    
-    # Process PDF
-    result = rag_processor.process_pdf(document.file_path)
-    
-    if 'error' in result:
-        raise Exception(result['error'])
-    
-    # Save chunks to database
-    for i, doc_chunk in enumerate(rag_processor.documents):
-        DocumentChunk.objects.create(
-            document=document,
-            chunk_index=i,
-            content=doc_chunk.page_content
-        )
-    
-    # Save RAG index
-    index_path = os.path.join(settings.MEDIA_ROOT, f'indexes/document_{document_id}.pkl')
-    os.makedirs(os.path.dirname(index_path), exist_ok=True)
-    rag_processor.save_index(index_path)
-    
-    # Create RAG index record
-    RAGIndex.objects.create(
-        document=document,
-        index_path=index_path
-    )
-    
-    # Update document
-    document.is_processed = True
-    document.num_chunks = result['num_chunks']
-    document.save()
-
-
 @login_required
 def document_list(request):
-    documents = Document.objects.filter(uploaded_by=request.user).order_by('-upload_date')
-    return render(request, 'model/document_list.html', {'documents': documents})
+    cursor = request.GET.get('cursor')
+    documents = Document.objects.filter(uploaded_by=request.user).defer('processing_error').annotate(
+        error_preview=Substr('processing_error', 1, ERROR_PREVIEW_CHARS)
+    )
+    try:
+        documents, next_cursor = keyset_page(documents, 'upload_date', cursor, getattr(settings, 'RAG_PAGE_SIZE', 50))
+    except InvalidCursor:
+        return redirect('document_list')
+    return render(request, 'model/document_list.html', {
+        'documents': documents,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
+    })
 
 
 @login_required
-def query_document(request, document_id):
-    document = get_object_or_404(Document, id=document_id, uploaded_by=request.user)
+@record_latency
+async def query_document(request, document_id):
+    user = await request.auser()
+    document = await aget_object_or_404(
+        Document.objects.select_related('rag_index'), id=document_id, uploaded_by=user
+    )
     
     if not document.is_processed:
         messages.error(request, 'Document is still being processed. Please wait.')
@@ -104,60 +98,142 @@ def query_document(request, document_id):
         
         if not question:
             messages.error(request, 'Please enter a question')
-            return render(request, 'model/query_document.html', {'document': document})
+            return await arender(request, 'model/query_document.html', {'document': document})
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
-            # Load RAG index
-            rag_index = document.rag_index
-            rag_processor = RAGProcessor()
+            # Get answer with context (cached per index version), off the event loop
+            query_embedding = await index_cache.encode_query(
+                document.rag_index.embedding_model, question, timeout=settings.RAG_QUERY_TIMEOUT
+            )
+            result = await query_executor.run(
+                index_cache.get_answer, document.rag_index, question, 3, query_embedding,
+                timeout=settings.RAG_QUERY_TIMEOUT
+            )
             
-            if not rag_processor.load_index(rag_index.index_path):
+            if result is None:
                 messages.error(request, 'Error loading document index')
-                return render(request, 'model/query_document.html', {'document': document})
-            
-            # Get answer with context
-            result = rag_processor.get_answer_with_context(question, k=3)
+                return await arender(request, 'model/query_document.html', {'document': document})
             
             if 'error' in result:
                 messages.error(request, result['error'])
-                return render(request, 'model/query_document.html', {'document': document})
+                return await arender(request, 'model/query_document.html', {'document': document})
             
-            # Create a simple answer from context (you can enhance this with actual LLM)
-            answer = f"Based on the Constitution:\n\n{result['context']}"
+            generation = await generate_answer(question, result['context'])
             
-            response_time = time.time() - start_time
+            response_time = time.perf_counter() - start_time
             
             # Save query
-            query = Query.objects.create(
-                user=request.user,
-                question=question,
-                answer=answer,
-                document=document,
-                response_time=response_time
-            )
+            with stage_latency.time('query', 'db_write'):
+                query = await Query.objects.acreate(
+                    user=user,
+                    question=question,
+                    answer=generation.text,
+                    document=document,
+                    response_time=response_time,
+                    generation_model=generation.model,
+                    prompt_tokens=generation.prompt_tokens,
+                    completion_tokens=generation.completion_tokens,
+                    generation_time=generation.seconds
+                )
             
-            return render(request, 'model/query_document.html', {
+            return await arender(request, 'model/query_document.html', {
                 'document': document,
                 'query': query,
                 'similar_docs': result['similar_documents']
             })
             
+        except QueryQueueFull:
+            messages.error(request, 'The server is busy answering other questions. Please try again shortly.')
+            return await arender(request, 'model/query_document.html', {'document': document}, status=429)
+        except asyncio.TimeoutError:
+            messages.error(request, 'The query took too long. Please try again.')
+            return await arender(request, 'model/query_document.html', {'document': document}, status=504)
         except Exception as e:
             messages.error(request, f'Error processing query: {str(e)}')
     
-    return render(request, 'model/query_document.html', {'document': document})
+    return await arender(request, 'model/query_document.html', {'document': document})
+
+
+def history_queryset(user, include_answer=False):
+    """A user's queries with their document title, loading only the start of each answer
+    (as answer_preview) unless include_answer is set."""
+    queries = Query.objects.filter(user=user).select_related('document')
+    if include_answer:
+        return queries.only('question', 'answer', 'created_at', 'response_time', 'document__title')
+    return queries.only('question', 'created_at', 'response_time', 'document__title').annotate(
+        answer_preview=Substr('answer', 1, ANSWER_PREVIEW_CHARS)
+    )
 
 
 @login_required
 def query_history(request):
-    queries = Query.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'model/query_history.html', {'queries': queries})
+    cursor = request.GET.get('cursor')
+    try:
+        queries, next_cursor = keyset_page(
+            history_queryset(request.user), 'created_at', cursor, getattr(settings, 'RAG_PAGE_SIZE', 50)
+        )
+    except InvalidCursor:
+        return redirect('query_history')
+    return render(request, 'model/query_history.html', {
+        'queries': queries,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
+    })
+
+
+def api_history(request):
+    """API endpoint returning the requesting user's query history, newest first.
+    
+    Pages are keyset-paginated: pass the returned next_cursor as ?cursor= to get the next
+    one. ?limit= sets the page size, ?document_id= filters to one document and
+    ?include_answer=1 returns full answers instead of previews.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    
+    try:
+        limit = int(request.GET.get('limit', getattr(settings, 'RAG_PAGE_SIZE', 50)))
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    limit = min(max(limit, 1), getattr(settings, 'RAG_MAX_PAGE_SIZE', 200))
+    include_answer = request.GET.get('include_answer') == '1'
+    
+    queries = history_queryset(request.user, include_answer)
+    if request.GET.get('document_id'):
+        try:
+            queries = queries.filter(document_id=int(request.GET['document_id']))
+        except ValueError:
+            return JsonResponse({'error': 'document_id must be an integer'}, status=400)
+    
+    try:
+        queries, next_cursor = keyset_page(queries, 'created_at', request.GET.get('cursor'), limit)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    
+    results = []
+    for query in queries:
+        item = {
+            'id': query.id,
+            'document_id': query.document_id,
+            'document_title': query.document.title,
+            'question': query.question,
+            'created_at': query.created_at.isoformat(),
+            'response_time': query.response_time,
+        }
+        if include_answer:
+            item['answer'] = query.answer
+        else:
+            item['answer_preview'] = query.answer_preview
+        results.append(item)
+    
+    return JsonResponse({'results': results, 'next_cursor': next_cursor})
 
 
 @csrf_exempt
-def api_query(request):
+@record_latency
+async def api_query(request):
     """API endpoint for querying documents."""
     if request.method != 'POST':
         return JsonResponse({'error': 'Only POST method allowed'}, status=405)
@@ -167,33 +243,425 @@ def api_query(request):
         document_id = data.get('document_id')
         question = data.get('question')
         
+        if data.get('scope') == 'library':
+            return await api_query_library(request, question)
+        
         if not document_id or not question:
             return JsonResponse({'error': 'document_id and question are required'}, status=400)
         
-        document = Document.objects.get(id=document_id)
+        document = await Document.objects.select_related('rag_index').aget(id=document_id)
         
         if not document.is_processed:
             return JsonResponse({'error': 'Document is still being processed'}, status=400)
         
-        # Load RAG index
-        rag_index = document.rag_index
-        rag_processor = RAGProcessor()
+        # Get answer with context (cached per index version), off the event loop
+        query_embedding = await index_cache.encode_query(
+            document.rag_index.embedding_model, question, timeout=settings.RAG_QUERY_TIMEOUT
+        )
+        result = await query_executor.run(
+            index_cache.get_answer, document.rag_index, question, 3, query_embedding,
+            timeout=settings.RAG_QUERY_TIMEOUT
+        )
         
-        if not rag_processor.load_index(rag_index.index_path):
+        if result is None:
             return JsonResponse({'error': 'Error loading document index'}, status=500)
         
-        # Get answer with context
-        result = rag_processor.get_answer_with_context(question, k=3)
-        
         if 'error' in result:
             return JsonResponse({'error': result['error']}, status=500)
         
-        return JsonResponse({
+        response = {
             'question': question,
             'context': result['context'],
             'similar_documents': result['similar_documents'],
-            'document_title': document.title
+            'document_title': document.title,
+            **context_stats(result)
+        }
+        # Generation is opt-in so retrieval-only clients never wait for a model
+        if data.get('generate'):
+            generation = await generate_answer(question, result['context'])
+            response['answer'] = generation.text
+            response['usage'] = generation_usage(generation)
+        
+        return JsonResponse(response)
+        
+    except QueryQueueFull:
+        return busy_response()
+    except asyncio.TimeoutError:
+        return JsonResponse({'error': 'Query timed out'}, status=504)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@record_latency
+async def api_query_stream(request):
+    """Server-sent events variant of api_query.
+    
+    Sends one `hit` event per ranked chunk as soon as its text is read, then a `context`
+    event with the assembled context and finally `done`, so clients can show the top hit
+    before the rest of the context exists.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method allowed'}, status=405)
+    
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    
+    try:
+        data = json.loads(request.body)
+        document_id = data.get('document_id')
+        question = data.get('question')
+        
+        if not document_id or not question:
+            return JsonResponse({'error': 'document_id and question are required'}, status=400)
+        
+        try:
+            k = parse_k(data.get('k'))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        
+        # Only the requesting user's documents can be streamed, as for library queries
+        try:
+            document = await Document.objects.select_related('rag_index').aget(id=document_id, uploaded_by=user)
+        except Document.DoesNotExist:
+            return JsonResponse({'error': 'Document not found'}, status=404)
+        
+        if not document.is_processed:
+            return JsonResponse({'error': 'Document is still being processed'}, status=400)
+        
+        rag_processor = await query_executor.run(index_cache.get, document.rag_index, timeout=settings.RAG_QUERY_TIMEOUT)
+        
+        if rag_processor is None:
+            return JsonResponse({'error': 'Error loading document index'}, status=500)
+        
+        # Encoding and the FAISS search happen up front; chunk text is read while streaming
+        query_embedding = await index_cache.encode_query(
+            rag_processor.model_name, question, timeout=settings.RAG_QUERY_TIMEOUT
+        )
+        distances, indices = await query_executor.run(
+            rag_processor.search_ids, question, k, query_embedding, timeout=settings.RAG_QUERY_TIMEOUT
+        )
+        
+    except QueryQueueFull:
+        return busy_response()
+    except asyncio.TimeoutError:
+        return JsonResponse({'error': 'Query timed out'}, status=504)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+    
+    async def events():
+        hits = []
+        try:
+            # Chunk text is read from memory-mapped files, so each hit is materialized on the
+            # executor where a page fault cannot stall the event loop
+            hit_iter = rag_processor.iter_hits(distances, indices)
+            while True:
+                hit = await query_executor.run(next, hit_iter, None, timeout=settings.RAG_QUERY_TIMEOUT)
+                if hit is None:
+                    break
+                hits.append(hit)
+                yield sse_event('hit', hit)
+            
+            if not hits:
+                yield sse_event('error', {'error': 'No relevant documents found'})
+                return
+            
+            result = await query_executor.run(build_answer_context, question, hits, timeout=settings.RAG_QUERY_TIMEOUT)
+        except QueryQueueFull:
+            yield sse_event('error', {'error': 'Server busy, please retry shortly'})
+            return
+        except asyncio.TimeoutError:
+            yield sse_event('error', {'error': 'Query timed out'})
+            return
+        yield sse_event('context', {
+            'question': question,
+            'context': result['context'],
+            'document_title': document.title,
+            **context_stats(result)
         })
+        yield sse_event('done', {})
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@csrf_exempt
+@record_latency
+async def api_query_batch(request):
+    """API endpoint answering many questions, possibly across documents, in one call.
+    
+    Questions are embedded in a single encode call per embedding model and each
+    document's index is searched once with all of its questions.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method allowed'}, status=405)
+    
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    
+    try:
+        data = json.loads(request.body)
+        queries = data.get('queries')
         
+        if not isinstance(queries, list) or not queries:
+            return JsonResponse({'error': 'queries must be a non-empty list'}, status=400)
+        
+        max_queries = getattr(settings, 'RAG_MAX_BATCH_QUERIES', 64)
+        if len(queries) > max_queries:
+            return JsonResponse({'error': f'At most {max_queries} queries are allowed per batch'}, status=400)
+        
+        if any(not isinstance(q, dict) or not q.get('document_id') or not q.get('question') for q in queries):
+            return JsonResponse({'error': 'Every query needs a document_id and a question'}, status=400)
+        
+        try:
+            document_ids = [parse_document_id(q['document_id']) for q in queries]
+            ks = [parse_k(q.get('k')) for q in queries]
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        
+        # Other users' documents are reported as not found, as for library queries
+        documents = await Document.objects.filter(uploaded_by=user).select_related('rag_index').ain_bulk(
+            set(document_ids)
+        )
+        results = [None] * len(queries)
+        
+        # Group the questions by the document that answers them
+        by_document = {}
+        for i, document_id in enumerate(document_ids):
+            document = documents.get(document_id)
+            if document is None:
+                results[i] = {'error': 'Document not found'}
+            elif not document.is_processed:
+                results[i] = {'error': 'Document is still being processed'}
+            else:
+                by_document.setdefault(document.id, []).append(i)
+        
+        processors = {}
+        for document_id in list(by_document):
+            rag_processor = await query_executor.run(
+                index_cache.get, documents[document_id].rag_index, timeout=settings.RAG_QUERY_TIMEOUT
+            )
+            if rag_processor is None:
+                for i in by_document.pop(document_id):
+                    results[i] = {'error': 'Error loading document index'}
+            else:
+                processors[document_id] = rag_processor
+        
+        # One encode call per embedding model for every question that uses it
+        by_model = {}
+        for document_id, positions in by_document.items():
+            by_model.setdefault(processors[document_id].model_name, []).extend(positions)
+        embeddings = {}
+        for positions in by_model.values():
+            encoder = processors[document_ids[positions[0]]]
+            vectors = await query_executor.run(
+                encoder.encode_queries, [queries[i]['question'] for i in positions], timeout=settings.RAG_QUERY_TIMEOUT
+            )
+            embeddings.update(zip(positions, vectors))
+        
+        # One multi-query search per document, with its contexts assembled on the same worker
+        for document_id, positions in by_document.items():
+            answers = await query_executor.run(
+                search_batch, processors[document_id], [queries[i]['question'] for i in positions],
+                np.stack([embeddings[i] for i in positions]), [ks[i] for i in positions],
+                timeout=settings.RAG_QUERY_TIMEOUT
+            )
+            for i, result in zip(positions, answers):
+                if 'error' not in result:
+                    result = {
+                        'question': result['query'],
+                        'context': result['context'],
+                        'similar_documents': result['similar_documents'],
+                        'document_title': documents[document_id].title,
+                        **context_stats(result)
+                    }
+                results[i] = {'document_id': document_id, **result}
+        
+        return JsonResponse({'results': results})
+        
+    except QueryQueueFull:
+        return busy_response()
+    except asyncio.TimeoutError:
+        return JsonResponse({'error': 'Query timed out'}, status=504)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+
+
+def search_batch(rag_processor, questions, embeddings, ks):
+    """Search one document for several embedded questions and build each answer context."""
+    batch = rag_processor.search_embeddings(embeddings, max(ks), queries=questions)
+    return [build_answer_context(question, similar_docs[:k])
+            for question, k, similar_docs in zip(questions, ks, batch)]
+
+
+async def api_query_library(request, question):
+    """Answer a question from every document in the requesting user's library."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required to search your library'}, status=401)
+    
+    if not question:
+        return JsonResponse({'error': 'question is required'}, status=400)
+    
+    query_embedding = await index_cache.encode_query(
+        settings.RAG_EMBEDDING_MODEL, question, timeout=settings.RAG_QUERY_TIMEOUT
+    )
+    similar_docs = await query_executor.run(
+        search_library, user.id, question, 3, query_embedding, timeout=settings.RAG_QUERY_TIMEOUT
+    )
+    
+    if not similar_docs:
+        return JsonResponse({'error': 'No relevant documents found'}, status=500)
+    
+    result = await query_executor.run(build_answer_context, question, similar_docs, timeout=settings.RAG_QUERY_TIMEOUT)
+    return JsonResponse({
+        'question': question,
+        'context': result['context'],
+        'similar_documents': similar_docs,
+        **context_stats(result)
+    })
+
+
+def build_answer_context(question, similar_docs):
+    """RAGProcessor.build_context within the configured context budget."""
+    return RAGProcessor.build_context(
+        question, similar_docs,
+        max_chars=getattr(settings, 'RAG_CONTEXT_MAX_CHARS', None),
+        max_tokens=getattr(settings, 'RAG_CONTEXT_MAX_TOKENS', 1024),
+    )
+
+
+async def generate_answer(question, context):
+    """Run the generator stage on its own bounded pool.
+    
+    QueryQueueFull propagates so callers answer 429; a failing or slow model falls back to
+    the extractive answer so the retrieved context is still returned. Without a model the
+    extractive answer is built right here, skipping the pool.
+    """
+    if not uses_model():
+        return extractive_answer(context)
+    try:
+        return await generation_executor.run(
+            generate, question, context, timeout=getattr(settings, 'RAG_GENERATION_TIMEOUT', 120)
+        )
+    except QueryQueueFull:
+        raise
+    except asyncio.TimeoutError:
+        print("Answer generation timed out, answering with the retrieved context")
+    except Exception as e:
+        print(f"Answer generation failed, answering with the retrieved context: {e}")
+    return extractive_answer(context)
+
+
+def generation_usage(generation):
+    """Token and latency accounting of a Generation, for API responses."""
+    return {
+        'model': generation.model,
+        'prompt_tokens': generation.prompt_tokens,
+        'completion_tokens': generation.completion_tokens,
+        'generation_time': generation.seconds,
+        'cached': generation.cached,
+    }
+
+
+def context_stats(result):
+    """Packed size and savings of an assembled context, for API responses."""
+    return {key: result[key] for key in ('context_length', 'context_tokens', 'tokens_saved')}
+
+
+def parse_k(value, default=3):
+    """Number of results an API client asked for; raises ValueError unless it is an integer
+    between 1 and RAG_MAX_K (FAISS allocates the output for k results per question)."""
+    if value is None:
+        return default
+    max_k = getattr(settings, 'RAG_MAX_K', 50)
+    message = f'k must be an integer between 1 and {max_k}'
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(message)
+    try:
+        k = int(value)
+    except ValueError:
+        raise ValueError(message) from None
+    if not 1 <= k <= max_k:
+        raise ValueError(message)
+    return k
+
+
+def parse_document_id(value):
+    """Document id sent by an API client as a JSON number or numeric string; raises ValueError
+    for anything else, e.g. lists or objects that would otherwise reach the ORM."""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError('document_id must be an integer')
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError('document_id must be an integer') from None
+
+
+def sse_event(event, data):
+    """Format one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def busy_response():
+    """429 telling API clients to back off while the query executor is saturated."""
+    response = JsonResponse({'error': 'Server busy, please retry shortly'}, status=429)
+    response['Retry-After'] = '1'
+    return response
+
+
+async def arender(request, template_name, context=None, status=None):
+    """render() for async views; context processors may read the session and user from the database."""
+    return await sync_to_async(render)(request, template_name, context, status=status)
+
+
+def api_stats(request):
+    """API endpoint exposing in-process RAG runtime statistics."""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Staff access required'}, status=403)
+    
+    return JsonResponse({
+        'embedding_models': get_load_metrics(),
+        'index_cache': index_cache.stats(),
+        'query_embedding_cache': index_cache.query_embeddings.stats() if index_cache.query_embeddings else None,
+        'result_cache': index_cache.results.stats() if index_cache.results else None,
+        'query_batchers': get_batcher_stats(),
+        'query_executor': query_executor.stats(),
+        'generation': generation_stats(),
+        'stage_latency': stage_latency.snapshot(),
+        'process_memory': process_memory(),
+    })
+
+
+def metrics(request):
+    """Prometheus scrape endpoint: stage latency summaries plus cache and executor gauges.
+    
+    Open to staff sessions, or to scrapers sending `Authorization: Bearer <RAG_METRICS_TOKEN>`.
+    Query stages, caches and executors are this worker process's own (gunicorn workers share
+    one port, so a scrape reaches one of them); ingestion stages come from recently finished
+    jobs in the database and cover all workers.
+    """
+    token = getattr(settings, 'RAG_METRICS_TOKEN', None)
+    authorized = token and request.headers.get('Authorization') == f'Bearer {token}'
+    if not authorized and not request.user.is_staff:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    
+    body = stage_latency.prometheus()
+    body += ingestion_latency().prometheus('rag_ingestion_stage_seconds')
+    body += prometheus_gauges('rag_index_cache', index_cache.stats())
+    if index_cache.query_embeddings:
+        body += prometheus_gauges('rag_query_embedding_cache', index_cache.query_embeddings.stats())
+    if index_cache.results:
+        body += prometheus_gauges('rag_result_cache', index_cache.results.stats())
+    body += prometheus_gauges('rag_query_executor', query_executor.stats())
+    generation = generation_stats()
+    body += prometheus_gauges('rag_generation_executor', generation['executor'])
+    if generation['answer_cache']:
+        body += prometheus_gauges('rag_answer_cache', generation['answer_cache'])
+    body += prometheus_gauges('rag_process', process_memory())
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')